@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark SourceId creation in the strawmen: the createNetworkSid / createStationSid /
+createChannelSid functions vs the memoized util.SidResolver, over every station and
+channel of a synthetic document (default: 1 network x 200 stations x 30 channels).
+Both must give the same SIDs; the report is JSON.
+
+  python3 bench_sid.py --networks 2 --stations 200 --channels 30
+"""
+import argparse, io, json, pathlib, sys, time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent / "strawmen"))
+
+from lxml import etree  # noqa: E402
+from gen_stationxml import generate  # noqa: E402
+from util import STAXML_NS, SidResolver, createChannelSid, createNetworkSid, createStationSid  # noqa: E402
+
+NET, STA, CHA = (f"{{{STAXML_NS}}}{t}" for t in ("Network", "Station", "Channel"))
+
+
+def walk(root):
+    for net in root.iter(NET):
+        for sta in net.iter(STA):
+            yield net, sta, list(sta.iter(CHA))
+
+
+def with_functions(root):
+    out = []
+    for net, sta, channels in walk(root):
+        out.append(str(createNetworkSid(net)))
+        out.append(str(createStationSid(sta, net)))
+        out.extend(str(createChannelSid(ch, sta, net)) for ch in channels)
+    return out
+
+
+def with_resolver(root):
+    sids = SidResolver()
+    out = []
+    for net, sta, channels in walk(root):
+        out.append(str(sids.networkSid(net)))
+        out.append(str(sids.stationSid(sta, net)))
+        out.extend(str(sids.channelSid(ch, sta, net)) for ch in channels)
+    return out
+
+
+def best_of(fn, root, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(root)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return result, best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark strawman SourceId creation")
+    ap.add_argument("--networks", type=int, default=1)
+    ap.add_argument("--stations", type=int, default=200)
+    ap.add_argument("--channels", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    buf = io.StringIO()
+    generate(buf, networks=args.networks, stations=args.stations, epochs=1, channels=args.channels,
+             stages=0)
+    root = etree.fromstring(buf.getvalue().encode("utf-8"))
+
+    old, t_old = best_of(with_functions, root, args.repeat)
+    new, t_new = best_of(with_resolver, root, args.repeat)
+    if old != new:
+        raise SystemExit("SidResolver results differ from createNetworkSid/createStationSid/createChannelSid")
+    print(json.dumps({
+        "sids": len(new),
+        "functionsSeconds": round(t_old, 4),
+        "resolverSeconds": round(t_new, 4),
+        "speedup": round(t_old / t_new, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
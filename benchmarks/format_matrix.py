@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Cost matrix of the strawman JSON formats: every strawman converts the same synthetic
+station-level StationXML, and for each format the table gives
+- raw and gzip size, and bytes per station epoch
+- encode time: toJson() + serialization
+- decode time: parsing the JSON text (orjson when installed, else json)
+- query time: a typical consumer query, "all stations of network X", answered from the
+  parsed document the way a client of that format would
+The query must find the same stations in every format. Formats that carry only station
+references (no station attributes) are marked in the "bodies" column.
+
+  python3 format_matrix.py --sizes small,large --out matrix.json
+"""
+import argparse, gzip, importlib, json, os, pathlib, sys, time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent / "strawmen"))
+
+from gen_stationxml import PRESETS  # noqa: E402
+from run_benchmarks import STRAWMEN, ensure_input  # noqa: E402
+
+
+# ---------------------------
+# "All stations of network X", per format. X is the network SourceId, e.g. FDSN:CO;
+# each query returns the station ids or SourceIds it found. Formats with no explicit
+# network -> station link are joined on the SourceId prefix (FDSN:CO_ for FDSN:CO).
+# ---------------------------
+def _prefixed(sid):
+    return sid + "_"
+
+
+def query_mostbasic(doc, sid):
+    return [sta["sourceid"] for net in doc.get("network", []) if net["sourceid"] == sid
+            for sta in net.get("station", [])]
+
+
+def query_flat_net_sta(doc, sid):
+    prefix = _prefixed(sid)
+    return [sta["sourceid"] for sta in doc.get("station", []) if sta["sourceid"].startswith(prefix)]
+
+
+def query_flat_items(doc, sid):
+    prefix = _prefixed(sid)
+    return [it["sourceid"] for it in doc.get("items", [])
+            if it["type"] == "station" and it["sourceid"].startswith(prefix)]
+
+
+def _query_typed_items(type_key):
+    def query(doc, sid):
+        prefix = _prefixed(sid)
+        return [it["data"]["sourceid"] for it in doc.get("data", [])
+                if it[type_key] == "station" and it["data"]["sourceid"].startswith(prefix)]
+    return query
+
+
+def query_relate_jsonld(doc, sid):
+    return [rel["@id"] for it in doc.get("data", [])
+            if it["@type"] == "network" and it["data"]["sourceid"] == sid
+            for rel in it.get("relationships", [])]
+
+
+def query_station_relate_jsonld(doc, sid):
+    return [sta for it in doc.get("data", [])
+            if it["@type"] == "network" and it["data"]["sourceid"] == sid
+            for sta in it["data"].get("stations", [])]
+
+
+def query_toplevel(doc, sid):
+    prefix = sid + "@"
+    return [sta for it in doc.get("data", []) if it["@id"].startswith(prefix)
+            for sta in it["data"]["stationids"]]
+
+
+def query_jsonapi(doc, sid):
+    included = {(it["type"], it["id"]): it for it in doc.get("included", [])}
+    out = []
+    for it in doc.get("data", []):
+        if it["type"] == "network" and it["id"] == sid:
+            for rel in it.get("relationships", {}).get("station", []):
+                sta = included[(rel["data"]["type"], rel["data"]["id"])]
+                out.append(sta["attributes"]["sourceid"])
+    return out
+
+
+# converter name() -> (query, whether the result carries station attributes)
+QUERIES = {
+    "mostbasic": (query_mostbasic, True),
+    "flat_net_sta": (query_flat_net_sta, True),
+    "flat_items": (query_flat_items, True),
+    "flat_items_meta": (_query_typed_items("type"), True),
+    "flat_items_jsonld": (_query_typed_items("@type"), True),
+    "relate_jsonld": (query_relate_jsonld, False),
+    "station_relate_jsonld": (query_station_relate_jsonld, False),
+    "toplevel_network_station_jsonld": (query_toplevel, False),
+    "jsonapi": (query_jsonapi, True),
+}
+
+
+def best_of(repeat, fn, *args):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return out, best
+
+
+def first_network_sid(src):
+    from lxml import etree
+    from util import STAXML_NS, createNetworkSid
+    for _, net in etree.iterparse(str(src), tag=f"{{{STAXML_NS}}}Network"):
+        return str(createNetworkSid(net))
+    raise SystemExit(f"No Network in {src}")
+
+
+def measure(module, cls_name, data, sid, repeat, loads, serialize_json):
+    converter = getattr(importlib.import_module(module), cls_name)()
+    query, bodies = QUERIES[converter.name()]
+    text, encode = best_of(repeat, lambda: serialize_json(converter.toJson(data)))
+    raw = text.encode("utf-8")
+    doc, decode = best_of(repeat, loads, raw)
+    found, query_seconds = best_of(repeat, query, doc, sid)
+    return {
+        "format": converter.name(),
+        "class": cls_name,
+        "rawBytes": len(raw),
+        "gzipBytes": len(gzip.compress(raw, 6)),
+        "encodeSeconds": round(encode, 4),
+        "decodeSeconds": round(decode, 4),
+        "querySeconds": round(query_seconds, 6),
+        "stationsFound": len(found),
+        "bodies": bodies,
+    }
+
+
+COLUMNS = [
+    ("size", "size", "{}"),
+    ("format", "format", "{}"),
+    ("raw KB", "rawBytes", lambda v: f"{v / 1024:,.0f}"),
+    ("gzip KB", "gzipBytes", lambda v: f"{v / 1024:,.0f}"),
+    ("B/sta", "bytesPerStation", "{:,.0f}"),
+    ("gz B/sta", "gzipBytesPerStation", "{:,.1f}"),
+    ("encode s", "encodeSeconds", "{:.3f}"),
+    ("decode s", "decodeSeconds", "{:.3f}"),
+    ("query ms", "querySeconds", lambda v: f"{v * 1000:.2f}"),
+    ("found", "stationsFound", "{}"),
+    ("bodies", "bodies", lambda v: "yes" if v else "refs"),
+]
+
+
+def table(rows):
+    cells = [[h for h, _, _ in COLUMNS]]
+    for r in rows:
+        cells.append([fmt(r[key]) if callable(fmt) else fmt.format(r[key]) for _, key, fmt in COLUMNS])
+    widths = [max(len(c[i]) for c in cells) for i in range(len(COLUMNS))]
+    lines = []
+    for n, row in enumerate(cells):
+        lines.append("| " + " | ".join(c.ljust(w) if i < 2 else c.rjust(w)
+                                       for i, (c, w) in enumerate(zip(row, widths))) + " |")
+        if n == 0:
+            lines.append("|" + "|".join("-" * (w + 2) for w in widths) + "|")
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Size / encode / decode matrix of the strawman formats")
+    ap.add_argument("--sizes", default="large", help=f"Comma list of {', '.join(PRESETS)}")
+    ap.add_argument("--input", help="Use this StationXML file instead of generated sizes")
+    ap.add_argument("--network", help="Network SourceId for the query (default: the first network)")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is kept")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--work-dir", default=os.path.join(os.environ.get("TMPDIR", "/tmp"), "stationxml-bench"))
+    ap.add_argument("--out", help="Also write the rows as JSON here")
+    args = ap.parse_args()
+
+    util = importlib.import_module("util")
+    serialize_json = util.serializeJson
+    loads = util.orjson.loads if util.orjson is not None else json.loads
+
+    if args.input:
+        inputs = [("input", pathlib.Path(args.input))]
+    else:
+        work_dir = pathlib.Path(args.work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        # station level: the strawmen only emit networks and stations
+        inputs = [(size, ensure_input(work_dir, f"{size}-station",
+                                      dict(PRESETS[size], channels=0, stages=0), args.seed))
+                  for size in args.sizes.split(",")]
+
+    rows = []
+    for size, src in inputs:
+        with open(src, "rb") as inxml:
+            data = inxml.read()
+        station_epochs = data.count(b"<Station ")
+        sid = args.network or first_network_sid(src)
+        for module, cls_name in STRAWMEN:
+            row = measure(module, cls_name, data, sid, args.repeat, loads, serialize_json)
+            row.update({"size": size, "stationEpochs": station_epochs, "network": sid,
+                        "bytesPerStation": round(row["rawBytes"] / max(station_epochs, 1), 1),
+                        "gzipBytesPerStation": round(row["gzipBytes"] / max(station_epochs, 1), 1)})
+            rows.append(row)
+            print(f"{size:>7} {row['format']:<32} {row['encodeSeconds']:.3f}s", file=sys.stderr)
+        found = {r["stationsFound"] for r in rows if r["size"] == size}
+        if len(found) != 1:
+            print(f"warning: formats disagree on the stations of {sid} in {size}: {sorted(found)}",
+                  file=sys.stderr)
+
+    print(table(rows))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"json": "orjson" if util.orjson is not None else "json", "rows": rows}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic but realistic FDSN StationXML at configurable sizes.
+
+Every station epoch gets --channels channels; with --stages > 0 each channel carries a
+Response with a poles/zeros stage, then alternating Coefficients / FIR stages with
+--coefficients values each (level=response). The document is written incrementally, so
+multi-GB files can be produced with flat memory. Output is deterministic for a given --seed.
+
+  python3 gen_stationxml.py --networks 10 --stations 200 --epochs 2 --channels 3 \
+      --stages 4 --out /tmp/synthetic.xml
+"""
+import argparse, random, sys
+
+NS = "http://www.fdsn.org/xml/station/1"
+
+PRESETS = {
+    "tiny":   dict(networks=1,  stations=10,   epochs=1, channels=3, stages=0, coefficients=0),
+    "small":  dict(networks=2,  stations=100,  epochs=1, channels=3, stages=3, coefficients=16),
+    "medium": dict(networks=5,  stations=500,  epochs=2, channels=3, stages=4, coefficients=64),
+    "large":  dict(networks=20, stations=1000, epochs=2, channels=6, stages=5, coefficients=128),
+}
+
+BANDS = ["HH", "BH", "LH", "HN", "EH", "SH"]
+ORIENT = [("Z", 0, -90), ("N", 0, 0), ("E", 90, 0)]
+
+
+def net_code(i):
+    # mix permanent and temporary (X/Y/Z + year) networks
+    letters = "ABCDEFGHIJKLMNOPQRSTUVW"
+    if i % 5 == 4:
+        return "XYZ"[i % 3] + letters[i % len(letters)]
+    return letters[i // len(letters) % len(letters)] + letters[i % len(letters)]
+
+
+def sta_code(i):
+    s = ""
+    i += 26 * 26
+    while i:
+        i, r = divmod(i, 26)
+        s = chr(65 + r) + s
+    return s[-5:]
+
+
+def epoch_dates(e, n_epochs):
+    start = 2000 + e * 5
+    end = None if e == n_epochs - 1 else start + 5
+    return f"{start}-01-01T00:00:00.0000", (f"{end - 1}-12-31T23:59:59.9999" if end else None)
+
+
+def response_xml(rnd, stages, coefficients):
+    out = ["<Response>",
+           "<InstrumentSensitivity><Value>%.6e</Value><Frequency>1.0</Frequency>"
+           "<InputUnits><Name>m/s</Name></InputUnits><OutputUnits><Name>counts</Name></OutputUnits>"
+           "</InstrumentSensitivity>" % (rnd.uniform(1e8, 1e9))]
+    for n in range(1, stages + 1):
+        out.append(f'<Stage number="{n}">')
+        if n == 1:
+            out.append("<PolesZeros><InputUnits><Name>m/s</Name></InputUnits>"
+                       "<OutputUnits><Name>V</Name></OutputUnits>"
+                       "<PzTransferFunctionType>LAPLACE (RADIANS/SECOND)</PzTransferFunctionType>"
+                       "<NormalizationFactor>%.6e</NormalizationFactor>"
+                       "<NormalizationFrequency>1.0</NormalizationFrequency>" % rnd.uniform(1e7, 1e9))
+            for z in range(2):
+                out.append(f'<Zero number="{z}"><Real>0</Real><Imaginary>0</Imaginary></Zero>')
+            for p in range(5):
+                out.append('<Pole number="%d"><Real>%.6e</Real><Imaginary>%.6e</Imaginary></Pole>'
+                           % (p, -rnd.uniform(0.01, 300), rnd.uniform(-300, 300)))
+            out.append("</PolesZeros>")
+            out.append("<StageGain><Value>%.1f</Value><Frequency>1.0</Frequency></StageGain>"
+                       % rnd.uniform(500, 2000))
+        else:
+            if n % 2 == 0:
+                out.append("<Coefficients><InputUnits><Name>V</Name></InputUnits>"
+                           "<OutputUnits><Name>counts</Name></OutputUnits>"
+                           "<CfTransferFunctionType>DIGITAL</CfTransferFunctionType>")
+                out.extend("<Numerator>%.8e</Numerator>" % rnd.uniform(-1, 1) for _ in range(coefficients))
+                out.append("</Coefficients>")
+            else:
+                out.append("<FIR><InputUnits><Name>counts</Name></InputUnits>"
+                           "<OutputUnits><Name>counts</Name></OutputUnits><Symmetry>NONE</Symmetry>")
+                out.extend('<NumeratorCoefficient i="%d">%.8e</NumeratorCoefficient>' % (i + 1, rnd.uniform(-1, 1))
+                           for i in range(coefficients))
+                out.append("</FIR>")
+            out.append("<Decimation><InputSampleRate>%d</InputSampleRate><Factor>%d</Factor>"
+                       "<Offset>0</Offset><Delay>%.4f</Delay><Correction>%.4f</Correction></Decimation>"
+                       % (1000, 2 if n > 2 else 1, 0.001 * n, 0.001 * n))
+            out.append("<StageGain><Value>1.0</Value><Frequency>1.0</Frequency></StageGain>")
+        out.append("</Stage>")
+    out.append("</Response>")
+    return "".join(out)
+
+
+def generate(fp, networks=2, stations=100, epochs=1, channels=3, stages=0, coefficients=16, seed=1):
+    """Write a StationXML document to the text file object fp."""
+    rnd = random.Random(seed)
+    fp.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+             f'<FDSNStationXML xmlns="{NS}" schemaVersion="1.1">\n'
+             "<Source>Synthetic</Source><Sender>gen_stationxml</Sender>"
+             "<Module>gen_stationxml.py</Module><ModuleURI>https://example.org/synthetic</ModuleURI>"
+             "<Created>2025-01-01T00:00:00.0000</Created>\n")
+    n_sta_total = 0
+    for n in range(networks):
+        code = net_code(n)
+        year = 1990 + n % 30
+        fp.write(f'<Network code="{code}" startDate="{year}-01-01T00:00:00.0000" restrictedStatus="open">'
+                 f"<Description>Synthetic network {code}</Description>"
+                 f'<Identifier type="DOI">10.9999/SN/{code}</Identifier>'
+                 f"<TotalNumberStations>{stations}</TotalNumberStations>"
+                 f"<SelectedNumberStations>{stations}</SelectedNumberStations>\n")
+        for s in range(stations):
+            scode = sta_code(n_sta_total)
+            n_sta_total += 1
+            lat = rnd.uniform(-80, 80)
+            lon = rnd.uniform(-180, 180)
+            elev = rnd.uniform(0, 3000)
+            for e in range(epochs):
+                start, end = epoch_dates(e, epochs)
+                end_attr = f' endDate="{end}"' if end else ""
+                fp.write(f'<Station code="{scode}" startDate="{start}"{end_attr} restrictedStatus="open">'
+                         f"<Latitude>{lat:.4f}</Latitude><Longitude>{lon:.4f}</Longitude>"
+                         f"<Elevation>{elev:.1f}</Elevation>"
+                         f"<Site><Name>Synthetic site {scode}</Name><Country>Nowhere</Country></Site>"
+                         f"<CreationDate>{start}</CreationDate>"
+                         f"<TotalNumberChannels>{channels}</TotalNumberChannels>"
+                         f"<SelectedNumberChannels>{channels}</SelectedNumberChannels>")
+                for c in range(channels):
+                    band = BANDS[c // 3 % len(BANDS)]
+                    orient, az, dip = ORIENT[c % 3]
+                    rate = {"H": 100, "B": 40, "L": 1, "E": 100, "S": 50}[band[0]]
+                    fp.write(f'<Channel code="{band}{orient}" locationCode="{c // 3 // len(BANDS):02d}" '
+                             f'startDate="{start}"{end_attr} restrictedStatus="open">'
+                             f"<Latitude>{lat:.4f}</Latitude><Longitude>{lon:.4f}</Longitude>"
+                             f"<Elevation>{elev:.1f}</Elevation><Depth>0</Depth>"
+                             f"<Azimuth>{az}</Azimuth><Dip>{dip}</Dip>"
+                             f"<SampleRate>{rate}</SampleRate>"
+                             "<Sensor><Description>Synthetic sensor</Description></Sensor>")
+                    if stages:
+                        fp.write(response_xml(rnd, stages, coefficients))
+                    fp.write("</Channel>")
+                fp.write("</Station>\n")
+        fp.write("</Network>\n")
+    fp.write("</FDSNStationXML>\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic StationXML")
+    ap.add_argument("--preset", choices=sorted(PRESETS), help="Start from a named size")
+    ap.add_argument("--networks", type=int)
+    ap.add_argument("--stations", type=int, help="Stations per network")
+    ap.add_argument("--epochs", type=int, help="Epochs per station")
+    ap.add_argument("--channels", type=int, help="Channels per station epoch")
+    ap.add_argument("--stages", type=int, help="Response stages per channel (0: no Response)")
+    ap.add_argument("--coefficients", type=int, help="Coefficients per Coefficients/FIR stage")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", default="-")
+    args = ap.parse_args()
+
+    params = dict(PRESETS[args.preset or "small"])
+    for k in params:
+        if getattr(args, k) is not None:
+            params[k] = getattr(args, k)
+    if args.out == "-":
+        generate(sys.stdout, seed=args.seed, **params)
+    else:
+        with open(args.out, "w", encoding="utf-8") as fp:
+            generate(fp, seed=args.seed, **params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Benchmark convert.py and every strawman converter on synthetic StationXML.
+
+For each size (see gen_stationxml.PRESETS) an input is generated once into --work-dir,
+then every target runs in its own child process so peak RSS is measured per target:
+- convert.py:stages  load, extract (XML -> ICDM rows), map (rows -> nodes), shape
+                     (compaction to the context terms) and serialize timed separately,
+                     each stage fully materialized
+- convert.py:stream  the streaming pipeline end to end, as the CLI runs it
+- strawman:<Class>   toJson() and json serialization of each strawman variant
+- strawman-stream:<Class>  the same variant through streamJson() (incremental parse)
+
+The report is JSON (--out, default stdout). Pass --compare with a report from another
+revision to add per-target speed and memory ratios. Targets whose dependencies are
+missing (the strawmen need lxml and simplemseed) are reported with an "error".
+
+  python3 run_benchmarks.py --sizes small,medium --out bench-$(git rev-parse --short HEAD).json
+"""
+import argparse, importlib, json, os, pathlib, platform, subprocess, sys, tempfile, time
+
+HERE = pathlib.Path(__file__).resolve().parent
+ROOT = HERE.parent
+CONVERT_DIR = ROOT / "stationxml-to-jsonld"
+STRAWMEN_DIR = ROOT / "strawmen"
+
+sys.path.insert(0, str(HERE))
+from gen_stationxml import PRESETS, generate  # noqa: E402
+
+STRAWMEN = [
+    ("mostBasic", "MostBasic"),
+    ("flatNetSta", "FlatNetSta"),
+    ("flatItemsWithType", "FlatItemsWithType"),
+    ("flatItemsWithTypeMeta", "FlatItemsWithTypeMeta"),
+    ("flatItemsJsonLD", "FlatItemsJsonLD"),
+    ("relationshipsJsonLD", "RelateJsonLD"),
+    ("stationRelateJsonLD", "StationRelateJsonLD"),
+    ("topLevelRelateJsonLD", "TopLevelRelatedJsonLD"),
+    ("jsonapi", "JsonApi"),
+]
+
+TARGETS = (["convert.py:stages", "convert.py:stream"] + [f"strawman:{cls}" for _, cls in STRAWMEN]
+           + [f"strawman-stream:{cls}" for _, cls in STRAWMEN])
+
+
+# ---------------------------
+# Child side: one target, one input, timings printed as JSON
+# ---------------------------
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    out = fn(*args)
+    return out, {"seconds": round(time.perf_counter() - t0, 4),
+                 "cpuSeconds": round(time.process_time() - c0, 4)}
+
+
+def _convert_config():
+    sys.path.insert(0, str(CONVERT_DIR / "src"))
+    import convert
+    os.chdir(CONVERT_DIR)
+    return convert, ("mappings/xml-to-icdm.yaml", "mappings/icdm-to-owl.json",
+                     "contexts/context-strict-v1.jsonld")
+
+
+def child_convert_stages(src, dest):
+    convert, config_args = _convert_config()
+    stages = {}
+    config, stages["load"] = _timed(convert.load_config, *config_args)
+    rows, stages["extract"] = _timed(lambda: list(convert.iter_icdm(src, config["xml_plan"])))
+    nodes, stages["map"] = _timed(lambda: list(convert.iter_graph(iter(rows), config["owl_plan"])))
+    shape = convert.node_shaper(config, "compact")
+    nodes, stages["shape"] = _timed(lambda: [shape(node) for node in nodes])
+    context, graph_key = convert.document_head(config, "compact")
+
+    def serialize():
+        with open(dest, "w", encoding="utf-8") as fp, \
+                convert.JsonLdStreamWriter(fp, context, graph_key=graph_key) as writer:
+            for node in nodes:
+                writer.write(node)
+    _, stages["serialize"] = _timed(serialize)
+    return {"stages": stages, "rows": len(rows), "nodes": len(nodes)}
+
+
+def child_convert_stream(src, dest):
+    convert, config_args = _convert_config()
+
+    def run():
+        config = convert.load_config(*config_args)
+        context, graph_key = convert.document_head(config, "compact")
+        with open(dest, "w", encoding="utf-8") as fp, \
+                convert.JsonLdStreamWriter(fp, context, graph_key=graph_key) as writer:
+            for node in convert.convert_stream(src, config, form="compact"):
+                writer.write(node)
+        return writer.count
+    count, total = _timed(run)
+    return {"stages": {"total": total}, "nodes": count}
+
+
+def _strawman(cls_name):
+    sys.path.insert(0, str(STRAWMEN_DIR))
+    module = dict((c, m) for m, c in STRAWMEN)[cls_name]
+    return getattr(importlib.import_module(module), cls_name)()
+
+
+def child_strawman(cls_name, src, dest):
+    converter = _strawman(cls_name)
+    serialize_json = importlib.import_module("util").serializeJson
+    stages = {}
+    with open(src, "rb") as inxml:
+        data, stages["read"] = _timed(inxml.read)
+    obj, stages["toJson"] = _timed(converter.toJson, data)
+
+    def serialize():
+        with open(dest, "w", encoding="utf-8") as outjson:
+            outjson.write(serialize_json(obj))
+    _, stages["serialize"] = _timed(serialize)
+    return {"stages": stages}
+
+
+def child_strawman_stream(cls_name, src, dest):
+    converter = _strawman(cls_name)
+
+    def run():
+        with open(dest, "w", encoding="utf-8") as outjson:
+            return converter.streamJson(str(src), outjson)
+    items, total = _timed(run)
+    return {"stages": {"total": total}, "items": items}
+
+
+def run_child(target, src, dest):
+    if target == "convert.py:stages":
+        return child_convert_stages(src, dest)
+    if target == "convert.py:stream":
+        return child_convert_stream(src, dest)
+    kind, cls_name = target.split(":", 1)
+    if kind == "strawman-stream":
+        return child_strawman_stream(cls_name, src, dest)
+    return child_strawman(cls_name, src, dest)
+
+
+# ---------------------------
+# Parent side: generate inputs, spawn children, collect the report
+# ---------------------------
+def ensure_input(work_dir, size, params, seed):
+    path = work_dir / f"synthetic-{size}-s{seed}.xml"
+    if not path.exists():
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fp:
+            generate(fp, seed=seed, **params)
+        os.replace(tmp, path)
+    return path
+
+
+def measure(target, src, dest):
+    """Run one target in a fresh process; its rusage gives the peak RSS of that run alone."""
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen([sys.executable, str(pathlib.Path(__file__).resolve()),
+                                 "--child", target, "--input", str(src), "--dest", str(dest)],
+                                stdout=out, stderr=err)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        err.seek(0)
+        stdout, stderr = out.read().decode("utf-8", "replace"), err.read().decode("utf-8", "replace")
+    result = {"target": target}
+    if proc.returncode != 0:
+        lines = stderr.strip().splitlines()
+        result["error"] = lines[-1] if lines else f"exit status {proc.returncode}"
+        return result
+    result.update(json.loads(stdout.strip().splitlines()[-1]))
+    result["peakRssMB"] = round(usage.ru_maxrss / 1024, 1)
+    result["outputBytes"] = os.path.getsize(dest) if os.path.exists(dest) else None
+    return result
+
+
+def summarize(result, station_epochs, input_bytes):
+    seconds = sum(s["seconds"] for s in result["stages"].values())
+    result["seconds"] = round(seconds, 4)
+    if seconds:
+        result["stationsPerSecond"] = round(station_epochs / seconds)
+        result["inputMBPerSecond"] = round(input_bytes / seconds / 1e6, 2)
+    return result
+
+
+def compare(report, base):
+    """Ratios current/base per (size, target): < 1 means faster or smaller now."""
+    index = {(r["size"], r["target"]): r for r in base.get("results", []) if "error" not in r}
+    out = []
+    for r in report["results"]:
+        b = index.get((r["size"], r["target"]))
+        if b is None or "error" in r:
+            continue
+        row = {"size": r["size"], "target": r["target"]}
+        for key in ("seconds", "peakRssMB", "outputBytes"):
+            if r.get(key) and b.get(key):
+                row[key] = round(r[key] / b[key], 3)
+        out.append(row)
+    return out
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark StationXML converters on synthetic input")
+    ap.add_argument("--sizes", default="small", help=f"Comma list of {', '.join(PRESETS)}")
+    ap.add_argument("--targets", default="all", help="Comma list of target names or prefixes, or 'all'")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per target; the fastest is kept")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--work-dir", default=os.path.join(os.environ.get("TMPDIR", "/tmp"), "stationxml-bench"))
+    ap.add_argument("--compare", help="Report JSON from another revision")
+    ap.add_argument("--out", default="-")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    ap.add_argument("--input", help=argparse.SUPPRESS)
+    ap.add_argument("--dest", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.input, args.dest)))
+        return
+
+    wanted = args.targets.split(",")
+    targets = [t for t in TARGETS if args.targets == "all" or any(t.startswith(w) for w in wanted)]
+    work_dir = pathlib.Path(args.work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    report = {"revision": git_revision(), "python": platform.python_version(),
+              "platform": platform.platform(), "cpus": os.cpu_count(), "results": []}
+    for size in args.sizes.split(","):
+        params = PRESETS[size]
+        src = ensure_input(work_dir, size, params, args.seed)
+        input_bytes = os.path.getsize(src)
+        station_epochs = params["networks"] * params["stations"] * params["epochs"]
+        for target in targets:
+            dest = work_dir / f"out-{size}-{target.replace(':', '-')}.json"
+            best = None
+            for _ in range(args.repeat):
+                result = measure(target, src, dest)
+                if "error" in result:
+                    best = result
+                    break
+                summarize(result, station_epochs, input_bytes)
+                if best is None or result["seconds"] < best["seconds"]:
+                    best = result
+            best.update({"size": size, "inputBytes": input_bytes, "stationEpochs": station_epochs})
+            report["results"].append(best)
+            print(f"{size:>7} {target:<34} "
+                  + (best["error"] if "error" in best else f"{best['seconds']:.3f}s {best['peakRssMB']} MB"),
+                  file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        report["compare"] = {"base": base.get("revision"), "ratios": compare(report, base)}
+
+    text = json.dumps(report, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
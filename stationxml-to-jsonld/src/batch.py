@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch StationXML to JSON-LD conversion over a process pool.
+- Inputs: a directory (all *.xml / *.stationxml / *.staxml below it) or a glob pattern.
+- Each worker loads and compiles the mappings and context once, then converts files.
+- Output: one file per input under --out-dir, or one merged graph (--merge) whose
+  nodes appear in sorted input order regardless of which worker finished first.
+- A JSON summary with per-file timings and failures is printed (or written to --summary).
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from convert import (JSON_BACKENDS, JsonLdStreamWriter, convert_stream, document_head, load_config,
+                     open_output)
+
+XML_SUFFIXES = (".xml", ".stationxml", ".staxml")
+
+_worker = {}
+
+
+def expand_inputs(spec):
+    """Sorted list of input files for a directory or glob pattern."""
+    if os.path.isdir(spec):
+        found = []
+        for dirpath, _, files in os.walk(spec):
+            found.extend(os.path.join(dirpath, f) for f in files if f.lower().endswith(XML_SUFFIXES))
+        return sorted(found)
+    return sorted(p for p in glob.glob(spec, recursive=True) if os.path.isfile(p))
+
+
+def output_path(src, root, out_dir, fmt):
+    rel = os.path.relpath(src, root)
+    ext = ".ndjson" if fmt == "ndjson" else ".jsonld"
+    return os.path.join(out_dir, os.path.splitext(rel)[0] + ext)
+
+
+def _init_worker(config_args, fmt, form, indent, backend="auto"):
+    _worker["config"] = load_config(*config_args)
+    _worker["fmt"] = fmt
+    _worker["form"] = form
+    _worker["head"] = document_head(_worker["config"], form)
+    _worker["indent"] = indent
+    _worker["backend"] = backend
+
+
+def _convert_one(task):
+    """
+    Worker: convert one file. With dest=None the serialized nodes are returned for the
+    parent to merge; otherwise the file is written directly.
+    """
+    src, dest = task
+    t0 = time.perf_counter()
+    cpu0 = time.process_time()
+    result = {"input": src, "output": dest}
+    try:
+        config = _worker["config"]
+        if dest is None:
+            dumps = JsonLdStreamWriter.node_dumper(_worker["fmt"], _worker["indent"], _worker["backend"])
+            result["nodes"] = [dumps(node) for node in convert_stream(src, config, form=_worker["form"])]
+        else:
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            context, graph_key = _worker["head"]
+            with open(dest, "w", encoding="utf-8") as fp, \
+                    JsonLdStreamWriter(fp, context, fmt=_worker["fmt"], indent=_worker["indent"],
+                                       backend=_worker["backend"], graph_key=graph_key) as writer:
+                for node in convert_stream(src, config, form=_worker["form"]):
+                    writer.write(node)
+            result["nodeCount"] = writer.count
+    except Exception as e:  # reported in the summary, the batch goes on
+        result["error"] = f"{type(e).__name__}: {e}"
+        if dest is not None and os.path.exists(dest):
+            os.remove(dest)
+    result["seconds"] = round(time.perf_counter() - t0, 4)
+    result["cpuSeconds"] = round(time.process_time() - cpu0, 4)
+    return result
+
+
+def run_batch(inputs, config_args, jobs=None, out_dir=None, merge=None, fmt="jsonld",
+              form="compact", indent=None, backend="auto"):
+    """
+    Convert inputs across a process pool. Returns the summary dict.
+    Exactly one of out_dir / merge must be given; form is one of convert.OUTPUT_FORMS.
+    """
+    t0 = time.perf_counter()
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in inputs]) if inputs else "."
+    tasks = [(src, None if merge else output_path(os.path.abspath(src), root, out_dir, fmt))
+             for src in inputs]
+
+    files = []
+    writer = fp = None
+    if merge:
+        context, graph_key = document_head(load_config(*config_args), form)
+        fp = open_output(merge)
+        writer = JsonLdStreamWriter(fp, context, fmt=fmt, indent=indent, backend=backend, graph_key=graph_key)
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(config_args, fmt, form, indent, backend)) as pool:
+            # map() yields in submission order, which keeps merged output deterministic
+            for result in pool.map(_convert_one, tasks):
+                nodes = result.pop("nodes", None)
+                if writer is not None and nodes is not None:
+                    for text in nodes:
+                        writer.write_serialized(text)
+                    result["nodeCount"] = len(nodes)
+                files.append(result)
+    finally:
+        if writer is not None:
+            writer.close()
+            if fp is not sys.stdout:
+                fp.close()
+
+    failed = [{"input": r["input"], "error": r["error"]} for r in files if "error" in r]
+    return {
+        "files": len(files),
+        "converted": len(files) - len(failed),
+        "failed": failed,
+        "jobs": jobs or os.cpu_count(),
+        "wallSeconds": round(time.perf_counter() - t0, 4),
+        "nodes": sum(r.get("nodeCount", 0) for r in files),
+        "perFile": files,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Batch StationXML to JSON-LD over a process pool")
+    ap.add_argument("inputs", help="Directory or glob pattern (quote it), e.g. 'harvest/**/*.xml'")
+    ap.add_argument("--xml-map", default="mappings/xml-to-icdm.yaml")
+    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.json", help="Can be YAML or JSON")
+    ap.add_argument("--context", default="contexts/context-strict-v1.jsonld")
+    ap.add_argument("--extra-lookups", default=None)
+    form = ap.add_mutually_exclusive_group()
+    form.add_argument("--expanded", action="store_true", help="Emit JSON-LD expanded form (no @context)")
+    form.add_argument("--curie", action="store_true", help="Emit nodes as mapped, without compacting to terms")
+    ap.add_argument("--format", choices=["jsonld", "ndjson"], default="jsonld")
+    ap.add_argument("--pretty", action="store_true", help="Indent the output (default: compact)")
+    ap.add_argument("--json-backend", choices=JSON_BACKENDS, default="auto")
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    out = ap.add_mutually_exclusive_group(required=True)
+    out.add_argument("--out-dir", help="Write one output per input file here")
+    out.add_argument("--merge", help="Write one merged graph here (- for stdout)")
+    ap.add_argument("--summary", help="Write the JSON summary here instead of stdout")
+    args = ap.parse_args()
+
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        raise SystemExit(f"No StationXML files match {args.inputs}")
+
+    config_args = (args.xml_map, args.owl_map, args.context, args.extra_lookups)
+    summary = run_batch(inputs, config_args, jobs=args.jobs, out_dir=args.out_dir, merge=args.merge,
+                        fmt=args.format, form="expanded" if args.expanded else "curie" if args.curie else "compact",
+                        indent=2 if args.pretty else None,
+                        backend=args.json_backend)
+
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text, file=sys.stderr if args.merge == "-" else sys.stdout)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Precompiled configuration bundles for convert.py (`convert.py compile`, `--bundle`).
+- A bundle is one JSON file with the parsed, validated mapping inputs (xml-to-icdm,
+  icdm-to-owl, extra lookups, context). Loading it is a json.loads: no PyYAML, no
+  mapping files; compiling the plans from it takes well under a millisecond.
+- It lists every file it was built from (mapping inputs, on-disk lookup tables, the
+  converter modules) with size, mtime and SHA-256. Checking freshness is one stat per
+  file; only a file whose size or mtime changed is hashed again, and a different hash
+  makes the bundle stale.
+"""
+
+import json
+import os
+import sys
+
+BUNDLE_VERSION = 1
+
+
+def sha256_file(path):
+    import hashlib
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_entry(path):
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime": st.st_mtime_ns,
+            "sha256": sha256_file(path)}
+
+
+def stale_reason(data):
+    """Why a loaded bundle no longer matches its files, or None if it is fresh."""
+    if data.get("version") != BUNDLE_VERSION:
+        return f"bundle version {data.get('version')} (expected {BUNDLE_VERSION})"
+    if data.get("python") != list(sys.version_info[:2]):
+        return "built by another Python version"
+    for entry in data.get("files", ()):
+        path = entry["path"]
+        try:
+            st = os.stat(path)
+        except OSError:
+            return f"{path} is missing"
+        if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime"]:
+            continue
+        if st.st_size != entry["size"] or sha256_file(path) != entry["sha256"]:
+            return f"{path} changed"
+    return None
+
+
+def read_bundle(path):
+    """(bundle dict, stale reason or None), or (None, reason) if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except FileNotFoundError:
+        return None, f"{path} does not exist"
+    except (OSError, ValueError) as e:
+        return None, f"{path} is unreadable: {e}"
+    return data, stale_reason(data)
+
+
+def write_bundle(path, files, payload):
+    """Write payload (JSON-compatible) with the signatures of files, atomically."""
+    data = {"version": BUNDLE_VERSION, "python": list(sys.version_info[:2]),
+            "files": [file_entry(p) for p in dict.fromkeys(files)], **payload}
+    try:
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    except TypeError as e:
+        raise ValueError(f"Configuration is not JSON-representable (quote dates and the like): {e}") from e
+    import tempfile
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return len(text)
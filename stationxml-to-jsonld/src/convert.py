@@ -4,83 +4,112 @@
 StationXML to JSON-LD via external mappings (robust + where filters + extra lookups)
 - Step 1: XML to ICDM using yaml mapping (xml-to-icdm.yaml)
 - Step 2: ICDM to JSON-LD using yaml/json mapping (icdm-to-owl.yaml or .json) + @context
+- `convert.py compile` writes a precompiled bundle of all mapping inputs (--bundle)
 Requirements:
   - Python 3.9+
-  - PyYAML  (pip install pyyaml)
+  - PyYAML  (pip install pyyaml), for YAML mappings only; imported when one is read
+Modules only some runs need (yaml, multiprocessing, argparse) are imported where used,
+to keep start-up short for small documents.
 """
 
-import argparse
+import io
 import json
+import mmap
 import os
 import re
+import sys
 import xml.etree.ElementTree as ET
+from array import array
+from collections import deque
+from itertools import islice
+from operator import methodcaller
 
-try:
-    import yaml
-except ImportError as e:
-    raise SystemExit("PyYAML is required. Install with: pip install pyyaml") from e
+import jsonld
+import lookups as lookup_tables
 
 
 # ---------------------------
 # Helpers
 # ---------------------------
 
-def text_of(elem):
-    return (elem.text or "").strip() if elem is not None else None
-
-
-def get_attr(elem, expr):
-    # expr like '@code'
-    return elem.get(expr[1:]) if expr.startswith("@") else None
-
-
-def find_with_ns_chain(elem, path, ns_prefix_map):
+def _clark_steps(path, ns_prefix_map):
     """
-    Resolve a multi-step path like 'sta:Site/sta:Name' where each step can have a namespace prefix.
-    Iterate segment by segment and build Clark-notation {uri}local for .find().
+    Resolve 'sta:Site/sta:Name' once into Clark-notation steps for .find(),
+    or None when the path has an empty segment (never matches).
     """
-    current = elem
+    steps = []
     for segment in path.split("/"):
         if not segment:
             return None
         if ":" in segment:
             pfx, local = segment.split(":", 1)
             uri = ns_prefix_map.get(pfx)
-            if not uri:
-                # last-resort: try raw
-                current = current.find(segment)
-            else:
-                qname = f"{{{uri}}}{local}"
-                current = current.find(qname)
+            # last-resort: try raw
+            steps.append(f"{{{uri}}}{local}" if uri else segment)
         else:
-            current = current.find(segment)
-        if current is None:
-            return None
-    return current
+            steps.append(segment)
+    return tuple(steps)
+
+
+def _no_value(elem):
+    return None
 
 
-def extract_field(elem, field_expr, ns_prefix_map):
+def compile_field(field_expr, ns_prefix_map):
     """
-    Supports:
-      - '@attr'
-      - 'sta:Tag/text()'
-      - 'sta:Parent/sta:Child/text()' (multi-step)
+    Compile a field expression once into an accessor elem -> value. Supports '@attr',
+    'sta:Tag/text()' and multi-step 'sta:Parent/sta:Child/text()' (stripped text).
     """
     expr = field_expr.strip()
     if expr.startswith("@"):
-        return get_attr(elem, expr)
+        return methodcaller("get", expr[1:])
 
-    if expr.endswith("/text()"):
-        path = expr[:-7]
-        node = find_with_ns_chain(elem, path, ns_prefix_map)
-        return text_of(node)
+    if not expr.endswith("/text()"):
+        return _no_value
 
-    return None
+    steps = _clark_steps(expr[:-7], ns_prefix_map)
+    if steps is None:
+        return _no_value
+
+    if len(steps) == 1:
+        tag = steps[0]
 
+        def text_at(elem):
+            node = elem.find(tag)
+            return (node.text or "").strip() if node is not None else None
+        return text_at
 
-def render_iri(template, env):
-    def repl(m): return str(env.get(m.group(1), ""))
-    return re.sub(r"\${([^}]+)}", repl, template)
+    def text_at_chain(elem):
+        node = elem
+        for tag in steps:
+            node = node.find(tag)
+            if node is None:
+                return None
+        return (node.text or "").strip()
+    return text_at_chain
+
+
+_IRI_VAR = re.compile(r"\${([^}]+)}")
+
+
+def compile_iri(template):
+    """
+    Split an IRI template like '${baseId}network/${ICDM.Network.code}' once into
+    literal and variable parts; returns a formatter env -> IRI string.
+    """
+    parts = _IRI_VAR.split(template)
+    head, names, literals = parts[0], parts[1::2], parts[2::2]
+    if not names:
+        return lambda env: head
+    steps = tuple(zip(names, literals))
+
+    def render(env):
+        out = [head]
+        for name, lit in steps:
+            out.append(str(env.get(name, "")))
+            out.append(lit)
+        return "".join(out)
+    return render
 
 
 def build_period(start, end):
@@ -92,78 +121,349 @@ def build_period(start, end):
     return node
 
 
-# ---- WHERE evaluation helpers ----
+def _field_key(field):
+    return field.split(".")[-1]  # "ICDM.Network.code" -> "code"
 
-def _eval_exists(item, fields):
-    for f in fields or []:
-        key = f.split('.')[-1]  # "ICDM.Network.code" -> "code"
-        if key not in item or item.get(key) in (None, "", []):
-            return False
-    return True
 
-def _eval_equals(item, mapping):
-    for f, expected in (mapping or {}).items():
-        key = f.split('.')[-1]
-        if str(item.get(key)) != str(expected):
-            return False
+def _always(item):
     return True
 
-def _eval_regex(item, mapping):
-    for f, pattern in (mapping or {}).items():
-        key = f.split('.')[-1]
-        val = item.get(key)
-        if val is None:
-            return False
+
+def compile_where(where_def, stats=None, name=None):
+    """
+    Compile a where clause once into a predicate item -> bool.
+    Regexes are compiled up front; an invalid pattern rejects every item (as before).
+    With stats, tests and rejections are counted under where.<name>, each rejection also
+    under the first condition that failed (e.g. where.Station.rejected.regex:code).
+    """
+    if not where_def:
+        return _always
+    exists = [_field_key(f) for f in (where_def.get("exists") or [])] if "exists" in where_def else []
+    equals = [(_field_key(f), str(v)) for f, v in (where_def.get("equals") or {}).items()] \
+        if "equals" in where_def else []
+    regex = []
+    for f, pattern in ((where_def.get("regex") or {}).items() if "regex" in where_def else ()):
         try:
-            if not re.search(pattern, str(val)):
-                return False
+            regex.append((_field_key(f), re.compile(pattern).search))
         except re.error:
-            return False
-    return True
+            regex.append((_field_key(f), None))
 
-def _passes_where(item, where_def):
-    if not where_def:
+    def passes(item):
+        for key in exists:
+            if key not in item or item.get(key) in (None, "", []):
+                return False
+        for key, expected in equals:
+            if str(item.get(key)) != expected:
+                return False
+        for key, search in regex:
+            val = item.get(key)
+            if val is None or search is None or not search(str(val)):
+                return False
         return True
-    if "exists" in where_def and not _eval_exists(item, where_def.get("exists")):
-        return False
-    if "equals" in where_def and not _eval_equals(item, where_def.get("equals")):
-        return False
-    if "regex" in where_def and not _eval_regex(item, where_def.get("regex")):
+
+    if stats is not None:
+        return _counted_where(passes, where_def, stats, name)
+    return passes
+
+
+def _counted_where(passes, where_def, stats, name):
+    # one single-condition predicate per condition, only consulted for rejected items
+    conditions = [(f"exists:{_field_key(f)}", compile_where({"exists": [f]}))
+                  for f in where_def.get("exists") or []]
+    for op in ("equals", "regex"):
+        conditions += [(f"{op}:{_field_key(f)}", compile_where({op: {f: v}}))
+                       for f, v in (where_def.get(op) or {}).items()]
+    prefix = f"where.{name}."
+    count = stats.count
+
+    def passes_counted(item):
+        count(prefix + "tested")
+        if passes(item):
+            return True
+        count(prefix + "rejected")
+        for label, check in conditions:
+            if not check(item):
+                count(prefix + "rejected." + label)
+                break
         return False
-    return True
+    return stats.timed("where", passes_counted)
 
 
 # ---------------------------
 # Step 1: XML to ICDM
 # ---------------------------
 
-def extract_icdm(xml_path, xml_map_path):
-    cfg = yaml.safe_load(open(xml_map_path, "r", encoding="utf-8"))
+def load_yaml(path):
+    try:
+        import yaml
+    except ImportError as e:
+        raise SystemExit("PyYAML is required for YAML mappings. Install with: pip install pyyaml "
+                         "(or use JSON mappings, or a bundle from `convert.py compile`)") from e
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def load_xml_map(xml_map_path):
+    if xml_map_path.endswith(".json"):
+        with open(xml_map_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return load_yaml(xml_map_path)
+
+
+def stream_tag(path):
+    """
+    Reduce a mapping path like './/{uri}Network' to the Clark tag matched while streaming.
+    Only descendant-or-self paths ending in a plain tag can be streamed.
+    """
+    m = re.fullmatch(r"(?:\.?//)?((?:\{[^}]*\})?[^/{}\[\]]+)", path.strip())
+    if not m:
+        raise ValueError(f"Cannot stream mapping path: {path!r}")
+    return m.group(1)
+
+
+def compile_find(path, ns_prefix_map, many=False):
+    """
+    Compile a relative path like 'sta:Response/sta:Stage' into elem -> element
+    (or elem -> list of elements for the last step with many=True).
+    """
+    steps = _clark_steps(path, ns_prefix_map)
+    if steps is None:
+        return (lambda elem: []) if many else _no_value
+    head, last = steps[:-1], steps[-1]
+
+    def find(elem):
+        node = elem
+        for tag in head:
+            node = node.find(tag)
+            if node is None:
+                return [] if many else None
+        return node.findall(last) if many else node.find(last)
+    return find
+
+
+def _array_factory(backend):
+    if backend == "array":
+        return lambda values: values
+    if backend == "numpy":
+        import numpy as np
+        return lambda values: np.frombuffer(values, dtype=np.float64)
+    raise ValueError(f"Unknown array backend: {backend}")
+
+
+def compile_array(path, ns_prefix_map, backend="array"):
+    """
+    Compile a coefficient path like 'sta:PolesZeros/sta:Pole' into elem -> typed array of
+    doubles (array('d'), or a NumPy float64 array with backend="numpy"). Complex values
+    (Real/Imaginary children) are stored interleaved: re0, im0, re1, im1, ...
+    """
+    find_all = compile_find(path, ns_prefix_map, many=True)
+    steps = _clark_steps(path, ns_prefix_map) or ("",)
+    last = steps[-1]
+    uri = last[:last.index("}") + 1] if last.startswith("{") else ""
+    real_tag, imag_tag = uri + "Real", uri + "Imaginary"
+    make = _array_factory(backend)
+
+    def values(elem):
+        out = array("d")
+        for e in find_all(elem):
+            real = e.find(real_tag)
+            if real is not None:
+                imag = e.find(imag_tag)
+                out.append(float(real.text))
+                out.append(float(imag.text) if imag is not None and imag.text else 0.0)
+            elif e.text and e.text.strip():
+                out.append(float(e.text))
+        return make(out)
+    return values
+
+
+def compile_extractor(sec, ns_prefix_map, backend="array", children=()):
+    """
+    Compile one mapping section into elem -> row: scalar 'fields', typed 'arrays', and
+    nested child rows given as (key, find, extract, many) tuples.
+    """
+    fields = [(key, compile_field(expr, ns_prefix_map)) for key, expr in (sec.get("fields") or {}).items()]
+    arrays = [(key, compile_array(path, ns_prefix_map, backend)) for key, path in (sec.get("arrays") or {}).items()]
+
+    def extract(elem):
+        row = {key: get(elem) for key, get in fields}
+        for key, get in arrays:
+            row[key] = get(elem)
+        for key, find, sub, many in children:
+            if many:
+                row[key] = [sub(e) for e in find(elem)]
+            else:
+                e = find(elem)
+                row[key] = sub(e) if e is not None else None
+        return row
+    return extract
+
+
+def compile_xml_map(cfg, array_backend="array", stats=None):
+    """
+    Compile an xml-to-icdm mapping into an extraction plan:
+    {"Network": (clark_tag, extract), "Station": (...), "Channel": (...)}
+    The optional 'channel' section carries its 'response' (path relative to Channel) and
+    the response's 'stage' list (path relative to Response) as nested rows.
+    With stats, field extraction is timed as the "extract" stage.
+    """
     ns = cfg.get("namespaces", {}) or {}
+    plan = {}
+    for kind, section in (("Network", "network"), ("Station", "station")):
+        sec = cfg[section]
+        plan[kind] = (stream_tag(sec["path"]), compile_extractor(sec, ns))
+
+    if cfg.get("channel"):
+        response_children = []
+        if cfg.get("stage"):
+            stage = compile_extractor(cfg["stage"], ns, array_backend)
+            response_children.append(("stages", compile_find(cfg["stage"]["path"], ns, many=True), stage, True))
+        channel_children = []
+        if cfg.get("response"):
+            response = compile_extractor(cfg["response"], ns, array_backend, response_children)
+            channel_children.append(("response", compile_find(cfg["response"]["path"], ns), response, False))
+        plan["Channel"] = (stream_tag(cfg["channel"]["path"]),
+                           compile_extractor(cfg["channel"], ns, array_backend, channel_children))
+    if stats is not None:
+        plan = {kind: (tag, stats.timed("extract", extract)) for kind, (tag, extract) in plan.items()}
+    return plan
+
+
+# Mapping sections whose where clauses can be evaluated at the start tag
+PUSHDOWN_SECTIONS = (("Network", "network", "networkMapping"), ("Station", "station", "stationMapping"),
+                     ("Channel", "channel", "channelMapping"))
+
+
+def compile_pushdown(xml_cfg, owl_cfg, stats=None):
+    """
+    Start-tag filters {kind: elem -> bool} for iter_icdm: the conditions of each *Mapping
+    where clause on fields the xml map reads from attributes of the element itself
+    (code: "@code", restricted: "@restrictedStatus", start: "@startDate", ...). They see
+    the same values as after extraction, so an element they reject fails the where
+    clause too and its subtree can be skipped unread. The full clause still runs in the
+    mapping stage. Clauses with only exists conditions are not pushed down: attributes
+    such as code are required by StationXML, so the early test (and the byte pre-scan of
+    <Network> tags) would cost more than it saves. With stats, they are counted under where.<kind>.start, by attribute.
+    """
+    filters = {}
+    for kind, xml_section, owl_section in PUSHDOWN_SECTIONS:
+        where_def = (owl_cfg.get(owl_section) or {}).get("where")
+        fields = (xml_cfg.get(xml_section) or {}).get("fields") or {}
+        if not where_def or not fields:
+            continue
+        attrs = {}
+        for key, expr in fields.items():
+            attr = expr.strip()[1:] if isinstance(expr, str) and expr.strip().startswith("@") else ""
+            if attr and "." not in attr and "{" not in attr:
+                attrs[key] = attr
+        # the same clause over the attribute names, tested on elem.attrib
+        pushed = {}
+        for op in ("equals", "regex"):
+            conditions = {attrs[_field_key(f)]: v for f, v in (where_def.get(op) or {}).items()
+                          if _field_key(f) in attrs}
+            if conditions:
+                pushed[op] = conditions
+        exists = [attrs[_field_key(f)] for f in where_def.get("exists") or [] if _field_key(f) in attrs]
+        if pushed and exists:
+            pushed["exists"] = exists
+        if pushed:
+            filters[kind] = _start_filter(compile_where(pushed, stats, f"{kind}.start"))
+    return filters
+
+
+def _start_filter(passes):
+    return lambda elem: passes(elem.attrib)
+
+
+def _skip_subtree(events, elem, stack):
+    """Consume the events up to the end of elem (just started), clearing as they end."""
+    depth = 1
+    for event, e in events:
+        if event == "start":
+            depth += 1
+            continue
+        e.clear()
+        depth -= 1
+        if not depth:
+            break
+    if stack:
+        stack[-1].remove(elem)
+
+
+def iter_icdm(xml_source, plan, stats=None, filters=None):
+    """
+    Streaming XML to ICDM using incremental parsing (ET.iterparse).
+    Yields ("Network", row), ("Station", row) and, if the plan has them, ("Channel", row)
+    as each element closes, so children come before the element that contains them.
+    Station rows record their parent under "networkIndex" and Channel rows under
+    "stationIndex" (positions in document order). Finished subtrees are cleared and
+    detached from their parent, keeping peak memory bounded by the largest single Network.
+    xml_source may be a path or a binary file object; plan comes from compile_xml_map.
+    filters ({kind: elem -> bool}, see compile_pushdown) are tested at start tags: a
+    rejected element's subtree is skipped without extracting or yielding any row, and the
+    indexes count yielded rows only. With stats, elements are counted.
+    """
+    net_tag, net_extract = plan["Network"]
+    sta_tag, sta_extract = plan["Station"]
+    cha_tag, cha_extract = plan.get("Channel", (None, None))
+    filters = filters or {}
+    net_keep, sta_keep, cha_keep = (filters.get(kind) for kind in ("Network", "Station", "Channel"))
+
+    if net_keep is not None and isinstance(xml_source, (str, os.PathLike)):
+        # rejected networks are cut out of the bytes before parsing
+        pruned = select_networks(xml_source, net_keep)
+        if pruned is not None:
+            xml_source = pruned
+            net_keep = None
+
+    events = ET.iterparse(xml_source, events=("start", "end"))
+    if stats is not None:
+        events = stats.elements(events)
+    events = iter(events)
+    stack = []
+    net_index = -1
+    sta_index = -1
+    for event, elem in events:
+        tag = elem.tag
+        if event == "start":
+            if tag == net_tag:
+                if net_keep is not None and not net_keep(elem):
+                    _skip_subtree(events, elem, stack)
+                    continue
+                net_index += 1
+            elif tag == sta_tag:
+                if sta_keep is not None and not sta_keep(elem):
+                    _skip_subtree(events, elem, stack)
+                    continue
+                sta_index += 1
+            elif tag == cha_tag and cha_keep is not None and not cha_keep(elem):
+                _skip_subtree(events, elem, stack)
+                continue
+            stack.append(elem)
+            continue
+        stack.pop()
+        if tag == cha_tag:
+            row = cha_extract(elem)
+            row["stationIndex"] = sta_index
+            yield "Channel", row
+        elif tag == sta_tag:
+            row = sta_extract(elem)
+            row["networkIndex"] = net_index
+            yield "Station", row
+        elif tag == net_tag:
+            yield "Network", net_extract(elem)
+        else:
+            continue
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
 
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
-    out = {"Network": [], "Station": []}
-
-    # Networks
-    net_path = cfg["network"]["path"]
-    net_fields = cfg["network"]["fields"]
-    for net in root.findall(net_path):
-        row = {}
-        for key, expr in net_fields.items():
-            row[key] = extract_field(net, expr, ns) if not expr.startswith("@") else get_attr(net, expr)
-        out["Network"].append(row)
-
-    # Stations
-    sta_path = cfg["station"]["path"]
-    sta_fields = cfg["station"]["fields"]
-    for st in root.findall(sta_path):
-        row = {}
-        for key, expr in sta_fields.items():
-            row[key] = extract_field(st, expr, ns) if not expr.startswith("@") else get_attr(st, expr)
-        out["Station"].append(row)
 
+def extract_icdm(xml_path, xml_map_path):
+    plan = compile_xml_map(load_xml_map(xml_map_path))
+    out = {kind: [] for kind in plan}
+    for kind, row in iter_icdm(xml_path, plan):
+        out[kind].append(row)
     return out
 
 
@@ -173,165 +473,1242 @@ def extract_icdm(xml_path, xml_map_path):
 
 def load_mapping(owl_map_path):
     if owl_map_path.endswith(".json"):
-        return json.load(open(owl_map_path, "r", encoding="utf-8"))
-    return yaml.safe_load(open(owl_map_path, "r", encoding="utf-8"))
+        with open(owl_map_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return load_yaml(owl_map_path)
 
 
-def apply_mapping(icdm, owl_map_path, context, compact=True, extra_lookups=None):
-    cfg = load_mapping(owl_map_path)
+def merge_lookups(cfg, extra_lookups=None):
+    """
+    Lookup table specs {name: inline dict | path to an sqlite table} from the mapping's
+    'lookups' plus extra_lookups. Inline tables merge key by key (extra wins); otherwise
+    the extra spec replaces the table. cfg is not modified.
+    """
+    lookups = dict(cfg.get("lookups") or {})
+    for k, v in (extra_lookups or {}).items():
+        if isinstance(v, dict) and isinstance(lookups.get(k, {}), dict):
+            lookups[k] = {**lookups.get(k, {}), **v}
+        else:
+            lookups[k] = v
+    return lookups
 
-    iri_policy = cfg.get("iriPolicy", {})
-    baseId = iri_policy.get("baseId", "")
-    net_tpl = iri_policy.get("networkIri", "${baseId}network/${ICDM.Network.code}")
-    sta_tpl = iri_policy.get("stationIri",  "${baseId}station/${ICDM.Network.code}_${ICDM.Station.code}")
 
-    net_map = cfg.get("networkMapping", {})
-    sta_map = cfg.get("stationMapping", {})
+def load_extra_lookups(extra_lookups_path):
+    if not extra_lookups_path:
+        return None
+    with open(extra_lookups_path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-    out = {"@context": context["@context"] if compact else None, "@graph": []}
 
-    # lookups (merge extra if provided)
-    lookups = cfg.get("lookups", {})
-    if extra_lookups:
-        for k, v in (extra_lookups or {}).items():
-            if isinstance(v, dict):
-                lookups.setdefault(k, {}).update(v)
+def compile_rule(prop, rule, lookups, entities, stats=None):
+    """
+    Compile one property rule into an emitter (node, row, env) -> None that appends
+    the property value(s) to node. Returns None for rules that never emit.
+    Rule kinds: 'embed' (nested nodes mapped with another entity, e.g. a Channel's Response),
+    'fromArray' (typed coefficient array, emitted as a JSON-LD @list of value objects typed
+    with the rule's datatype, xsd:double by default), 'fromIri' template,
+    'fromChildren' (IRIs of the linked child nodes, e.g. "Station" for fdsn:hasStation),
+    'from' field (+ lookup / iriOrLiteral / datatype), 'build: period'.
+    An optional 'when' field guards any kind. lookups maps table names to tables from
+    lookups.open_lookups. entities is the (possibly still filling) dict of compiled
+    entities, resolved when the emitter runs. With stats, lookups are timed and their
+    hits/misses counted per table.
+    """
+    if not isinstance(rule, dict):
+        return None
+
+    if "embed" in rule:
+        key = _field_key(rule["from"])
+        name = rule["embed"]
+
+        def emit(node, row, env):
+            sub = row.get(key)
+            if not sub:
+                return
+            entity = entities[name]
+            for item in ([sub] if isinstance(sub, dict) else sub):
+                if entity["where"](item):
+                    node.setdefault(prop, []).append(map_node(entity, item, env))
+
+    elif "fromArray" in rule:
+        key = _field_key(rule["fromArray"])
+        datatype = rule.get("datatype") or "xsd:double"
+
+        def emit(node, row, env):
+            values = row.get(key)
+            if values is not None and len(values):
+                node[prop] = {"@list": [{"@value": v, "@type": datatype} for v in values.tolist()]}
+
+    elif "fromChildren" in rule:
+        env_key = CHILD_IRIS[rule["fromChildren"]]
+
+        def emit(node, row, env):
+            iris = env.get(env_key)
+            if iris:
+                node.setdefault(prop, []).extend({"@id": iri} for iri in iris)
+
+    elif "fromIri" in rule:
+        iri = compile_iri(rule["fromIri"])
+
+        def emit(node, row, env):
+            node.setdefault(prop, []).append({"@id": iri(env)})
+
+    elif "from" in rule:
+        key = _field_key(rule["from"])
+        probe = None
+        if rule.get("lookup"):
+            table = lookups.get(rule["lookup"]) or _EMPTY_TABLE
+            probe = table.lookup
+            if stats is not None:
+                probe = _counted_lookup(probe, stats, rule["lookup"])
+        iri_or_literal = rule.get("type") == "iriOrLiteral"
+        has_datatype = "datatype" in rule
+        datatype = rule.get("datatype")
+
+        def emit(node, row, env):
+            val = row.get(key)
+            if val is None or val == "":
+                return
+            if probe is not None:
+                mapped = probe(val)
+                if mapped:
+                    node.setdefault(prop, []).append({"@id": mapped})
+                    return
+            if iri_or_literal and isinstance(val, str) and val.startswith(("http://", "https://")):
+                node.setdefault(prop, []).append({"@id": val})
+            elif has_datatype:
+                node.setdefault(prop, []).append({"@value": val, "@type": datatype})
             else:
-                lookups[k] = v
+                node.setdefault(prop, []).append(val)
 
-    # Networks
-    net_where = (net_map or {}).get("where")
-    for net in icdm.get("Network", []):
-        if not _passes_where(net, net_where):
-            continue
+    elif rule.get("build") == "period":
+        args = [_field_key(a) for a in rule.get("args", [])]
+        start_key = args[0] if len(args) > 0 else None
+        end_key = args[1] if len(args) > 1 else None
 
-        env = {
-            "baseId": baseId,
-            "ICDM.Network.code": net.get("code", "")
-        }
-        net_id = render_iri(net_tpl, env)
-        net_node = {"@id": net_id, "@type": net_map.get("type", "fdsn:Network")}
+        def emit(node, row, env):
+            start = row.get(start_key) if start_key else None
+            end = row.get(end_key) if end_key else None
+            node.setdefault(prop, []).append(build_period(start, end))
 
-        for prop, rule in (net_map.get("properties") or {}).items():
-            if not isinstance(rule, dict):
-                continue
+    else:
+        return None
+
+    if rule.get("when"):
+        when_key = _field_key(rule["when"])
+        inner = emit
+
+        def emit(node, row, env):
+            if row.get(when_key):
+                inner(node, row, env)
+    return emit
+
+
+def _counted_lookup(probe, stats, table_name):
+    hits, misses = f"lookup.{table_name}.hits", f"lookup.{table_name}.misses"
+    count = stats.count
+
+    def probe_counted(val):
+        mapped = probe(val)
+        count(hits if mapped else misses)
+        return mapped
+    return stats.timed("lookup", probe_counted)
+
+
+_EMPTY_TABLE = lookup_tables.LookupIndex({})
+
+
+# env key holding the IRIs of a node's children, for 'fromChildren' rules
+CHILD_IRIS = {"Station": "stationIris", "Channel": "channelIris"}
+
+# iriPolicy.epochs: what to do with the epochs of one code, which share an IRI
+# - "keep": one node per epoch, duplicate @ids are left to the consumer
+# - "merge": one node per IRI, with the values of all its epochs (see merge_epochs)
+# - "mint": epoch IRIs, "<iri>@<startDate>" (${ICDM.<Entity>.epoch} appended to the templates)
+EPOCH_POLICIES = ("keep", "merge", "mint")
+
+
+def compile_entity(section, default_type, iri_template, lookups, entities, stats=None, name=None):
+    """Compile one *Mapping section; iri_template=None makes embedded nodes without @id."""
+    section = section or {}
+    emitters = [compile_rule(prop, rule, lookups, entities, stats)
+                for prop, rule in (section.get("properties") or {}).items()]
+    iri = compile_iri(iri_template) if iri_template is not None else None
+    if iri is not None and stats is not None:
+        iri = stats.timed("iri", iri)
+    return {
+        "where": compile_where(section.get("where"), stats, name),
+        "iri": iri,
+        "type": section.get("type", default_type),
+        "emitters": [e for e in emitters if e is not None],
+    }
 
-            cond = rule.get("when")
-            if cond:
-                key = cond.split(".")[-1]
-                if not net.get(key):
+
+def compile_owl_map(cfg, extra_lookups=None, stats=None):
+    """
+    Compile an icdm-to-owl mapping once: where predicates, IRI formatters and one
+    emitter per property, so the per-node loop only does data-dependent work.
+    channelMapping is optional; responseMapping / stageMapping describe the nodes
+    embedded in a Channel. stats (an instrument.ConversionStats) instruments where
+    clauses, lookups and IRI rendering.
+    """
+    iri_policy = cfg.get("iriPolicy", {})
+    epochs = iri_policy.get("epochs", "keep")
+    if epochs not in EPOCH_POLICIES:
+        raise ValueError(f"iriPolicy.epochs must be one of {', '.join(EPOCH_POLICIES)}, not {epochs!r}")
+    lookups = lookup_tables.open_lookups(merge_lookups(cfg, extra_lookups))
+    plan = {
+        "baseId": iri_policy.get("baseId", ""),
+        "resourceBaseId": iri_policy.get("resourceBaseId", iri_policy.get("baseId", "")),
+        "epochs": epochs,
+    }
+
+    def template(key, entity, default):
+        iri = iri_policy.get(key, default)
+        return iri + "${ICDM.%s.epoch}" % entity if epochs == "mint" else iri
+
+    plan["Network"] = compile_entity(cfg.get("networkMapping"), "fdsn:Network",
+                                     template("networkIri", "Network", "${baseId}network/${ICDM.Network.code}"),
+                                     lookups, plan, stats, "Network")
+    plan["Station"] = compile_entity(cfg.get("stationMapping"), "fdsn:Station",
+                                     template("stationIri", "Station",
+                                              "${baseId}station/${ICDM.Network.code}_${ICDM.Station.code}"),
+                                     lookups, plan, stats, "Station")
+    if cfg.get("channelMapping"):
+        plan["Channel"] = compile_entity(
+            cfg["channelMapping"], "fdsn:Channel",
+            template("channelIri", "Channel", "${baseId}channel/${ICDM.Network.code}_${ICDM.Station.code}"
+                                              "_${ICDM.Channel.locationCode}_${ICDM.Channel.code}"),
+            lookups, plan, stats, "Channel")
+        plan["Response"] = compile_entity(cfg.get("responseMapping"), "fdsn:Response", None,
+                                          lookups, plan, stats, "Response")
+        plan["Stage"] = compile_entity(cfg.get("stageMapping"), "fdsn:ResponseStage", None,
+                                       lookups, plan, stats, "Stage")
+    return plan
+
+
+def epoch_suffix(row):
+    """'@<startDate>' of an ICDM row, '' without a start date (for ${ICDM.<Entity>.epoch})."""
+    start = row.get("start")
+    return "@" + start if start else ""
+
+
+def map_node(entity, row, env):
+    iri = entity["iri"]
+    node = {"@id": iri(env), "@type": entity["type"]} if iri is not None else {"@type": entity["type"]}
+    for emit in entity["emitters"]:
+        emit(node, row, env)
+    return node
+
+
+def map_network(plan, net, stations):
+    """
+    Map one network row and its own stations to graph nodes: the network node first, then
+    each station followed by its channels. stations is a list of (station_row, channel_rows)
+    pairs. Children link up via ${networkIri} / ${stationIri} (fdsn:memberOfNetwork,
+    fdsn:memberOfStation); parents can list them back through 'fromChildren' rules.
+    Returns [] if the network is filtered.
+    """
+    net_plan = plan["Network"]
+    sta_plan = plan["Station"]
+    cha_plan = plan.get("Channel")
+    if not net_plan["where"](net):
+        return []
+
+    env = {
+        "baseId": plan["baseId"],
+        "resourceBaseId": plan["resourceBaseId"],
+        "ICDM.Network.code": net.get("code", ""),
+        "ICDM.Network.epoch": epoch_suffix(net),
+    }
+    env["networkIri"] = net_plan["iri"](env)
+
+    sta_where = sta_plan["where"]
+    sta_nodes = []
+    sta_iris = []
+    for st, channels in stations:
+        if not sta_where(st):
+            continue
+        env2 = dict(env)
+        env2["ICDM.Station.code"] = st.get("code", "")
+        env2["ICDM.Station.epoch"] = epoch_suffix(st)
+        env2["stationIri"] = sta_plan["iri"](env2)
+
+        cha_nodes = []
+        if cha_plan is not None:
+            cha_where = cha_plan["where"]
+            for ch in channels:
+                if not cha_where(ch):
                     continue
+                env3 = dict(env2)
+                env3["ICDM.Channel.code"] = ch.get("code", "")
+                env3["ICDM.Channel.locationCode"] = ch.get("locationCode") or ""
+                env3["ICDM.Channel.epoch"] = epoch_suffix(ch)
+                cha_nodes.append(map_node(cha_plan, ch, env3))
+            env2["channelIris"] = [n["@id"] for n in cha_nodes]
+
+        sta_iris.append(env2["stationIri"])
+        sta_nodes.append(map_node(sta_plan, st, env2))
+        sta_nodes.extend(cha_nodes)
+
+    env["stationIris"] = sta_iris
+    return [map_node(net_plan, net, env)] + sta_nodes
+
+
+def group_children(n_parents, rows, index_key):
+    """Index child rows by their parent position (one pass); one list per parent."""
+    by_parent = [[] for _ in range(n_parents)]
+    for row in rows:
+        idx = row.get(index_key)
+        if idx is not None and 0 <= idx < n_parents:
+            by_parent[idx].append(row)
+    return by_parent
+
+
+def _value_key(value):
+    """Hashable identity of a property value for merging, None for embedded nodes and lists."""
+    if type(value) is dict:
+        if "@id" in value and len(value) == 1:
+            return "@id", value["@id"]
+        if "@value" in value and len(value) <= 2 and (len(value) == 1 or "@type" in value):
+            return "@value", value["@value"], value.get("@type")
+        return None
+    if isinstance(value, (str, int, float)):
+        return type(value), value
+    return None
+
 
-            if "from" in rule:
-                key = rule["from"].split(".")[-1]
-                val = net.get(key)
-                if val is None or val == "":
+def merge_node(entry, node):
+    """
+    Merge node into entry = [target node, {key: set of value keys}]: types and values are
+    unioned, keeping first-seen order. IRIs and literals already present are skipped
+    (RDF set semantics); embedded nodes (periods, responses) and lists have no identity
+    and are appended, as they are distinct blank nodes in the unmerged graph too.
+    """
+    target, seen = entry
+    for key, value in node.items():
+        if key == "@id":
+            continue
+        current = target.get(key)
+        if current is None:
+            target[key] = value
+            continue
+        if key == "@type":
+            types = current if type(current) is list else [current]
+            added = [t for t in (value if type(value) is list else [value]) if t not in types]
+            if added:
+                target[key] = types + added
+            continue
+        keys = seen.get(key)
+        if keys is None:
+            keys = seen[key] = {k for k in map(_value_key, current if type(current) is list else [current])
+                                if k is not None}
+        for item in (value if type(value) is list else (value,)):
+            k = _value_key(item)
+            if k is not None:
+                if k in keys:
                     continue
+                keys.add(k)
+            if type(current) is not list:
+                current = target[key] = [current]
+            current.append(item)
 
-                if rule.get("lookup"):
-                    table = lookups.get(rule["lookup"], {})
-                    mapped = table.get(val) or table.get(str(val).lower()) or table.get(str(val).capitalize())
-                    if mapped:
-                        net_node.setdefault(prop, []).append({"@id": mapped})
-                        continue
-
-                if rule.get("type") == "iriOrLiteral" and (isinstance(val, str) and (val.startswith("http://") or val.startswith("https://"))):
-                    net_node.setdefault(prop, []).append({"@id": val})
-                elif "datatype" in rule:
-                    net_node.setdefault(prop, []).append({"@value": val, "@type": rule["datatype"]})
-                else:
-                    net_node.setdefault(prop, []).append(val)
-
-            elif rule.get("build") == "period":
-                args = rule.get("args", [])
-                start = net.get(args[0].split(".")[-1]) if len(args) > 0 else None
-                end   = net.get(args[1].split(".")[-1]) if len(args) > 1 else None
-                period_node = build_period(start, end)
-                net_node.setdefault(prop, []).append(period_node)
-
-        out["@graph"].append(net_node)
-
-        # Stations (simple pairing; in real life link by explicit parent)
-        sta_where = (sta_map or {}).get("where")
-        for st in icdm.get("Station", []):
-            if not _passes_where(st, sta_where):
-                continue
 
-            env2 = {
-                "baseId": baseId,
-                "ICDM.Network.code": net.get("code", ""),
-                "ICDM.Station.code": st.get("code", "")
-            }
-            st_id = render_iri(sta_tpl, env2)
-            st_node = {"@id": st_id, "@type": sta_map.get("type", "fdsn:Station")}
+def merge_epochs(batches):
+    """
+    Merge the nodes that share an @id (the epochs of one code, see EPOCH_POLICIES) in one
+    pass over per-network node lists, through an IRI -> node index. Nodes keep the
+    position of their first epoch. The index spans one run of consecutive networks with
+    the same IRI (network epochs), so memory stays bounded by a run; station and channel
+    IRIs of the default iriPolicy include the network code and never span runs.
+    """
+    run = None
+    index = {}
+    order = []
+    for nodes in batches:
+        if not nodes:
+            continue
+        if nodes[0].get("@id") != run:
+            yield from order
+            run = nodes[0].get("@id")
+            index = {}
+            order = []
+        for node in nodes:
+            iri = node.get("@id")
+            entry = index.get(iri) if iri is not None else None
+            if entry is None:
+                if iri is not None:
+                    index[iri] = [node, {}]
+                order.append(node)
+            else:
+                merge_node(entry, node)
+    yield from order
 
-            for prop, rule in (sta_map.get("properties") or {}).items():
-                if not isinstance(rule, dict):
-                    continue
 
-                if "fromIri" in rule:
-                    st_node.setdefault(prop, []).append({"@id": render_iri(rule["fromIri"], env2)})
+def _network_batches(events, plan):
+    pending = []
+    channels = []
+    for kind, row in events:
+        if kind == "Channel":
+            channels.append(row)
+        elif kind == "Station":
+            pending.append((row, channels))
+            channels = []
+        elif kind == "Network":
+            yield map_network(plan, row, pending)
+            pending = []
 
-                elif "from" in rule:
-                    key = rule["from"].split(".")[-1]
-                    val = st.get(key)
-                    if not val:
-                        continue
 
-                    if rule.get("lookup"):
-                        table = lookups.get(rule["lookup"], {})
-                        mapped = table.get(val) or table.get(str(val).lower()) or table.get(str(val).capitalize())
-                        if mapped:
-                            st_node.setdefault(prop, []).append({"@id": mapped})
-                            continue
+def iter_graph(events, plan):
+    """
+    Map a stream of ("Network"|"Station"|"Channel", row) events from iter_icdm to graph
+    nodes. Children arrive before their parent closes, so only one network's rows are
+    buffered at a time (one run of network epochs with iriPolicy.epochs "merge").
+    """
+    batches = _network_batches(events, plan)
+    if plan.get("epochs") == "merge":
+        return merge_epochs(batches)
+    return (node for nodes in batches for node in nodes)
 
-                    if rule.get("type") == "iriOrLiteral" and (val.startswith("http://") or val.startswith("https://")):
-                        st_node.setdefault(prop, []).append({"@id": val})
-                    elif "datatype" in rule:
-                        st_node.setdefault(prop, []).append({"@value": val, "@type": rule["datatype"]})
-                    else:
-                        st_node.setdefault(prop, []).append(val)
 
-            out["@graph"].append(st_node)
+def apply_plan(icdm, plan, context, compact=True):
+    out = {"@context": context["@context"] if compact else None, "@graph": []}
+    graph = out["@graph"]
+    networks = icdm.get("Network", [])
+    stations = icdm.get("Station", [])
+    channels = group_children(len(stations), icdm.get("Channel", []), "stationIndex")
+    by_net = group_children(len(networks), stations, "networkIndex")
+    # pair each station with its channels by identity (station rows are unique objects)
+    channels_of = {id(st): chs for st, chs in zip(stations, channels)}
+    batches = (map_network(plan, net, [(st, channels_of[id(st)]) for st in members])
+               for net, members in zip(networks, by_net))
+    if plan.get("epochs") == "merge":
+        graph.extend(merge_epochs(batches))
+    else:
+        for nodes in batches:
+            graph.extend(nodes)
 
     if not compact:
         out.pop("@context", None)
     return out
 
 
+def apply_mapping(icdm, owl_map_path, context, compact=True, extra_lookups=None):
+    plan = compile_owl_map(load_mapping(owl_map_path), extra_lookups)
+    return apply_plan(icdm, plan, context, compact=compact)
+
+
+def read_config_files(xml_map_path, owl_map_path, context_path, extra_lookups_path=None):
+    """The parsed mapping inputs: (xml map, owl map, context, extra lookups or None)."""
+    with open(context_path, "r", encoding="utf-8") as f:
+        ctx = json.load(f)
+    return load_xml_map(xml_map_path), load_mapping(owl_map_path), ctx, load_extra_lookups(extra_lookups_path)
+
+
+def build_config(xml_cfg, owl_cfg, ctx, extra=None, stats=None):
+    """Compile parsed mapping inputs (see read_config_files) into the config of convert_stream."""
+    return {
+        "xml_plan": compile_xml_map(xml_cfg, stats=stats),
+        "start_filters": compile_pushdown(xml_cfg, owl_cfg, stats),
+        "owl_plan": compile_owl_map(owl_cfg, extra, stats),
+        "context": ctx,
+        "active_context": jsonld.compile_context(ctx),
+    }
+
+
+def load_config(xml_map_path, owl_map_path, context_path, extra_lookups_path=None, stats=None):
+    """
+    Load and compile every mapping input once; the result is reused across documents.
+    With stats, the compiled plans are instrumented (see instrument.ConversionStats).
+    """
+    return build_config(*read_config_files(xml_map_path, owl_map_path, context_path, extra_lookups_path),
+                        stats=stats)
+
+
 # ---------------------------
-# CLI
+# Precompiled bundle of the mapping inputs (see bundle.py)
 # ---------------------------
 
-def main():
-    ap = argparse.ArgumentParser(description="StationXML to JSON-LD via external mappings")
-    ap.add_argument("--xml", default="examples/sample.stationxml")
-    ap.add_argument("--xml-map", default="mappings/xml-to-icdm.yaml")
-    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.yaml",
-                    help="Can be YAML or JSON")
-    ap.add_argument("--context", default="contexts/context-strict-v1.jsonld")
-    ap.add_argument("--expanded", action="store_true", help="Emit expanded (no @context)")
-    ap.add_argument("--extra-lookups", help="Path to a JSON file with additional lookups to merge", default=None)
-    ap.add_argument("--out", default="build/output.jsonld")
-    args = ap.parse_args()
+MAPPING_SECTIONS = ("networkMapping", "stationMapping", "channelMapping", "responseMapping", "stageMapping")
 
-    with open(args.context, "r", encoding="utf-8") as f:
-        ctx = json.load(f)
 
-    icdm = extract_icdm(args.xml, args.xml_map)
+def check_config(config, owl_cfg, extra=None):
+    """
+    Warnings for mappings that compile but lose data at run time: lookup tables or
+    embedded entities that do not exist, prefixes the context does not define.
+    """
+    active = config["active_context"]
+    tables = merge_lookups(owl_cfg, extra)
+    plan = config["owl_plan"]
+    warnings = []
+
+    def undefined(where, value):
+        prefix, sep, rest = value.partition(":")
+        if value not in active.terms and sep and not rest.startswith("//") and prefix not in active.prefixes:
+            warnings.append(f"{where}: prefix {prefix}: is not defined in the context")
+
+    for section in MAPPING_SECTIONS:
+        sec = owl_cfg.get(section) or {}
+        if sec.get("type"):
+            undefined(f"{section}.type", sec["type"])
+        for prop, rule in (sec.get("properties") or {}).items():
+            where = f"{section}.{prop}"
+            undefined(where, prop)
+            if not isinstance(rule, dict):
+                continue
+            if rule.get("lookup") and rule["lookup"] not in tables:
+                warnings.append(f"{where}: lookup table {rule['lookup']} does not exist")
+            if rule.get("datatype"):
+                undefined(f"{where}.datatype", rule["datatype"])
+            if rule.get("embed") and rule["embed"] not in plan:
+                warnings.append(f"{where}: embedded entity {rule['embed']} has no mapping")
+    return warnings
+
 
-    extra = None
-    if args.extra_lookups:
-        with open(args.extra_lookups, "r", encoding="utf-8") as f:
-            extra = json.load(f)
+def compile_bundle(config_args, out_path, stats=None):
+    """
+    Read, compile and check the mapping inputs of config_args (as for load_config) and
+    write them to a bundle at out_path. Compile errors raise as they would in a run.
+    Returns (config, warnings).
+    """
+    import bundle
+    xml_cfg, owl_cfg, ctx, extra = read_config_files(*config_args)
+    config = build_config(xml_cfg, owl_cfg, ctx, extra, stats)
+    warnings = check_config(config, owl_cfg, extra)
+    files = [p for p in config_args if p] + lookup_tables.external_paths(merge_lookups(owl_cfg, extra)) \
+        + [__file__, jsonld.__file__, lookup_tables.__file__]
+    bundle.write_bundle(out_path, files, {
+        "sources": [os.path.abspath(p) if p else None for p in config_args],
+        "xml_map": xml_cfg,
+        "owl_map": owl_cfg,
+        "context": ctx,
+        "extra_lookups": extra,
+    })
+    return config, warnings
+
+
+def load_bundle(path, config_args, stats=None):
+    """
+    (config, config_args, status) from the bundle at path. config_args are the mapping
+    options as given, None where an option was not given: those are taken from the
+    bundle's sources (CONFIG_DEFAULTS for a new bundle). status is "loaded" for a fresh
+    bundle whose sources match the given options. Otherwise the bundle is (re)compiled:
+    "compiled" when it was missing, "recompiled: <reason>" when it was stale or a given
+    option names another file than the bundle was built from. The returned config_args
+    name the source files, for worker processes and cache keys.
+    """
+    import bundle
+    data, reason = bundle.read_bundle(path)
+    sources = data.get("sources") if data is not None else None
+    if sources:
+        differ = [f"{option} {given} (bundle: {source})"
+                  for option, given, source in zip(CONFIG_OPTIONS, config_args, sources)
+                  if given is not None and os.path.abspath(given) != source]
+        config_args = tuple(source if given is None else given for given, source in zip(config_args, sources))
+        if differ:
+            reason = "options differ from its sources: " + "; ".join(differ)
+        elif reason is None:
+            config = build_config(data["xml_map"], data["owl_map"], data["context"], data["extra_lookups"], stats)
+            return config, config_args, "loaded"
+    else:
+        config_args = tuple(default if given is None else given for given, default in zip(config_args, CONFIG_DEFAULTS))
+    config, _ = compile_bundle(config_args, path, stats)
+    return config, config_args, "compiled" if data is None else f"recompiled: {reason}"
+
+
+# Output forms of the graph nodes:
+# - "compact": compacted against the context (terms such as memberOfNetwork, coerced values)
+# - "expanded": JSON-LD expanded form (absolute IRIs, value objects), no @context needed
+# - "curie": nodes as the mapping emits them (compact IRI keys), with the @context
+OUTPUT_FORMS = ("compact", "expanded", "curie")
+
+
+def node_shaper(config, form="curie"):
+    """Per-node rewrite for an output form, or None when nodes are written as mapped."""
+    if form not in OUTPUT_FORMS:
+        raise ValueError(f"Unknown output form: {form}")
+    if form == "curie":
+        return None
+    active = config["active_context"]
+    return active.compact if form == "compact" else active.expand
+
+
+def document_head(config, form="curie"):
+    """(@context to write or None, key of the node array) for JsonLdStreamWriter."""
+    if form == "expanded":
+        return None, "@graph"
+    if form == "compact":
+        return config["context"]["@context"], config["active_context"].graph_key
+    return config["context"]["@context"], "@graph"
+
+
+def convert_stream(xml_source, config, stats=None, form="curie"):
+    """
+    XML -> ICDM rows -> graph nodes, one network at a time, shaped for the output form
+    (see OUTPUT_FORMS). With stats, parsing, mapping and shaping are timed as the
+    "parse", "map" and "shape" stages and rows / nodes are counted.
+    """
+    shape = node_shaper(config, form)
+    if stats is None:
+        nodes = iter_graph(iter_icdm(xml_source, config["xml_plan"], filters=config.get("start_filters")),
+                           config["owl_plan"])
+        return nodes if shape is None else map(shape, nodes)
+    rows = stats.timed_iter("parse", iter_icdm(xml_source, config["xml_plan"], stats, config.get("start_filters")),
+                            lambda event: "rows." + event[0])
+    nodes = stats.timed_iter("map", iter_graph(rows, config["owl_plan"]),
+                             lambda node: "nodes." + str(node.get("@type")))
+    return nodes if shape is None else map(stats.timed("shape", shape), nodes)
+
+
+# ---------------------------
+# Output
+# ---------------------------
+
+def json_default(obj):
+    """
+    Serialize typed coefficient arrays (array.array / NumPy) as JSON lists. Mapped nodes
+    already carry plain lists; this covers rows or nodes built by hand (stdlib only).
+    """
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
-    data = apply_mapping(icdm, args.owl_map, ctx, compact=(not args.expanded), extra_lookups=extra)
 
-    os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    print("Wrote", args.out)
+JSON_BACKENDS = ("auto", "orjson", "stdlib")
+
+
+def resolved_backend(backend="auto", indent=None):
+    """
+    The encoder json_serializer uses for backend/indent:
+    - "orjson": orjson (several times faster; pretty output only with indent=2)
+    - "stdlib": the json module
+    - "auto": orjson when it is installed and supports indent, else the stdlib
+    """
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    if backend == "stdlib":
+        return "stdlib"
+    if indent not in (None, 2):
+        if backend == "orjson":
+            raise ValueError(f"orjson cannot indent by {indent}")
+        return "stdlib"
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        if backend == "orjson":
+            raise SystemExit("orjson is not installed. Install with: pip install orjson")
+        return "stdlib"
+    return "orjson"
+
+
+def json_serializer(indent=None, backend="auto"):
+    """
+    Encoder obj -> str; indent=None is compact. For indent=2 both backends produce the
+    same text except for float spelling (e.g. 1e-05 vs 0.00001).
+    orjson gets no default= callback: it is slower, and the callback path of the orjson
+    releases we run on is not safe when several threads serialize at once (serve.py,
+    fetch.py). Nodes from map_node hold plain lists, so it is never needed.
+    """
+    if resolved_backend(backend, indent) == "orjson":
+        import orjson
+        dumps = orjson.dumps
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return lambda obj: dumps(obj, option=option).decode("utf-8")
+    if indent is None:
+        kw = {"ensure_ascii": False, "separators": (",", ":"), "default": json_default}
+    else:
+        kw = {"ensure_ascii": False, "indent": indent, "default": json_default}
+    return lambda obj: json.dumps(obj, **kw)
+
+
+class JsonLdStreamWriter:
+    """
+    Incremental JSON-LD output.
+    - fmt="jsonld": one valid document; the @context header is written once, then each
+      @graph node is appended as it is produced. With indent=2 the bytes match
+      json.dump({"@context": ..., "@graph": [...]}, indent=2); indent=None is compact.
+    - fmt="ndjson": NDJSON-LD, one node object per line (apply the context out of band).
+    Only the node being written is ever serialized (once), so memory stays flat.
+    backend picks the encoder (see json_serializer); graph_key names the node array
+    (the context's alias of @graph in compact form, see document_head).
+    """
+
+    def __init__(self, fp, context=None, fmt="jsonld", indent=None, backend="auto", graph_key="@graph"):
+        self.fp = fp
+        self.fmt = fmt
+        self.indent = indent
+        self.graph_key = graph_key
+        self.count = 0
+        self.dumps = self.node_dumper(fmt, indent, backend)
+        if fmt == "jsonld":
+            self._write_header(context)
+        elif fmt != "ndjson":
+            raise ValueError(f"Unknown output format: {fmt}")
+
+    @staticmethod
+    def node_dumper(fmt="jsonld", indent=None, backend="auto"):
+        """Serializer for nodes passed to write_serialized (e.g. from worker processes)."""
+        return json_serializer(None if fmt == "ndjson" else indent, backend)
+
+    def _write_header(self, context):
+        if self.indent is None:
+            head = "{"
+            if context is not None:
+                head += '"@context":' + self.dumps(context) + ","
+            self.fp.write(head + json.dumps(self.graph_key) + ':[')
+            self._pad, self._close, self._close_empty = "\n", "\n]}\n", "]}\n"
+            return
+        pad = " " * self.indent
+        head = "{\n"
+        if context is not None:
+            head += pad + '"@context": ' + self.dumps(context).replace("\n", "\n" + pad) + ",\n"
+        self.fp.write(head + pad + json.dumps(self.graph_key) + ': [')
+        self._pad, self._close, self._close_empty = "\n" + pad * 2, "\n" + pad + "]\n}", "]\n}"
+
+    def write(self, node):
+        self.write_serialized(self.dumps(node))
+
+    def write_serialized(self, text):
+        if self.fmt == "ndjson":
+            self.fp.write(text + "\n")
+        else:
+            if self.indent is not None:
+                text = text.replace("\n", self._pad)
+            self.fp.write(("," if self.count else "") + self._pad + text)
+        self.count += 1
+
+    def close(self):
+        if self.fmt == "jsonld":
+            self.fp.write(self._close if self.count else self._close_empty)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# line-based RDF output straight from the mapping nodes (see rdf.py)
+RDF_FORMATS = ("nt", "nq")
+
+
+def open_writer(fp, config, fmt="jsonld", indent=None, backend="auto", form="curie", graph=None):
+    """JsonLdStreamWriter for jsonld/ndjson, rdf.TripleWriter for nt/nq (form is ignored)."""
+    if fmt in RDF_FORMATS:
+        from rdf import TripleSerializer, TripleWriter
+        return TripleWriter(fp, TripleSerializer(config["active_context"], graph if fmt == "nq" else None))
+    context, graph_key = document_head(config, form)
+    return JsonLdStreamWriter(fp, context, fmt=fmt, indent=indent, backend=backend, graph_key=graph_key)
+
+
+def open_output(path):
+    if path == "-":
+        return sys.stdout
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return open(path, "w", encoding="utf-8")
+
+
+# ---------------------------
+# Parallel: split one document on Network boundaries
+# ---------------------------
+
+_NET_START = re.compile(rb"<(?:[A-Za-z_][\w.-]*:)?Network[\s>/]")
+_NET_END = re.compile(rb"</(?:[A-Za-z_][\w.-]*:)?Network\s*>")
+# the rest of a tag up to its closing '>', which may also appear in quoted attribute values
+_TAG_REST = rb"""(?:[^>"']|"[^"]*"|'[^']*')*>"""
+_TAG_END = re.compile(_TAG_REST)
+_ROOT_START = re.compile(rb"<([A-Za-z_][^\s>/]*)" + _TAG_REST)
+
+_split_worker = {}
+
+
+def document_frame(buf):
+    """
+    (header, footer) to wrap a Network byte range into a standalone document: the prolog
+    and root start tag (keeps encoding and namespace declarations) and the root end tag.
+    """
+    m = _ROOT_START.search(buf)
+    if not m:
+        raise ValueError("No root element found")
+    return bytes(buf[:m.end()]), b"</" + m.group(1) + b">"
+
+
+def _tag_end(buf, pos):
+    """Offset just past the tag starting at pos (quoted values may contain '>'), or -1."""
+    m = _TAG_END.match(buf, pos)
+    return m.end() if m else -1
+
+
+def _next_tag(buf, pattern, pos):
+    """
+    First match of a Network start / end tag pattern at or after pos. Candidates are the
+    occurrences of b"Network", matched from the '<' before each: bytes.find is far
+    faster than searching with the pattern, which tries every '<'.
+    """
+    while True:
+        i = buf.find(b"Network", pos)
+        if i < 0:
+            return None
+        lt = buf.rfind(b"<", pos, i)
+        m = pattern.match(buf, lt) if lt >= 0 else None
+        if m is not None and m.end() > i:
+            return m
+        pos = i + 7
+
+
+def network_ranges(buf):
+    """
+    Byte ranges [start, end) of the <Network> elements, found by scanning tags without
+    parsing. Networks do not nest in StationXML; tags inside comments/CDATA are not
+    special-cased.
+    """
+    ranges = []
+    pos = 0
+    while True:
+        m = _next_tag(buf, _NET_START, pos)
+        if not m:
+            return ranges
+        stop = _tag_end(buf, m.start())
+        if stop < 0:
+            raise ValueError(f"Unterminated <Network> start tag at byte {m.start()}")
+        if buf[stop - 2:stop - 1] == b"/":
+            end = stop
+        else:
+            e = _next_tag(buf, _NET_END, stop)
+            if not e:
+                raise ValueError(f"Unterminated <Network> at byte {m.start()}")
+            end = e.end()
+        ranges.append((m.start(), end))
+        pos = end
+
+
+_NET_CODE = re.compile(rb"""\scode\s*=\s*(["'])(.*?)\1""", re.S)
+
+
+def network_runs(buf, ranges):
+    """
+    Coalesce adjacent network ranges with the same code attribute (the epochs of one
+    network), so merging epochs (iriPolicy.epochs "merge") sees a whole run per task
+    and per cache entry.
+    """
+    runs = []
+    last = None
+    for start, end in ranges:
+        m = _NET_CODE.search(buf, start, _tag_end(buf, start))
+        code = m.group(2) if m else None
+        if runs and code is not None and code == last:
+            runs[-1] = (runs[-1][0], end)
+        else:
+            runs.append((start, end))
+        last = code
+    return runs
+
+
+def kept_networks(buf, header, footer, ranges, keep):
+    """
+    The network ranges whose start tag passes keep (a compile_pushdown filter). A start
+    tag that does not parse on its own is kept; the conversion reports any real error.
+    """
+    kept = []
+    for start, end in ranges:
+        stop = _tag_end(buf, start)
+        if stop < 0:
+            kept.append((start, end))
+            continue
+        try:
+            elem = ET.fromstring(header + bytes(buf[start:stop - 1]).rstrip(b"/") + b"/>" + footer)[0]
+        except ET.ParseError:
+            elem = None
+        if elem is None or keep(elem):
+            kept.append((start, end))
+    return kept
+
+
+def trim_runs(runs, kept):
+    """
+    Each run (see network_runs) narrowed to its first and last kept network range; runs
+    with none kept are dropped. Runs are coalesced before filtering, so epochs a rejected
+    network separates in the document stay in separate runs.
+    """
+    trimmed = []
+    i = 0
+    for start, end in runs:
+        inside = []
+        while i < len(kept) and kept[i][0] < end:
+            inside.append(kept[i])
+            i += 1
+        if inside:
+            trimmed.append((inside[0][0], inside[-1][1]))
+    return trimmed
+
+
+class _RangeReader:
+    """Binary file object over byte ranges of a buffer, in order; closes it at the end."""
+
+    def __init__(self, buf, ranges):
+        self.buf = buf
+        self.ranges = deque(ranges)
+
+    def read(self, size=-1):
+        while self.ranges:
+            start, end = self.ranges[0]
+            if size is None or size < 0 or start + size >= end:
+                self.ranges.popleft()
+            else:
+                end = start + size
+                self.ranges[0] = (end, self.ranges[0][1])
+            if end > start:
+                return self.buf[start:end]
+        if not self.buf.closed:
+            self.buf.close()
+        return b""
+
+
+def select_networks(path, keep):
+    """
+    Binary file object over the document at path without the <Network> elements whose
+    start tag keep rejects, so their bytes are never parsed. None when none is rejected
+    or the document cannot be scanned (it is then parsed as it is).
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return None
+    try:
+        header, footer = document_frame(mm)
+        ranges = network_ranges(mm)
+        kept = kept_networks(mm, header, footer, ranges, keep)
+    except (ValueError, ET.ParseError):
+        kept = ranges = ()
+    if len(kept) == len(ranges):
+        mm.close()
+        return None
+    kept = set(kept)
+    pieces = []
+    pos = 0
+    for start, end in ranges:
+        if (start, end) not in kept:
+            pieces.append((pos, start))
+            pos = end
+    pieces.append((pos, len(mm)))
+    return _RangeReader(mm, pieces)
+
+
+def group_ranges(ranges, min_bytes):
+    """Coalesce adjacent network ranges into tasks of at least min_bytes each."""
+    groups = []
+    for start, end in ranges:
+        if groups and groups[-1][1] - groups[-1][0] < min_bytes:
+            groups[-1] = (groups[-1][0], end)
+        else:
+            groups.append((start, end))
+    return groups
+
+
+def _init_split_worker(config_args, header, footer, fmt, indent, backend="auto", config=None, stats=None,
+                       form="curie", graph=None, index=False):
+    _split_worker["config"] = config if config is not None else load_config(*config_args)
+    if index:
+        from sidecar import NodeFields
+        _split_worker["fields"] = NodeFields(_split_worker["config"]["active_context"])
+    else:
+        _split_worker["fields"] = None
+    _split_worker["stats"] = stats
+    _split_worker["form"] = "curie" if fmt in RDF_FORMATS else form
+    _split_worker["frame"] = (header, footer)
+    if fmt in RDF_FORMATS:
+        from rdf import TripleSerializer
+        _split_worker["dumps"] = TripleSerializer(_split_worker["config"]["active_context"],
+                                                  graph if fmt == "nq" else None)
+    else:
+        _split_worker["dumps"] = JsonLdStreamWriter.node_dumper(fmt, indent, backend)
+
+
+def _convert_range(task):
+    """
+    Worker: extract + map one range of networks, return serialized nodes, or
+    [text, sidecar.NodeFields entry] pairs when indexing.
+    """
+    path, start, end, key = task
+    header, footer = _split_worker["frame"]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        doc = header + mm[start:end] + footer
+    dumps = _split_worker["dumps"]
+    if hasattr(dumps, "reset"):
+        # blank node labels unique per range: cached text is reused at other offsets
+        dumps.reset(key[:16] if key is not None else str(start))
+    nodes = convert_stream(io.BytesIO(doc), _split_worker["config"], _split_worker["stats"],
+                           _split_worker["form"])
+    fields = _split_worker["fields"]
+    if fields is not None:
+        return [[dumps(node), fields(node)] for node in nodes]
+    return [dumps(node) for node in nodes]
+
+
+def _done(result):
+    from concurrent.futures import Future
+    fut = Future()
+    fut.set_result(result)
+    return fut
+
+
+class _InlineExecutor:
+    """Runs tasks in-process at submit time (jobs <= 1)."""
+
+    def submit(self, fn, *args):
+        return _done(fn(*args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def cache_salt(config_args, fmt, indent, backend="auto", form="curie", graph=None, index=False):
+    """Everything besides the Network bytes that the cached node texts depend on."""
+    from netcache import digest, file_digest
+    import rdf
+    owl_map_path = config_args[1]
+    extra_lookups_path = config_args[3] if len(config_args) > 3 else None
+    tables = lookup_tables.external_paths(
+        merge_lookups(load_mapping(owl_map_path), load_extra_lookups(extra_lookups_path)))
+    return digest(file_digest(*config_args, __file__, lookup_tables.__file__, jsonld.__file__, rdf.__file__), fmt,
+                  repr(indent), resolved_backend(backend, indent), form, graph or "", "index" if index else "",
+                  lookup_tables.table_signature(tables))
+
+
+def convert_ranges(xml_path, config_args, jobs=1, fmt="jsonld", indent=None, min_bytes=8 << 20,
+                   cache=None, config=None, stats=None, backend="auto", form="curie", graph=None, index=False):
+    """
+    Convert one document range by range: memory-map it, locate <Network> byte ranges and
+    convert groups of them in worker processes (jobs > 1) or in-process. With a
+    netcache.NetworkCache each Network is its own range keyed by content hash: hits are
+    served from disk and only changed networks are converted.
+    Yields serialized nodes in document order; at most 2 * jobs ranges are in flight,
+    bounding parent memory. stats only sees in-process conversions (jobs <= 1).
+    For nt/nq, blank node labels are scoped per range so they stay unique in the output.
+    Networks rejected by a start-tag filter of config (see compile_pushdown) are dropped
+    before any task is made. With index, yields [text, sidecar.NodeFields entry] pairs instead.
+    """
+    with open(xml_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header, footer = document_frame(mm)
+        ranges = network_ranges(mm)
+        runs = network_runs(mm, ranges)
+        keep = (config or {}).get("start_filters", {}).get("Network")
+        if keep is not None:
+            runs = trim_runs(runs, kept_networks(mm, header, footer, ranges, keep))
+        if cache is None:
+            tasks = [(xml_path, s, e, None) for s, e in group_ranges(runs, min_bytes)]
+        else:
+            from netcache import digest
+            salt = cache_salt(config_args, fmt, indent, backend, form, graph, index)
+            tasks = [(xml_path, s, e, digest(salt, header, mm[s:e])) for s, e in runs]
+
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_split_worker,
+                                       initargs=(config_args, header, footer, fmt, indent, backend,
+                                                 None, None, form, graph, index))
+    else:
+        _init_split_worker(config_args, header, footer, fmt, indent, backend, config, stats, form, graph, index)
+        executor = _InlineExecutor()
+
+    def submit(pool, task):
+        key = task[3]
+        if key is not None:
+            texts = cache.get(key)
+            if texts is not None:
+                return key, _done(texts), False
+        return key, pool.submit(_convert_range, task), key is not None
+
+    with executor as pool:
+        todo = iter(tasks)
+        pending = deque(submit(pool, t) for t in islice(todo, 2 * max(jobs, 1)))
+        while pending:
+            key, fut, store = pending.popleft()
+            texts = fut.result()
+            if store:
+                cache.put(key, texts)
+            yield from texts
+            for task in islice(todo, 1):
+                pending.append(submit(pool, task))
+
+
+def indexed_writer(write, sink, index, fields=None):
+    """
+    Wrap a writer's write / write_serialized to record each node's byte range in a
+    sidecar.SidecarIndex. Items are nodes (fields: their NodeFields) or, from
+    convert_ranges(index=True), [text, entry] pairs.
+    """
+    def write_indexed(item):
+        start = sink.pos
+        if fields is not None:
+            write(item)
+            index.add(start, sink.pos, fields(item))
+        else:
+            write(item[0])
+            index.add(start, sink.pos, item[1])
+    return write_indexed
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+DEFAULT_BUNDLE = "build/config.bundle.json"
+# --xml-map, --owl-map, --context, --extra-lookups: the config_args of load_config
+CONFIG_OPTIONS = ("--xml-map", "--owl-map", "--context", "--extra-lookups")
+CONFIG_DEFAULTS = ("mappings/xml-to-icdm.yaml", "mappings/icdm-to-owl.json", "contexts/context-strict-v1.jsonld", None)
+
+
+def compile_main(argv):
+    import argparse
+    ap = argparse.ArgumentParser(prog="convert.py compile",
+                                 description="Validate the mapping inputs and write a precompiled bundle")
+    ap.add_argument("--xml-map", default=CONFIG_DEFAULTS[0])
+    ap.add_argument("--owl-map", default=CONFIG_DEFAULTS[1], help="Can be YAML or JSON")
+    ap.add_argument("--context", default=CONFIG_DEFAULTS[2])
+    ap.add_argument("--extra-lookups", default=CONFIG_DEFAULTS[3])
+    ap.add_argument("--out", default=DEFAULT_BUNDLE, help="Bundle to write")
+    ap.add_argument("--strict", action="store_true", help="Exit with 1 if there are warnings")
+    args = ap.parse_args(argv)
+
+    try:
+        _, warnings = compile_bundle((args.xml_map, args.owl_map, args.context, args.extra_lookups), args.out)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise SystemExit(f"Invalid configuration: {type(e).__name__}: {e}")
+    for w in warnings:
+        print("warning:", w, file=sys.stderr)
+    print(f"Wrote {args.out} ({len(warnings)} warnings)")
+    return 1 if warnings and args.strict else 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compile"]:
+        return compile_main(argv[1:])
+    if argv[:1] == ["query"]:
+        from sidecar import query_main
+        return query_main(argv[1:])
+    import argparse
+    ap = argparse.ArgumentParser(description="StationXML to JSON-LD via external mappings",
+                                 epilog="`convert.py compile --help`: write a precompiled bundle for --bundle; "
+                                        "`convert.py query --help`: read nodes through an --index")
+    ap.add_argument("--xml", default="examples/sample.stationxml")
+    # None when not given: with --bundle, only the given mapping options are checked
+    ap.add_argument("--xml-map", help=f"(default {CONFIG_DEFAULTS[0]})")
+    ap.add_argument("--owl-map", help=f"Can be YAML or JSON (default {CONFIG_DEFAULTS[1]})")
+    ap.add_argument("--context", help=f"(default {CONFIG_DEFAULTS[2]})")
+    ap.add_argument("--bundle", nargs="?", const=DEFAULT_BUNDLE,
+                    help=f"Load the mapping inputs from a bundle (default {DEFAULT_BUNDLE}); it is "
+                         "compiled from the mapping options if missing, rebuilt if stale or if a "
+                         "given mapping option names another file than it was built from")
+    form = ap.add_mutually_exclusive_group()
+    form.add_argument("--expanded", action="store_true", help="Emit JSON-LD expanded form (no @context)")
+    form.add_argument("--curie", action="store_true",
+                      help="Emit nodes as mapped (compact IRI keys) instead of compacting to the context terms")
+    ap.add_argument("--extra-lookups", help="Path to a JSON file with additional lookups to merge", default=None)
+    ap.add_argument("--format", choices=["jsonld", "ndjson"] + list(RDF_FORMATS), default="jsonld",
+                    help="jsonld: one document; ndjson: one @graph node per line; nt / nq: N-Triples / N-Quads")
+    ap.add_argument("--graph", help="With --format nq: IRI of the named graph for every quad")
+    ap.add_argument("--out", default="build/output.jsonld", help="Output path, or - for stdout")
+    ap.add_argument("--pretty", action="store_true", help="Indent the output (default: compact)")
+    ap.add_argument("--index", nargs="?", const="",
+                    help="Write a sidecar index (lat/lon grid, operational periods, IRI -> byte offset) "
+                         "for `convert.py query`, by default to <out>.idx.json")
+    ap.add_argument("--json-backend", choices=JSON_BACKENDS, default="auto",
+                    help="JSON encoder: orjson when installed (auto), or force one")
+    ap.add_argument("-j", "--jobs", type=int, default=1,
+                    help="Split the document on Network boundaries across this many processes")
+    ap.add_argument("--split-bytes", type=int, default=8 << 20,
+                    help="With --jobs > 1: minimum bytes of XML per worker task")
+    ap.add_argument("--cache", help="Directory of a per-Network conversion cache (content-hash keyed)")
+    ap.add_argument("--cache-max-bytes", type=int, default=None,
+                    help="Evict least recently used cache entries beyond this size")
+    ap.add_argument("--stats", help="Write a JSON report of per-stage timings and counters here (- for stderr)")
+    ap.add_argument("--stats-memory", action="store_true", help="With --stats: trace peak Python memory")
+    ap.add_argument("--stats-hook", help="With --stats: call module:function with the report dict")
+    args = ap.parse_args(argv)
+
+    stats = None
+    if args.stats:
+        from instrument import ConversionStats, load_hook
+        stats = ConversionStats(trace_memory=args.stats_memory,
+                                hook=load_hook(args.stats_hook) if args.stats_hook else None)
+
+    config_args = (args.xml_map, args.owl_map, args.context, args.extra_lookups)
+    log = sys.stderr if args.out == "-" else sys.stdout
+    if args.bundle:
+        load = load_bundle if stats is None else stats.timed("load", load_bundle)
+        config, config_args, status = load(args.bundle, config_args, stats)
+        if status != "loaded":
+            print(f"Bundle {args.bundle} {status}", file=log)
+    else:
+        config_args = tuple(default if given is None else given for given, default in zip(config_args, CONFIG_DEFAULTS))
+        if stats is None:
+            config = load_config(*config_args)
+        else:
+            config = stats.timed("load", load_config)(*config_args, stats)
+    form = "expanded" if args.expanded else "curie" if args.curie else "compact"
+    if args.format in RDF_FORMATS:
+        form = "curie"  # triples come from the mapped nodes as they are
+    if args.graph and args.format != "nq":
+        ap.error("--graph needs --format nq")
+    if args.index is not None and args.out == "-":
+        ap.error("--index needs an output file")
+    indent = 2 if args.pretty else None
+
+    cache = None
+    if args.cache:
+        from netcache import NetworkCache
+        cache = NetworkCache(args.cache, args.cache_max_bytes)
+
+    fp = open_output(args.out)
+    index = sink = None
+    if args.index is not None:
+        from sidecar import ByteCounter, SidecarIndex
+        index = SidecarIndex(config["active_context"], args.format, indent)
+        sink = ByteCounter(fp)
+    try:
+        with open_writer(sink or fp, config, args.format, indent, args.json_backend, form, args.graph) as writer:
+            ranged = args.jobs > 1 or cache is not None
+            write = writer.write_serialized if ranged else writer.write
+            if stats is not None:
+                write = stats.timed("serialize", write)
+            if index is not None:
+                write = indexed_writer(write, sink, index, None if ranged else index.fields)
+            if ranged:
+                items = convert_ranges(args.xml, config_args, args.jobs, args.format, indent, args.split_bytes,
+                                       cache=cache, config=config, stats=stats, backend=args.json_backend,
+                                       form=form, graph=args.graph, index=index is not None)
+            else:
+                items = convert_stream(args.xml, config, stats, form)
+            for item in items:
+                write(item)
+    finally:
+        if fp is not sys.stdout:
+            fp.close()
+    print("Wrote", args.out, file=log)
+    if index is not None:
+        from sidecar import index_path
+        path = args.index or index_path(args.out)
+        print(f"Indexed {index.save(path, args.out, sink.pos)} nodes in {path}", file=log)
+    if cache is not None:
+        cache.evict()
+        print("Cache:", json.dumps(cache.report()), file=log)
+    if stats is not None:
+        extra = {"input": args.xml, "jobs": args.jobs, "nodesWritten": writer.count}
+        if cache is not None:
+            extra["cache"] = cache.report()
+        text = json.dumps(stats.finish(**extra), indent=2)
+        if args.stats == "-":
+            print(text, file=sys.stderr)
+        else:
+            with open_output(args.stats) as f:
+                f.write(text + "\n")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fetch StationXML from fdsnws-station services and convert it while it downloads.
+- Sources: URLs on the command line and/or a --sources file (one URL per line, # starts a
+  comment), typically fdsnws-station queries such as
+  https://service.example.org/fdsnws/station/1/query?net=XX&level=channel
+- One asyncio event loop downloads over pooled keep-alive HTTP/1.1 connections (stdlib
+  only, gzip accepted), with at most --per-host requests per host at once. Connection
+  errors, timeouts, 429 and 5xx are retried with exponential backoff (Retry-After wins).
+- Each response body is fed chunk by chunk to convert_stream on a converter thread (at
+  most --jobs sources at once), so downloads overlap with extraction and mapping and
+  nothing lands on disk first. A bounded buffer per source applies back-pressure. A
+  download that fails midway is retried from the start; its partial output is dropped.
+- fdsnws "no data" (204, or 404 with nodata=404) converts to an empty graph.
+- Output: one file per source under --out-dir, or one merged graph (--merge) with the
+  sources in the order given. A JSON summary is printed as by batch.py.
+
+  python3 src/fetch.py --sources datacenters.txt --per-host 2 --jobs 4 --merge build/all.jsonld
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import ssl
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from convert import (JSON_BACKENDS, JsonLdStreamWriter, convert_stream, document_head, load_config,
+                     open_output)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+NO_DATA_STATUS = {204, 404}
+REDIRECT_STATUS = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+READ_BYTES = 64 << 10
+USER_AGENT = "stationxml-to-jsonld-fetch"
+
+
+class FetchError(Exception):
+    """A failed request; retry tells whether another attempt may succeed."""
+
+    def __init__(self, message, retry=False, retry_after=None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+def read_sources(path):
+    """URLs of a sources file, one per line; blank lines and # comments are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.split("#", 1)[0].strip() for line in f if line.split("#", 1)[0].strip()]
+
+
+# ---------------------------
+# HTTP/1.1 client on asyncio streams
+# ---------------------------
+
+class HostPool:
+    """Idle keep-alive connections per (scheme, host, port); per_host requests at once."""
+
+    def __init__(self, per_host=2, timeout=60.0):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.opened = 0
+        self.reused = 0
+        self._limits = {}
+        self._idle = {}
+        self._ssl = None
+
+    def limit(self, key):
+        sem = self._limits.get(key)
+        if sem is None:
+            sem = self._limits[key] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    async def connect(self, key, fresh=False):
+        """(reader, writer, reused): an idle connection to key, else a new one."""
+        idle = self._idle.get(key)
+        while idle and not fresh:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reused += 1
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        if scheme == "https" and self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self._ssl if scheme == "https" else None), self.timeout)
+        self.opened += 1
+        return reader, writer, False
+
+    def release(self, key, reader, writer, reusable):
+        if reusable and not writer.is_closing():
+            self._idle.setdefault(key, []).append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        for conns in self._idle.values():
+            for _, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+
+class Response:
+    """Status and headers of a GET; body() streams the decoded body, close() ends it."""
+
+    def __init__(self, pool, key, reader, writer, status, headers):
+        self.pool = pool
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self.status = status
+        self.headers = headers
+        self._open = True
+
+    def close(self, reusable=False):
+        if self._open:
+            self._open = False
+            self.pool.release(self.key, self.reader, self.writer, reusable)
+            self.pool.limit(self.key).release()
+
+    async def _read(self, n):
+        data = await asyncio.wait_for(self.reader.read(n), self.pool.timeout)
+        if not data:
+            raise FetchError("Connection closed mid-body", retry=True)
+        return data
+
+    async def _sized(self, length):
+        while length > 0:
+            data = await self._read(min(length, READ_BYTES))
+            length -= len(data)
+            yield data
+
+    async def _chunked(self):
+        timeout = self.pool.timeout
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), timeout)
+            if not line:
+                raise FetchError("Connection closed mid-body", retry=True)
+            size = int(line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                while line not in (b"\r\n", b"\n", b""):  # trailers
+                    line = await asyncio.wait_for(self.reader.readline(), timeout)
+                return
+            async for data in self._sized(size):
+                yield data
+            await asyncio.wait_for(self.reader.readexactly(2), timeout)
+
+    async def _until_eof(self):
+        while True:
+            data = await asyncio.wait_for(self.reader.read(READ_BYTES), self.pool.timeout)
+            if not data:
+                return
+            yield data
+
+    async def body(self):
+        headers = self.headers
+        reusable = headers.get("connection", "").lower() != "close"
+        if self.status in (204, 304):
+            raw = None
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            raw = self._chunked()
+        elif "content-length" in headers:
+            raw = self._sized(int(headers["content-length"]))
+        else:
+            raw, reusable = self._until_eof(), False
+        gzipped = headers.get("content-encoding", "").lower() in ("gzip", "x-gzip")
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+        done = False
+        try:
+            if raw is not None:
+                async for data in raw:
+                    if decoder is not None:
+                        data = decoder.decompress(data)
+                    if data:
+                        yield data
+            if decoder is not None:
+                tail = decoder.flush()
+                if tail:
+                    yield tail
+            done = True
+        finally:
+            self.close(reusable and done)
+
+
+async def _request(reader, writer, url, timeout):
+    parts = urlsplit(url)
+    target = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+    writer.write((f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: {USER_AGENT}\r\n"
+                  "Accept: application/xml\r\nAccept-Encoding: gzip\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+    line = await asyncio.wait_for(reader.readline(), timeout)
+    if not line:
+        raise ConnectionResetError("Connection closed before the response")
+    fields = line.decode("latin-1").split(None, 2)
+    if len(fields) < 2 or not fields[1].isdigit():
+        raise FetchError(f"Bad status line {line[:80]!r}")
+    headers = {}
+    while True:
+        line = await asyncio.wait_for(reader.readline(), timeout)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return int(fields[1]), headers
+
+
+async def open_url(pool, url):
+    """
+    GET url over the pool, following redirects. The returned Response holds its host
+    slot and connection until its body is read or it is closed.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise FetchError(f"Unsupported URL: {url}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        await pool.limit(key).acquire()
+        try:
+            reader, writer, reused = await pool.connect(key)
+            try:
+                status, headers = await _request(reader, writer, url, pool.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # the server dropped an idle connection: once more on a new one
+                reader, writer, _ = await pool.connect(key, fresh=True)
+                status, headers = await _request(reader, writer, url, pool.timeout)
+        except BaseException:
+            pool.limit(key).release()
+            raise
+        response = Response(pool, key, reader, writer, status, headers)
+        if status in REDIRECT_STATUS and "location" in headers:
+            async for _ in response.body():
+                pass
+            url = urljoin(url, headers["location"])
+            continue
+        return response
+    raise FetchError(f"Too many redirects: {url}")
+
+
+# ---------------------------
+# Download -> converter thread
+# ---------------------------
+
+class _Feed:
+    """
+    Body bytes handed from the event loop to a converter thread. The thread side is a
+    file object (read) for convert_stream; the loop side puts chunks, at most `limit`
+    ahead of the reader, then finishes with EOF or an error to raise in the thread.
+    """
+
+    def __init__(self, loop, limit=16):
+        self.loop = loop
+        self.limit = limit
+        self.received = 0
+        self.closed = False
+        self._chunks = deque()
+        self._rest = b""
+        self._eof = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._space = asyncio.Event()
+        self._space.set()
+
+    async def put(self, data):
+        """Queue data; False once the converter stopped reading (it finished or failed)."""
+        while True:
+            with self._cond:
+                if self.closed:
+                    return False
+                if len(self._chunks) < self.limit:
+                    self._chunks.append(data)
+                    self.received += len(data)
+                    self._cond.notify()
+                    return True
+                self._space.clear()
+            await self._space.wait()
+
+    def finish(self, error=None):
+        with self._cond:
+            self._eof = True
+            self._error = error
+            self._cond.notify()
+
+    def read(self, size=-1):
+        data = self._rest
+        if not data:
+            with self._cond:
+                while not self._chunks and not self._eof:
+                    self._cond.wait()
+                if self._chunks:
+                    data = self._chunks.popleft()
+                    self.loop.call_soon_threadsafe(self._space.set)
+                elif self._error is not None:
+                    raise self._error
+        if size is not None and 0 <= size < len(data):
+            data, self._rest = data[:size], data[size:]
+        else:
+            self._rest = b""
+        return data
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+        self.loop.call_soon_threadsafe(self._space.set)
+
+
+class _NodeTexts:
+    """Writer stand-in collecting serialized nodes, for --merge."""
+
+    def __init__(self, dumps):
+        self.dumps = dumps
+        self.texts = []
+
+    @property
+    def count(self):
+        return len(self.texts)
+
+    def write(self, node):
+        self.texts.append(self.dumps(node))
+
+    def close(self):
+        pass
+
+
+def _convert_feed(feed, config, form, writer):
+    """Converter thread: map the feed into writer; returns the node count."""
+    try:
+        for node in convert_stream(feed, config, form=form):
+            writer.write(node)
+        writer.close()
+        return writer.count
+    finally:
+        feed.close()
+
+
+def output_path(index, url, out_dir, fmt):
+    """<out_dir>/<index>_<host and query>.jsonld: unique and readable."""
+    parts = urlsplit(url)
+    slug = re.sub(r"[^A-Za-z0-9.=-]+", "_", f"{parts.hostname}_{parts.query or parts.path}").strip("_")[:100]
+    return os.path.join(out_dir, f"{index:03d}_{slug}" + (".ndjson" if fmt == "ndjson" else ".jsonld"))
+
+
+class Pipeline:
+    """Downloads and conversions of one run: shared pool, limits, config and output options."""
+
+    def __init__(self, config, executor, pool, jobs=4, retries=3, backoff=1.0, fmt="jsonld",
+                 form="compact", indent=None, backend="auto"):
+        self.config = config
+        self.executor = executor
+        self.pool = pool
+        self.slots = asyncio.Semaphore(jobs)
+        self.retries = retries
+        self.backoff = backoff
+        self.fmt = fmt
+        self.form = form
+        self.indent = indent
+        self.backend = backend
+        self.head = document_head(config, form)
+
+    def _writer(self, dest):
+        if dest is None:
+            return _NodeTexts(JsonLdStreamWriter.node_dumper(self.fmt, self.indent, self.backend)), None
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        fp = open(dest + ".part", "w", encoding="utf-8")
+        context, graph_key = self.head
+        return JsonLdStreamWriter(fp, context, fmt=self.fmt, indent=self.indent, backend=self.backend,
+                                  graph_key=graph_key), fp
+
+    async def _attempt(self, url, dest, result):
+        """One download + conversion; returns the writer, raises FetchError / conversion errors."""
+        loop = asyncio.get_running_loop()
+        response = await open_url(self.pool, url)
+        result["status"] = response.status
+        if response.status in RETRY_STATUS or (response.status >= 400 and response.status not in NO_DATA_STATUS):
+            response.close()
+            retry_after = response.headers.get("retry-after", "")
+            raise FetchError(f"HTTP {response.status}", retry=response.status in RETRY_STATUS,
+                             retry_after=float(retry_after) if retry_after.isdigit() else None)
+        writer, fp = self._writer(dest)
+        if response.status in NO_DATA_STATUS:
+            # read only to keep the connection; the output is an empty graph
+            try:
+                async for _ in response.body():
+                    pass
+            finally:
+                response.close()
+                writer.close()
+                if fp is not None:
+                    fp.close()
+            result.update(nodeCount=0, bytes=0, noData=True)
+            return writer
+        feed = _Feed(loop)
+        converted = loop.run_in_executor(self.executor, _convert_feed, feed, self.config, self.form, writer)
+        try:
+            try:
+                async for data in response.body():
+                    if not await feed.put(data):
+                        break
+                feed.finish()
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, FetchError, zlib.error) as e:
+                feed.finish(e if isinstance(e, FetchError) else FetchError(f"{type(e).__name__}: {e}", retry=True))
+            except BaseException:
+                # cancelled: the converter thread must not wait for more data
+                feed.finish(FetchError("Cancelled"))
+                raise
+            finally:
+                response.close()
+            result["nodeCount"] = await converted
+        finally:
+            result["bytes"] = feed.received
+            if fp is not None:
+                fp.close()
+        return writer
+
+    async def run_one(self, url, dest=None):
+        """Fetch and convert one source with retries; result dict (+ "nodes" for --merge)."""
+        result = {"url": url, "output": dest, "attempts": 0}
+        t0 = time.perf_counter()
+        async with self.slots:
+            while True:
+                result["attempts"] += 1
+                try:
+                    writer = await self._attempt(url, dest, result)
+                    break
+                except FetchError as e:
+                    error = e
+                except (OSError, asyncio.TimeoutError) as e:
+                    error = FetchError(f"{type(e).__name__}: {e}", retry=True)
+                except Exception as e:  # conversion error: the document itself is bad
+                    error = FetchError(f"{type(e).__name__}: {e}")
+                if not error.retry or result["attempts"] > self.retries:
+                    result["error"] = str(error)
+                    if dest is not None and os.path.exists(dest + ".part"):
+                        os.remove(dest + ".part")
+                    writer = None
+                    break
+                delay = error.retry_after if error.retry_after is not None \
+                    else self.backoff * 2 ** (result["attempts"] - 1)
+                await asyncio.sleep(delay)
+        if writer is not None:
+            if dest is not None:
+                os.replace(dest + ".part", dest)
+            else:
+                result["nodes"] = writer.texts
+        result["seconds"] = round(time.perf_counter() - t0, 4)
+        return result
+
+
+async def fetch_and_convert(urls, config, jobs=4, per_host=2, retries=3, backoff=1.0, timeout=60.0,
+                            out_dir=None, merge_writer=None, fmt="jsonld", form="compact", indent=None,
+                            backend="auto"):
+    """
+    Run the pipeline over urls. With out_dir, each source is written to its own file;
+    otherwise its nodes go to merge_writer (a JsonLdStreamWriter) in source order.
+    Returns the per-source results and the pool statistics.
+    """
+    pool = HostPool(per_host, timeout)
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="convert") as executor:
+        pipeline = Pipeline(config, executor, pool, jobs, retries, backoff, fmt, form, indent, backend)
+        tasks = [asyncio.ensure_future(pipeline.run_one(url, output_path(i, url, out_dir, fmt) if out_dir else None))
+                 for i, url in enumerate(urls)]
+        results = []
+        try:
+            # awaiting in source order keeps merged output deterministic
+            for task in tasks:
+                result = await task
+                nodes = result.pop("nodes", None)
+                if merge_writer is not None and nodes is not None:
+                    for text in nodes:
+                        merge_writer.write_serialized(text)
+                results.append(result)
+        finally:
+            for task in tasks:
+                task.cancel()
+            pool.close()
+    return results, {"connectionsOpened": pool.opened, "connectionsReused": pool.reused}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fetch StationXML from fdsnws-station services and convert it")
+    ap.add_argument("urls", nargs="*", help="fdsnws-station query URLs")
+    ap.add_argument("--sources", help="File with one URL per line (# comments)")
+    ap.add_argument("--xml-map", default="mappings/xml-to-icdm.yaml")
+    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.json", help="Can be YAML or JSON")
+    ap.add_argument("--context", default="contexts/context-strict-v1.jsonld")
+    ap.add_argument("--extra-lookups", default=None)
+    form = ap.add_mutually_exclusive_group()
+    form.add_argument("--expanded", action="store_true", help="Emit JSON-LD expanded form (no @context)")
+    form.add_argument("--curie", action="store_true", help="Emit nodes as mapped, without compacting to terms")
+    ap.add_argument("--format", choices=["jsonld", "ndjson"], default="jsonld")
+    ap.add_argument("--pretty", action="store_true", help="Indent the output (default: compact)")
+    ap.add_argument("--json-backend", choices=JSON_BACKENDS, default="auto")
+    ap.add_argument("-j", "--jobs", type=int, default=4, help="Sources downloaded and converted at once")
+    ap.add_argument("--per-host", type=int, default=2, help="Concurrent requests per host")
+    ap.add_argument("--retries", type=int, default=3, help="Retries per source after the first attempt")
+    ap.add_argument("--backoff", type=float, default=1.0, help="First retry delay in seconds, doubled each time")
+    ap.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait on connect or any read")
+    out = ap.add_mutually_exclusive_group(required=True)
+    out.add_argument("--out-dir", help="Write one output per source here")
+    out.add_argument("--merge", help="Write one merged graph here (- for stdout)")
+    ap.add_argument("--summary", help="Write the JSON summary here instead of stdout")
+    args = ap.parse_args()
+
+    urls = list(args.urls) + (read_sources(args.sources) if args.sources else [])
+    if not urls:
+        raise SystemExit("No sources: give URLs or --sources")
+
+    t0 = time.perf_counter()
+    config = load_config(args.xml_map, args.owl_map, args.context, args.extra_lookups)
+    form = "expanded" if args.expanded else "curie" if args.curie else "compact"
+    indent = 2 if args.pretty else None
+    writer = fp = None
+    if args.merge:
+        context, graph_key = document_head(config, form)
+        fp = open_output(args.merge)
+        writer = JsonLdStreamWriter(fp, context, fmt=args.format, indent=indent, backend=args.json_backend,
+                                    graph_key=graph_key)
+    try:
+        results, pool_stats = asyncio.run(fetch_and_convert(
+            urls, config, jobs=args.jobs, per_host=args.per_host, retries=args.retries, backoff=args.backoff,
+            timeout=args.timeout, out_dir=args.out_dir, merge_writer=writer, fmt=args.format, form=form,
+            indent=indent, backend=args.json_backend))
+    finally:
+        if writer is not None:
+            writer.close()
+            if fp is not sys.stdout:
+                fp.close()
+
+    failed = [{"url": r["url"], "error": r["error"]} for r in results if "error" in r]
+    summary = {
+        "sources": len(results),
+        "converted": len(results) - len(failed),
+        "failed": failed,
+        "jobs": args.jobs,
+        "perHost": args.per_host,
+        "wallSeconds": round(time.perf_counter() - t0, 4),
+        "bytes": sum(r.get("bytes", 0) for r in results),
+        "nodes": sum(r.get("nodeCount", 0) for r in results if "error" not in r),
+        **pool_stats,
+        "perSource": results,
+    }
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text, file=sys.stderr if args.merge == "-" else sys.stdout)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
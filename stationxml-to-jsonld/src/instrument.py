@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation for convert.py.
+- Stage timers (wall + CPU). Timers nest: each stage reports its own (exclusive) time, so
+  the stages add up to the instrumented total. E.g. "parse" excludes the "extract" calls
+  made while parsing, and "map" excludes "where", "lookup" and "iri".
+- Counters: elements, rows per kind, where tests/rejections (per entity and per failing
+  condition), lookup hits/misses per table, graph nodes per @type.
+- Optional tracemalloc peak.
+Nothing here runs unless a ConversionStats is passed to the compile/convert functions.
+"""
+
+import time
+from collections import Counter
+
+_clock = time.perf_counter
+_cpu = time.process_time
+
+
+class ConversionStats:
+    def __init__(self, trace_memory=False, hook=None):
+        self.trace_memory = trace_memory
+        self.hook = hook
+        self.stages = {}
+        self.counters = Counter()
+        self._stack = []
+        self._t0 = _clock()
+        self._c0 = _cpu()
+        if trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+
+    # ---- timers ----
+
+    def _enter(self):
+        self._stack.append([_clock(), _cpu(), 0.0, 0.0])
+
+    def _exit(self, name):
+        t0, c0, child_wall, child_cpu = self._stack.pop()
+        wall = _clock() - t0
+        cpu = _cpu() - c0
+        st = self.stages.get(name)
+        if st is None:
+            st = self.stages[name] = [0.0, 0.0, 0]
+        st[0] += wall - child_wall
+        st[1] += cpu - child_cpu
+        st[2] += 1
+        if self._stack:
+            self._stack[-1][2] += wall
+            self._stack[-1][3] += cpu
+
+    def timed(self, name, fn):
+        """Wrap fn so every call is timed under stage name."""
+        enter, exit_ = self._enter, self._exit
+
+        def wrapper(*args):
+            enter()
+            try:
+                return fn(*args)
+            finally:
+                exit_(name)
+        return wrapper
+
+    def timed_iter(self, name, iterable, counter=None):
+        """
+        Time the work done to produce each item of iterable under stage name;
+        counter(item) may return a counter name to increment per item.
+        """
+        it = iter(iterable)
+        while True:
+            self._enter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self._exit(name)
+                return
+            except BaseException:
+                self._exit(name)
+                raise
+            self._exit(name)
+            if counter is not None:
+                self.counters[counter(item)] += 1
+            yield item
+
+    def elements(self, events):
+        """Count elements in an ET.iterparse (start, end) event stream."""
+        counters = self.counters
+        for event in events:
+            if event[0] == "start":
+                counters["elements"] += 1
+            yield event
+
+    # ---- counters ----
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    # ---- report ----
+
+    def report(self):
+        out = {
+            "wallSeconds": round(_clock() - self._t0, 4),
+            "cpuSeconds": round(_cpu() - self._c0, 4),
+            "stages": {name: {"seconds": round(wall, 6), "cpuSeconds": round(cpu, 6), "calls": calls}
+                       for name, (wall, cpu, calls) in self.stages.items()},
+            "counters": dict(sorted(self.counters.items())),
+        }
+        if self.trace_memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            out["memory"] = {"currentBytes": current, "peakBytes": peak}
+        return out
+
+    def finish(self, **extra):
+        """Build the report (plus extra top-level keys), stop tracing and call the hook."""
+        report = self.report()
+        report.update(extra)
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.stop()
+        if self.hook is not None:
+            self.hook(report)
+        return report
+
+
+def load_hook(spec):
+    """Resolve a 'module:function' hook spec."""
+    import importlib
+    module, _, attr = spec.partition(":")
+    if not module or not attr:
+        raise ValueError(f"Hook must be module:function, got {spec!r}")
+    return getattr(importlib.import_module(module), attr)
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+JSON-LD expansion and compaction against this project's context, without a generic
+JSON-LD processor.
+- ActiveContext preprocesses one local context object (contexts/context-strict-v1.jsonld)
+  once: prefixes, term definitions (@id, @type coercion, @container), keyword aliases,
+  and an inverse index IRI -> terms for compaction.
+- expand(node) / compact(node) then rewrite one node in a single pass over its keys and
+  values; term selection is cached per (property, value kind), so per-node work is linear.
+- Input nodes may use terms, compact IRIs (CURIEs) or absolute IRIs as keys, as produced
+  by the mapping stage.
+Supported: simple and expanded term definitions with @id, @type (@id or a datatype),
+@container (@set, @list) and @prefix. Remote/scoped contexts, @vocab, @base, @language,
+@reverse and other containers are rejected when the context is compiled.
+"""
+
+import re
+
+GEN_DELIMS = (":", "/", "?", "#", "[", "]", "@")
+_TERM_KEYS = {"@id", "@type", "@container", "@prefix"}
+_UNSUPPORTED = ("@vocab", "@base", "@language", "@import", "@propagate", "@direction")
+
+# value kinds for term selection
+_ID, _PLAIN, _LIST = "@id", "@none", "@list"
+
+# an IRI up to and including its last delimiter; compact IRI prefixes are cached by it
+_HEAD = re.compile(r".*[:/?#\[\]@]", re.S)
+_MAX_HEADS = 4096
+_NO_HEAD = object()
+
+
+class ActiveContext:
+    def __init__(self, context):
+        if isinstance(context, dict) and "@context" in context:
+            context = context["@context"]
+        if not isinstance(context, dict):
+            raise ValueError("Only a single local @context object is supported")
+        for key in _UNSUPPORTED:
+            if key in context:
+                raise ValueError(f"Context keyword {key} is not supported")
+        self.context = context
+        self.prefixes = {}
+        self.terms = {}
+        self.aliases = {}
+        raw = {}
+        for term, value in context.items():
+            if term.startswith("@"):
+                continue
+            if isinstance(value, str):
+                value = {"@id": value, "_simple": True}
+            elif not isinstance(value, dict):
+                raise ValueError(f"Term {term}: unsupported definition {value!r}")
+            extra = set(value) - _TERM_KEYS - {"_simple"}
+            if extra:
+                raise ValueError(f"Term {term}: unsupported keys {', '.join(sorted(extra))}")
+            raw[term] = value
+        # prefixes first: term @ids are compact IRIs over them
+        for term, value in raw.items():
+            if value.get("_simple") and ":" not in term and ":" in value["@id"] \
+                    and value["@id"].endswith(GEN_DELIMS):
+                self.prefixes[term] = value["@id"]
+        for term, value in raw.items():
+            if value.get("@prefix") is True:
+                self.prefixes[term] = self._expand_curie(value["@id"])
+            elif value.get("@prefix") is False:
+                self.prefixes.pop(term, None)
+        for term, value in raw.items():
+            iri = value.get("@id", term)
+            if iri.startswith("@"):
+                self.aliases[iri] = term
+                continue
+            iri = self._expand_curie(iri)
+            coerce = value.get("@type")
+            if coerce is not None and coerce != "@id":
+                coerce = self._expand_curie(coerce)
+            container = value.get("@container")
+            if container not in (None, "@set", "@list"):
+                raise ValueError(f"Term {term}: @container {container} is not supported")
+            self.terms[term] = (iri, coerce, container)
+
+        # inverse context: IRI -> [(term, coerce, container)], shortest then least term first
+        self.inverse = {}
+        for term in sorted(self.terms, key=lambda t: (len(t), t)):
+            iri, coerce, container = self.terms[term]
+            self.inverse.setdefault(iri, []).append((term, coerce, container))
+        self._prefix_list = sorted(self.prefixes.items(), key=lambda kv: (len(kv[0]), kv[0]))
+        self._keys = {}
+        self._types = {}
+        self._heads = {}
+        self._vocab_iris = {}
+
+    # ---- IRIs ----
+
+    def _expand_curie(self, value):
+        prefix, sep, suffix = value.partition(":")
+        if sep and not suffix.startswith("//") and prefix in self.prefixes:
+            return self.prefixes[prefix] + suffix
+        return value
+
+    def expand_iri(self, value, vocab=False):
+        """Expand a term (vocab=True only), compact IRI or absolute IRI."""
+        if vocab:
+            term = self.terms.get(value)
+            if term is not None:
+                return term[0]
+        if value.startswith("@"):
+            return value
+        return self._expand_curie(value)
+
+    def expand_type(self, value):
+        iri = self._types.get(value)
+        if iri is None:
+            iri = self._types[value] = self.expand_iri(value, True)
+        return iri
+
+    def _prefix_for(self, head):
+        """(prefix, length of its IRI) giving the shortest compact IRI under head, or None."""
+        best = None
+        for prefix, base in self._prefix_list:
+            if head.startswith(base) and len(prefix) + 1 < len(base) \
+                    and not head[len(base):].startswith("//"):
+                if best is None or len(prefix) - len(base) < len(best[0]) - best[1]:
+                    best = (prefix, len(base))
+        return best
+
+    def compact_iri(self, iri, vocab=False):
+        """
+        Shortest form of iri: a term with exactly that @id and no coercion (vocab=True),
+        else the shortest compact IRI, else iri itself.
+        """
+        if vocab:
+            cached = self._vocab_iris.get(iri)
+            if cached is not None:
+                return cached
+            for term, coerce, container in self.inverse.get(iri, ()):
+                if coerce is None and container is None:
+                    self._vocab_iris[iri] = term
+                    return term
+        # the usable prefixes only depend on the IRI up to its last delimiter
+        m = _HEAD.match(iri)
+        out = iri
+        if m is not None:
+            head = m.group()
+            # one context is shared by the threads of serve.py / fetch.py: never read back
+            # an entry just written, another thread may have cleared the cache since
+            heads = self._heads
+            found = heads.get(head, _NO_HEAD)
+            if found is _NO_HEAD:
+                if len(heads) >= _MAX_HEADS:
+                    heads.clear()
+                found = heads[head] = self._prefix_for(head)
+            if found is not None and len(iri) > found[1]:
+                curie = found[0] + ":" + iri[found[1]:]
+                if curie not in self.terms:
+                    out = curie
+        if vocab:
+            self._vocab_iris[iri] = out
+        return out
+
+    # ---- properties ----
+
+    def expand_key(self, key):
+        """
+        (property IRI, term definition of key or None, {value kind: selected term}) for an
+        input key, or None when the key does not expand (not a term nor an IRI: no @vocab).
+        """
+        found = self._keys.get(key, False)
+        if found is False:
+            term = self.terms.get(key)
+            if term is not None:
+                found = (term[0], term, {})
+            else:
+                iri = self._expand_curie(key)
+                found = (iri, None, {}) if ":" in iri else None
+            self._keys[key] = found
+        return found
+
+    def _select(self, iri, kind):
+        """(term or compact IRI, coercion, container) for values of kind under property iri."""
+        chosen = None
+        fallback = None
+        for term, coerce, container in self.inverse.get(iri, ()):
+            if (container == "@list") != (kind == _LIST):
+                continue
+            if kind == _LIST or coerce == kind:
+                chosen = (term, coerce, container)
+                break
+            if coerce is None and fallback is None:
+                fallback = (term, coerce, container)
+        if chosen is None:
+            chosen = fallback
+        if chosen is None:
+            chosen = (self.compact_iri(iri, True), None, None)
+        return chosen
+
+    # ---- nodes ----
+
+    def _expand_value(self, item, term):
+        if type(item) is dict:
+            if "@value" in item:
+                if "@type" in item:
+                    return {"@value": item["@value"], "@type": self.expand_type(item["@type"])}
+                return {"@value": item["@value"]}
+            if "@list" in item:
+                values = item["@list"]
+                if hasattr(values, "tolist"):
+                    values = values.tolist()
+                return {"@list": [self._expand_value(v, None) if type(v) is dict else {"@value": v}
+                                  for v in values]}
+            if "@id" in item and len(item) == 1:
+                return {"@id": self.expand_iri(item["@id"])}
+            return self.expand(item)
+        coerce = term[1] if term is not None else None
+        if coerce == "@id" and isinstance(item, str):
+            return {"@id": self.expand_iri(item)}
+        if coerce is not None and coerce != "@id":
+            return {"@value": item, "@type": coerce}
+        return {"@value": item}
+
+    def expand(self, node):
+        """Expanded form of one node object: absolute IRIs, arrays, value objects."""
+        out = {}
+        for key, value in node.items():
+            if key == "@id":
+                out["@id"] = self.expand_iri(value)
+            elif key == "@type":
+                out["@type"] = [self.expand_type(t) for t in (value if type(value) is list else [value])]
+            elif key[0] == "@":
+                out[key] = value
+            else:
+                plan = self._keys.get(key) or self.expand_key(key)
+                if plan is None:
+                    continue
+                iri, term = plan[0], plan[1]
+                if type(value) is not list:
+                    value = [value]
+                elif term is not None and term[2] == "@list":
+                    value = [{"@list": value}]
+                items = out.get(iri)
+                if items is None:
+                    items = out[iri] = []
+                for v in value:
+                    items.append(self._expand_value(v, term))
+        return out
+
+    def _compact_list(self, values, coerce):
+        """@list items under a term coercing to coerce: matching value objects become bare."""
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        types_get = self._types.get
+        out = []
+        for v in values:
+            if type(v) is dict:
+                if "@value" in v:
+                    dt = v.get("@type")
+                    dt = (types_get(dt) or self.expand_type(dt)) if dt else None
+                    if dt == coerce:
+                        v = v["@value"]
+                    elif dt is not None:
+                        v = {"@value": v["@value"], "@type": self.compact_iri(dt, True)}
+                elif "@id" not in v or len(v) > 1:
+                    v = self.compact(v)
+            elif coerce is not None:
+                v = {"@value": v}
+            out.append(v)
+        return out
+
+    def compact(self, node):
+        """Compacted form of one node object: terms where the context defines them."""
+        out = {}
+        aliases = self.aliases
+        keys_get = self._keys.get
+        types_get = self._types.get
+        for key, value in node.items():
+            if key == "@id":
+                out[aliases.get("@id", "@id")] = self.compact_iri(self.expand_iri(value))
+            elif key == "@type":
+                types = [self.compact_iri(self.expand_type(t), True)
+                         for t in (value if type(value) is list else [value])]
+                out[aliases.get("@type", "@type")] = types[0] if len(types) == 1 else types
+            elif key[0] == "@":
+                out[aliases.get(key, key)] = value
+            else:
+                plan = keys_get(key) or self.expand_key(key)
+                if plan is None:
+                    continue
+                iri, term, selected = plan
+                if type(value) is not list:
+                    value = [value]
+                elif term is not None and term[2] == "@list":
+                    value = [{"@list": value}]
+                for item in value:
+                    # classify the value: (kind, IRI it refers to, if any)
+                    ref = None
+                    if type(item) is dict:
+                        if "@value" in item:
+                            dt = item.get("@type")
+                            kind = (types_get(dt) or self.expand_type(dt)) if dt else _PLAIN
+                        elif "@list" in item:
+                            kind = _LIST
+                        else:
+                            kind = _ID
+                            if "@id" in item and len(item) == 1:
+                                ref = self.expand_iri(item["@id"])
+                    else:
+                        kind = term[1] if term is not None and term[1] is not None else _PLAIN
+                        if kind == _ID:
+                            ref = self.expand_iri(item) if isinstance(item, str) else None
+                            if ref is None:
+                                kind = _PLAIN
+                    sel = selected.get(kind)
+                    if sel is None:
+                        sel = selected[kind] = self._select(iri, kind)
+                    name, coerce, container = sel
+
+                    if kind == _LIST:
+                        compacted = {"@list": self._compact_list(item["@list"], coerce)}
+                    elif ref is not None:
+                        compacted = self.compact_iri(ref)
+                        if coerce != _ID:
+                            compacted = {"@id": compacted}
+                    elif kind == _ID:
+                        compacted = self.compact(item)
+                    else:
+                        literal = item["@value"] if type(item) is dict else item
+                        if kind == _PLAIN or kind == coerce:
+                            compacted = literal
+                        else:
+                            compacted = {"@value": literal, "@type": self.compact_iri(kind, True)}
+                    prev = out.get(name)
+                    if prev is None:
+                        out[name] = [compacted]
+                    else:
+                        prev.append(compacted)
+        # compact arrays: a single value stands alone unless its term has a container;
+        # a @list term takes its list's items (keys that expand alike all land here)
+        for name, value in out.items():
+            if type(value) is list and name[0] != "@":
+                term = self.terms.get(name)
+                container = term[2] if term is not None else None
+                if container == "@list" and any(type(v) is dict and "@list" in v for v in value):
+                    if len(value) > 1:
+                        raise ValueError(f"Several values compact to the @list term {name!r}")
+                    out[name] = value[0]["@list"]
+                elif len(value) == 1 and container is None:
+                    out[name] = value[0]
+        return out
+
+    @property
+    def graph_key(self):
+        return self.aliases.get("@graph", "@graph")
+
+
+def compile_context(ctx):
+    """ActiveContext for a context document ({"@context": {...}}) or context object."""
+    return ActiveContext(ctx)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Lookup tables for 'lookup' rules in the ICDM -> JSON-LD mapping.
+- Keys are normalized once with str.casefold(); a value is found with a single probe of
+  the case-folded key (no more exact / lower() / capitalize() retries). When two keys of
+  one table fold to the same key, the later one wins.
+- A table is either inline (a JSON/YAML object, indexed in memory) or a path to an
+  on-disk sqlite table for large tables (*.sqlite / *.sqlite3 / *.db), opened read-only
+  and memory-mapped, built by tools/build_lookup_db.py. On-disk tables have an
+  in-process LRU cache in front.
+"""
+
+import os
+from functools import lru_cache
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+DEFAULT_CACHE_SIZE = 65536
+
+
+def fold(val):
+    return val.casefold() if isinstance(val, str) else str(val).casefold()
+
+
+class LookupIndex:
+    """In-memory table: one dict keyed by case-folded key."""
+
+    def __init__(self, mapping):
+        self._index = {fold(k): v for k, v in mapping.items()}
+        self.get = self._index.get
+
+    def lookup(self, val):
+        return self._index.get(fold(val))
+
+    def __len__(self):
+        return len(self._index)
+
+
+class SqliteLookup:
+    """
+    Read-only sqlite table `lookup(key TEXT PRIMARY KEY, value TEXT)` with case-folded keys.
+    The file is opened immutable and memory-mapped (up to mmap_bytes).
+    """
+
+    def __init__(self, path, cache_size=DEFAULT_CACHE_SIZE, mmap_bytes=1 << 30):
+        import sqlite3
+        from urllib.parse import quote
+        self.path = path
+        uri = "file:" + quote(os.path.abspath(path)) + "?mode=ro&immutable=1"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+        self._query = "SELECT value FROM lookup WHERE key = ?"
+        self.get = lru_cache(maxsize=cache_size)(self._fetch)
+
+    def _fetch(self, key):
+        row = self._conn.execute(self._query, (key,)).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, val):
+        return self.get(fold(val))
+
+    def __len__(self):
+        return self._conn.execute("SELECT count(*) FROM lookup").fetchone()[0]
+
+
+def open_table(spec, cache_size=DEFAULT_CACHE_SIZE):
+    """A lookup table from an inline mapping or a path to an sqlite file."""
+    if isinstance(spec, dict):
+        return LookupIndex(spec)
+    if isinstance(spec, str):
+        if spec.lower().endswith(SQLITE_SUFFIXES):
+            return SqliteLookup(spec, cache_size)
+        raise ValueError(f"Lookup table file must be sqlite ({', '.join(SQLITE_SUFFIXES)}), "
+                         f"built by tools/build_lookup_db.py: {spec}")
+    raise ValueError(f"Lookup table must be an object or a file path, got {type(spec).__name__}")
+
+
+def open_lookups(specs, cache_size=DEFAULT_CACHE_SIZE):
+    """{name: spec} -> {name: table}; each table has lookup(val) -> value or None."""
+    return {name: open_table(spec, cache_size) for name, spec in (specs or {}).items()}
+
+
+def external_paths(specs):
+    """Paths of the on-disk tables among specs."""
+    return sorted(spec for spec in (specs or {}).values() if isinstance(spec, str))
+
+
+def table_signature(paths):
+    """Cheap change signature (size, mtime) of on-disk tables, e.g. for cache keys."""
+    sig = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            sig.append(f"{p}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            sig.append(f"{p}:missing")
+    return "\n".join(sig)
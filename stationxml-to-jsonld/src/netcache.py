@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of converted JSON-LD, keyed per Network by content hash.
+- Key: hash of the Network's XML bytes, the document frame (prolog + root tag) and a salt
+  covering the mapping files, context, converter source and output options.
+- Value: the serialized @graph nodes produced for that Network.
+- Eviction: least recently used entries (by mtime, refreshed on hit) beyond max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+def digest(*parts):
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def file_digest(*paths):
+    """Digest of the contents of the given files (None entries are skipped)."""
+    contents = []
+    for p in paths:
+        if p:
+            with open(p, "rb") as f:
+                contents.append(f.read())
+        else:
+            contents.append(b"")
+    return digest(*contents)
+
+
+class NetworkCache:
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key):
+        """Cached node texts for key, or None. A hit refreshes the entry's LRU time."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                texts = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return texts
+
+    def put(self, key, texts):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write-then-rename so concurrent readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+        self.stored += 1
+
+    def entries(self):
+        out = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".json"):
+                    p = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        if self.max_bytes is None:
+            return 0
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self.evicted += removed
+        return removed
+
+    def report(self):
+        entries = self.entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
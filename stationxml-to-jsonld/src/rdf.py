@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+N-Triples / N-Quads straight from the graph nodes of the mapping stage, one node at a
+time, with no JSON in between.
+- Keys, types and IRIs are expanded with the compiled context (jsonld.ActiveContext):
+  prefixes, term @id and @type coercion.
+- Literals keep the rule `datatype` ({"@value": v, "@type": "xsd:decimal"}) as a typed
+  literal, xsd:double values in canonical form ("0.0020" -> "2.0E-3"); plain strings
+  are simple literals; numbers follow JSON-LD to RDF (xsd:integer for whole numbers,
+  else xsd:double in canonical form; xsd:boolean).
+- The coefficient lists of 'fromArray' rules hold value objects typed xsd:double, so
+  whole values stay doubles ("0.0E0") in every list, as in JSON-LD to RDF of the .jsonld
+  output.
+- Embedded nodes without @id (periods, responses, stages) and @list values become blank
+  nodes; labels are _:b<scope><n>, where the scope keeps labels unique across
+  separately serialized parts of one document (see TripleSerializer.reset).
+"""
+
+import re
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+XSD_DOUBLE = XSD + "double"
+RDF_TYPE = f"<{RDF}type>"
+RDF_FIRST = f"<{RDF}first>"
+RDF_REST = f"<{RDF}rest>"
+RDF_NIL = f"<{RDF}nil>"
+
+_LITERAL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+_IRI_UNSAFE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+_DOUBLE_TRIM = re.compile(r"(\d)0*E\+?(-)?0*(\d)")
+
+
+def _iri_escape(m):
+    return "\\u%04X" % ord(m.group())
+
+
+def iri_ref(iri):
+    """<iri> with the characters N-Triples forbids in IRIREF escaped."""
+    if _IRI_UNSAFE.search(iri):
+        iri = _IRI_UNSAFE.sub(_iri_escape, iri)
+    return "<" + iri + ">"
+
+
+def literal(value, datatype=None):
+    """N-Triples literal for a JSON value, typed with datatype (an absolute IRI) if given."""
+    if isinstance(value, bool):
+        value, datatype = ("true" if value else "false"), datatype or XSD + "boolean"
+    elif isinstance(value, int):
+        value, datatype = str(value), datatype or XSD + "integer"
+    elif isinstance(value, float):
+        if datatype is None and value.is_integer() and abs(value) < 1e21:
+            # JSON-LD: a number without fractional part is an xsd:integer, 0.0 included
+            value, datatype = str(int(value)), XSD + "integer"
+        elif datatype is None or datatype == XSD_DOUBLE:
+            value, datatype = _DOUBLE_TRIM.sub(r"\1E\2\3", "%1.15E" % value), XSD_DOUBLE
+        else:
+            value = repr(value)
+    elif datatype == XSD_DOUBLE and isinstance(value, str):
+        try:
+            value = _DOUBLE_TRIM.sub(r"\1E\2\3", "%1.15E" % float(value))
+        except ValueError:
+            pass
+    text = '"' + str(value).translate(_LITERAL_ESCAPES) + '"'
+    if datatype is None or datatype == XSD + "string":
+        return text
+    return text + "^^" + iri_ref(datatype)
+
+
+class TripleSerializer:
+    """
+    node -> N-Triples text (one line per triple). With graph (an IRI) every line is an
+    N-Quad in that named graph. Callable, so it can stand in for a JSON node dumper.
+    """
+
+    def __init__(self, active_context, graph=None):
+        self.ctx = active_context
+        self.tail = (" " + iri_ref(graph) + " .\n") if graph else " .\n"
+        self._iris = {}
+        self.reset()
+
+    def reset(self, scope=""):
+        """Start blank node labels afresh under scope (a label-safe string)."""
+        self._prefix = "_:b" + scope + ("x" if scope else "")
+        self._next = 0
+
+    def _bnode(self):
+        self._next += 1
+        return self._prefix + str(self._next)
+
+    def _ref(self, iri):
+        ref = self._iris.get(iri)
+        if ref is None:
+            if len(self._iris) > 65536:
+                self._iris.clear()
+            ref = self._iris[iri] = iri_ref(iri)
+        return ref
+
+    def __call__(self, node):
+        lines = []
+        self._node(node, lines)
+        return "".join(lines)
+
+    def _node(self, node, lines):
+        ctx = self.ctx
+        tail = self.tail
+        node_id = node.get("@id")
+        subject = self._ref(ctx.expand_iri(node_id)) if node_id is not None else self._bnode()
+        types = node.get("@type")
+        if types is not None:
+            for t in (types if isinstance(types, list) else [types]):
+                lines.append(f"{subject} {RDF_TYPE} {self._ref(ctx.expand_type(t))}{tail}")
+        for key, value in node.items():
+            if key[0] == "@":
+                continue
+            plan = ctx.expand_key(key)
+            if plan is None:
+                continue
+            predicate = self._ref(plan[0])
+            term = plan[1]
+            coerce = term[1] if term is not None else None
+            if isinstance(value, list):
+                if term is not None and term[2] == "@list":
+                    value = [{"@list": value}]
+            else:
+                value = [value]
+            for item in value:
+                obj = self._object(item, coerce, lines)
+                if obj is not None:
+                    lines.append(f"{subject} {predicate} {obj}{tail}")
+        return subject
+
+    def _object(self, item, coerce, lines):
+        ctx = self.ctx
+        if isinstance(item, dict):
+            if "@value" in item:
+                dt = item.get("@type")
+                return literal(item["@value"], ctx.expand_type(dt) if dt else None)
+            if "@list" in item:
+                return self._list(item["@list"], lines)
+            if "@id" in item and len(item) == 1:
+                return self._ref(ctx.expand_iri(item["@id"]))
+            return self._node(item, lines)
+        if item is None:
+            return None
+        if coerce == "@id" and isinstance(item, str):
+            return self._ref(ctx.expand_iri(item))
+        if coerce is not None and coerce != "@id":
+            return literal(item, coerce)
+        return literal(item)
+
+    def _list(self, values, lines):
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        if not len(values):
+            return RDF_NIL
+        tail = self.tail
+        head = node = self._bnode()
+        last = len(values) - 1
+        for i, v in enumerate(values):
+            obj = self._object(v, None, lines)
+            lines.append(f"{node} {RDF_FIRST} {obj}{tail}")
+            rest = RDF_NIL if i == last else self._bnode()
+            lines.append(f"{node} {RDF_REST} {rest}{tail}")
+            node = rest
+        return head
+
+
+class TripleWriter:
+    """Streams N-Triples / N-Quads; the same write / write_serialized / count interface
+    as convert.JsonLdStreamWriter."""
+
+    def __init__(self, fp, serializer):
+        self.fp = fp
+        self.dumps = serializer
+        self.count = 0
+
+    def write(self, node):
+        self.write_serialized(self.dumps(node))
+
+    def write_serialized(self, text):
+        self.fp.write(text)
+        self.count += 1
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local HTTP conversion service: the mappings, context and lookups are loaded and compiled
+once, then every request only pays for its own document.
+- POST /convert with a StationXML body; the body is parsed as it arrives and the graph is
+  streamed back (chunked) one network at a time. Query parameters pick the output as on
+  the convert.py command line: format=jsonld|ndjson|nt|nq, form=compact|expanded|curie,
+  graph=IRI (nq), pretty=1.
+- GET /metrics: request, error and byte counters, nodes, latency and time-to-first-byte
+  percentiles over the last requests, throughput since start (JSON).
+- GET /health: {"status": "ok"}.
+Requests are served on threads; at most --max-active conversions run at once, others
+wait. Binds to 127.0.0.1 by default, for local clients only.
+
+  python3 src/serve.py --owl-map mappings/icdm-to-owl.json --port 8000
+  curl --data-binary @examples/sample.stationxml 'http://127.0.0.1:8000/convert?format=ndjson'
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from convert import JSON_BACKENDS, OUTPUT_FORMS, RDF_FORMATS, convert_stream, load_config, open_writer
+
+CONTENT_TYPES = {
+    "jsonld": "application/ld+json",
+    "ndjson": "application/x-ndjson",
+    "nt": "application/n-triples",
+    "nq": "application/n-quads",
+}
+
+_END = object()
+
+
+# ---------------------------
+# Metrics
+# ---------------------------
+
+def percentiles(samples, points=(50, 90, 99)):
+    """{"p50": ..., ...} in milliseconds over samples (seconds), nearest rank."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    out = {f"p{p}": round(ordered[min(last, (p * len(ordered) + 99) // 100 - 1)] * 1000, 2) for p in points}
+    out["max"] = round(ordered[-1] * 1000, 2)
+    return out
+
+
+class ServiceMetrics:
+    """Thread-safe counters and a window of the latest request timings."""
+
+    def __init__(self, window=1024):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.requests = 0
+        self.errors = {}
+        self.active = 0
+        self.waiting = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.nodes = 0
+        self.busy_seconds = 0.0
+        self._latency = deque(maxlen=window)
+        self._first_byte = deque(maxlen=window)
+
+    def enter(self):
+        with self._lock:
+            self.waiting += 1
+
+    def start(self):
+        with self._lock:
+            self.waiting -= 1
+            self.active += 1
+
+    def finish(self, status, seconds, first_byte=None, bytes_in=0, bytes_out=0, nodes=0, started=True):
+        with self._lock:
+            if started:
+                self.active -= 1
+            else:
+                self.waiting -= 1
+            self.requests += 1
+            if status >= 400:
+                self.errors[str(status)] = self.errors.get(str(status), 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.nodes += nodes
+            self.busy_seconds += seconds
+            self._latency.append(seconds)
+            if first_byte is not None:
+                self._first_byte.append(first_byte)
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.perf_counter() - self._t0
+            return {
+                "startedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+                "uptimeSeconds": round(uptime, 1),
+                "requests": self.requests,
+                "errors": dict(self.errors),
+                "active": self.active,
+                "waiting": self.waiting,
+                "bytesIn": self.bytes_in,
+                "bytesOut": self.bytes_out,
+                "nodes": self.nodes,
+                "throughput": {
+                    "requestsPerSecond": round(self.requests / uptime, 3) if uptime else 0.0,
+                    "nodesPerSecond": round(self.nodes / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+                    "inputMBPerSecond": round(self.bytes_in / 1e6 / self.busy_seconds, 3)
+                    if self.busy_seconds else 0.0,
+                },
+                "latencyMs": percentiles(self._latency),
+                "firstByteMs": percentiles(self._first_byte),
+                "window": len(self._latency),
+            }
+
+
+# ---------------------------
+# Request I/O
+# ---------------------------
+
+class _BodyReader:
+    """File object over the next `length` bytes of the request (what iterparse reads)."""
+
+    def __init__(self, rfile, length):
+        self.rfile = rfile
+        self.remaining = length
+        self.consumed = 0
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.rfile.read(size)
+        self.remaining -= len(data)
+        self.consumed += len(data)
+        if not data:
+            self.remaining = 0
+        return data
+
+
+class _ChunkedBody:
+    """Text sink for the output writers: buffers and sends HTTP/1.1 chunks."""
+
+    def __init__(self, wfile, chunk_bytes=64 << 10):
+        self.wfile = wfile
+        self.chunk_bytes = chunk_bytes
+        self._parts = []
+        self._size = 0
+        self.sent = 0
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self._parts.append(data)
+        self._size += len(data)
+        if self._size >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        if self._size:
+            data = b"".join(self._parts)
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+            self.sent += len(data)
+            self._parts = []
+            self._size = 0
+        self.wfile.flush()
+
+    def end(self):
+        """Send the terminating chunk (after flush)."""
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def output_options(query):
+    """(fmt, form, graph, indent) from the query string; ValueError if invalid."""
+    params = {k: v[-1] for k, v in parse_qs(query).items()}
+    fmt = params.get("format", "jsonld")
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"format must be one of {', '.join(CONTENT_TYPES)}")
+    form = params.get("form", "compact")
+    if form not in OUTPUT_FORMS:
+        raise ValueError(f"form must be one of {', '.join(OUTPUT_FORMS)}")
+    graph = params.get("graph")
+    if graph and fmt != "nq":
+        raise ValueError("graph needs format=nq")
+    if fmt in RDF_FORMATS:
+        form = "curie"
+    indent = 2 if params.get("pretty", "0") not in ("", "0", "false") else None
+    return fmt, form, graph, indent
+
+
+# ---------------------------
+# Server
+# ---------------------------
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "stationxml-to-jsonld"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, obj, count=None):
+        """Send obj as the response; count(bytes) is called first (request metrics)."""
+        body = (json.dumps(obj, indent=2) + "\n").encode("utf-8")
+        if count is not None:
+            count(len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            self._send_json(200, self.server.metrics.snapshot())
+        elif path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"No such resource: {path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/convert":
+            self._send_json(404, {"error": f"No such resource: {url.path}"})
+            return
+        metrics = self.server.metrics
+        t0 = time.perf_counter()
+        metrics.enter()
+        try:
+            fmt, form, graph, indent = output_options(url.query)
+        except ValueError as e:
+            return self._reject(400, str(e), t0)
+        length = self.headers.get("Content-Length", "")
+        if not length.isdigit():
+            return self._reject(411, "Content-Length is required", t0)
+        length = int(length)
+        if length > self.server.max_bytes:
+            return self._reject(413, f"Body larger than {self.server.max_bytes} bytes", t0)
+
+        with self.server.slots:
+            metrics.start()
+            self._convert(fmt, form, graph, indent, length, t0)
+
+    def _reject(self, status, message, t0):
+        self.close_connection = True
+        self._send_json(status, {"error": message}, lambda sent: self.server.metrics.finish(
+            status, time.perf_counter() - t0, bytes_out=sent, started=False))
+
+    def _convert(self, fmt, form, graph, indent, length, t0):
+        """
+        Stream one conversion. The request is counted in the metrics before its last
+        chunk goes out, so a client that has read its whole response also sees it there.
+        """
+        reader = _BodyReader(self.rfile, length)
+        nodes = iter(convert_stream(reader, self.server.config, form=form))
+
+        def finish(status, first_byte=None, sent=0, count=0):
+            self.server.metrics.finish(status, time.perf_counter() - t0, first_byte, reader.consumed, sent, count)
+
+        # headers go out with the first network, so document errors there are still a 400
+        try:
+            first = next(nodes, _END)
+        except ET.ParseError as e:
+            self.close_connection = True
+            self._send_json(400, {"error": f"Invalid StationXML: {e}"}, lambda sent: finish(400, sent=sent))
+            return
+        except Exception as e:
+            self.close_connection = True
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"}, lambda sent: finish(500, sent=sent))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[fmt])
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        first_byte = time.perf_counter() - t0
+        body = _ChunkedBody(self.wfile)
+        writer = open_writer(body, self.server.config, fmt, indent, self.server.backend, form, graph)
+        try:
+            if first is not _END:
+                writer.write(first)
+                for node in nodes:
+                    writer.write(node)
+            writer.close()
+            body.flush()
+        except Exception as e:
+            # too late for a status: end the connection without the last chunk so the
+            # client sees a truncated response
+            self.close_connection = True
+            self.log_error("Conversion failed after %d nodes: %s: %s", writer.count, type(e).__name__, e)
+            finish(500, first_byte, body.sent, writer.count)
+            return
+        finish(200, first_byte, body.sent, writer.count)
+        body.end()
+
+
+class ConversionService(ThreadingHTTPServer):
+    """HTTP server holding one loaded convert.py configuration (see load_config)."""
+    daemon_threads = True
+
+    def __init__(self, address, config, backend="auto", max_active=4, max_bytes=1 << 30, quiet=False):
+        super().__init__(address, ConversionHandler)
+        self.config = config
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.quiet = quiet
+        self.slots = threading.BoundedSemaphore(max_active)
+        self.metrics = ServiceMetrics()
+
+
+def make_server(config_args, host="127.0.0.1", port=8000, **options):
+    """Load and compile the configuration once and bind a ConversionService (port 0: any free port)."""
+    return ConversionService((host, port), load_config(*config_args), **options)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local HTTP StationXML to JSON-LD service")
+    ap.add_argument("--xml-map", default="mappings/xml-to-icdm.yaml")
+    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.json", help="Can be YAML or JSON")
+    ap.add_argument("--context", default="contexts/context-strict-v1.jsonld")
+    ap.add_argument("--extra-lookups", default=None)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--max-active", type=int, default=4, help="Conversions running at once; more requests wait")
+    ap.add_argument("--max-bytes", type=int, default=1 << 30, help="Largest accepted request body")
+    ap.add_argument("--json-backend", choices=JSON_BACKENDS, default="auto")
+    ap.add_argument("--quiet", action="store_true", help="Do not log each request")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    server = make_server((args.xml_map, args.owl_map, args.context, args.extra_lookups), args.host, args.port,
+                         backend=args.json_backend, max_active=args.max_active, max_bytes=args.max_bytes,
+                         quiet=args.quiet)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port}/convert (configuration loaded in "
+          f"{time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
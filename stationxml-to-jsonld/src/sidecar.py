@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+"""
+Sidecar index over converted output (`convert.py --index`, `convert.py query`).
+- While the writer streams nodes, each node's byte range in the output is recorded with
+  its @id, @type, wgs:lat / wgs:long and the intervals of its fdsn:operationalPeriod,
+  read from the node in whatever form it was written (compact, expanded, CURIE, N-Triples).
+- The index (JSON, next to the output) holds that node table plus three lookups: a
+  lat/lon grid of cells -> nodes, an interval index of periods (fixed-width time bins ->
+  nodes for closed periods, sorted lists for periods open at either end), IRI -> nodes.
+- A query narrows the candidates with the lookups, checks them against the stored values,
+  and reads only the matching byte ranges of the output.
+"""
+
+import bisect
+import calendar
+import json
+import math
+import os
+import re
+import sys
+
+INDEX_VERSION = 1
+GRID_DEGREES = 1.0
+BIN_SECONDS = 31556952  # one Gregorian year
+
+_TIME = re.compile(r"\s*(\d{4})-(\d\d)-(\d\d)(?:[T ](\d\d):(\d\d)(?::(\d\d)(?:\.(\d+))?)?)?"
+                   r"\s*(?:Z|([+-])(\d\d):?(\d\d))?\s*$")
+
+
+def parse_time(text):
+    """Seconds since 1970 (UTC) of an xsd:dateTime / date string, or None."""
+    m = _TIME.match(text) if isinstance(text, str) else None
+    if m is None:
+        return None
+    y, mo, d, h, mi, s, frac, sign, oh, om = m.groups()
+    t = calendar.timegm((int(y), int(mo), int(d), int(h or 0), int(mi or 0), int(s or 0)))
+    if frac:
+        t += int(frac) / 10 ** len(frac)
+    if sign:
+        offset = int(oh) * 3600 + int(om) * 60
+        t -= offset if sign == "+" else -offset
+    return t
+
+
+def _literal(value):
+    """The lexical value of a literal in any output form ("x", {"@value": "x"}, [...])."""
+    if type(value) is list:
+        value = value[0] if value else None
+    if type(value) is dict:
+        value = value.get("@value")
+    return value
+
+
+def _number(value):
+    try:
+        return float(_literal(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class NodeFields:
+    """
+    Callable node -> [iri, types, lat, lon, periods] with IRIs expanded against the active
+    context; periods are [start, end] in seconds, None for an open end.
+    """
+
+    def __init__(self, active):
+        self.active = active
+        self._keywords = {alias: keyword for keyword, alias in active.aliases.items()}
+        self._keys = {}
+        self._roles = {}
+        self._times = {}
+        iri = active.expand_iri
+        self.lat, self.long = iri("wgs:lat"), iri("wgs:long")
+        self.period = iri("fdsn:operationalPeriod")
+        self.begin, self.end = iri("time:hasBeginning"), iri("time:hasEnd")
+        self.instant = iri("time:inXSDDateTime")
+
+    def key(self, key):
+        found = self._keys.get(key)
+        if found is None:
+            if key.startswith("@") or key in self._keywords:
+                found = self._keywords.get(key, key)
+            else:
+                expanded = self.active.expand_key(key)
+                found = expanded[0] if expanded else key
+            self._keys[key] = found
+        return found
+
+    def time(self, text):
+        # epochs of a network share few distinct dates
+        t = self._times.get(text, False)
+        if t is False:
+            if len(self._times) >= 1 << 16:
+                self._times.clear()
+            t = self._times[text] = parse_time(text)
+        return t
+
+    def _instant(self, value):
+        if type(value) is list:
+            value = value[0] if value else None
+        if type(value) is not dict:
+            return self.time(value)
+        for k, v in value.items():
+            if self.key(k) == self.instant:
+                return self.time(_literal(v))
+        return None
+
+    def role(self, key):
+        """What a written key of a node is to the index: "@id", "@type", "lat", "long", "period" or ""."""
+        found = self._roles.get(key)
+        if found is None:
+            k = self.key(key)
+            found = self._roles[key] = {"@id": "@id", "@type": "@type", self.lat: "lat", self.long: "long",
+                                        self.period: "period"}.get(k, "")
+        return found
+
+    def _period(self, p):
+        start = end = None
+        for k, v in p.items():
+            k = self.key(k)
+            if k == self.begin:
+                start = self._instant(v)
+            elif k == self.end:
+                end = self._instant(v)
+        return [start, end]
+
+    def __call__(self, node):
+        iri = types = lat = lon = None
+        periods = []
+        roles = self._roles
+        for k, v in node.items():
+            role = roles.get(k)
+            if role is None:
+                role = self.role(k)
+            if not role:
+                continue
+            if role == "@id":
+                iri = self.active.expand_iri(v)
+            elif role == "@type":
+                types = [self.active.expand_type(t) for t in (v if type(v) is list else [v])]
+            elif role == "lat":
+                lat = _number(v)
+            elif role == "long":
+                lon = _number(v)
+            else:
+                periods = [self._period(p) for p in (v if type(v) is list else [v]) if type(p) is dict]
+        return [iri, types, lat, lon, periods]
+
+
+# ---------------------------
+# Writing
+# ---------------------------
+
+class ByteCounter:
+    """Text sink in front of the output file that counts the UTF-8 bytes written."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.pos = 0
+
+    def write(self, text):
+        self.pos += len(text) if text.isascii() else len(text.encode("utf-8"))
+        self.fp.write(text)
+
+
+class SidecarIndex:
+    """Collects (byte range, NodeFields entry) per written node and saves the index."""
+
+    def __init__(self, active, fmt, indent=None, degrees=GRID_DEGREES, bin_seconds=BIN_SECONDS):
+        self.fields = NodeFields(active)
+        self.prefixes = dict(active.prefixes)
+        self.fmt = fmt
+        self.indent = indent
+        self.degrees = degrees
+        self.bin_seconds = bin_seconds
+        self.offset, self.length, self.iri, self.type, self.lat, self.lon, self.periods = ([] for _ in range(7))
+        self._types = {}
+
+    def add(self, start, end, entry):
+        iri, types, lat, lon, periods = entry
+        self.offset.append(start)
+        self.length.append(end - start)
+        self.iri.append(iri)
+        # nodes share a few type lists: store each once, nodes hold its number
+        key = tuple(types) if types else ()
+        t = self._types.get(key)
+        if t is None:
+            t = self._types[key] = len(self._types)
+        self.type.append(t)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.periods.append(periods)
+
+    def _grid(self):
+        cells = {}
+        d = self.degrees
+        for n, (lat, lon) in enumerate(zip(self.lat, self.lon)):
+            if lat is not None and lon is not None:
+                cells.setdefault(f"{math.floor(lat / d)},{math.floor(lon / d)}", []).append(n)
+        return {"degrees": d, "cells": cells}
+
+    def _intervals(self):
+        bins, open_end, open_start = {}, [], []
+        w = self.bin_seconds
+        for n, periods in enumerate(self.periods):
+            for start, end in periods:
+                if end is None:
+                    open_end.append([start, n])
+                elif start is None:
+                    open_start.append([end, n])
+                else:
+                    for b in range(math.floor(start / w), math.floor(end / w) + 1):
+                        nodes = bins.setdefault(str(b), [])
+                        if not nodes or nodes[-1] != n:
+                            nodes.append(n)
+        # a missing start sorts first: open at both ends
+        open_end.sort(key=lambda p: -math.inf if p[0] is None else p[0])
+        open_start.sort()
+        return {"binSeconds": w, "bins": bins, "openEnd": open_end, "openStart": open_start}
+
+    def save(self, path, out_path, written):
+        """Write the index for out_path, of which `written` bytes went through the ByteCounter."""
+        st = os.stat(out_path)
+        if written != st.st_size:
+            raise ValueError(f"{out_path} has {st.st_size} bytes, {written} were written: offsets would be wrong")
+        data = {
+            "version": INDEX_VERSION,
+            "output": os.path.abspath(out_path),
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "format": self.fmt,
+            "indent": self.indent,
+            "prefixes": self.prefixes,
+            "types": [list(t) for t in self._types],
+            "nodes": {"offset": self.offset, "length": self.length, "iri": self.iri, "type": self.type,
+                      "lat": self.lat, "lon": self.lon, "periods": self.periods},
+            "grid": self._grid(),
+            "time": self._intervals(),
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return len(self.offset)
+
+
+def _local_name(iri):
+    return iri.rsplit("#", 1)[-1].rsplit("/", 1)[-1]
+
+
+def index_path(out_path):
+    return out_path + ".idx.json"
+
+
+# ---------------------------
+# Querying
+# ---------------------------
+
+class Sidecar:
+    """A loaded index; select() returns node numbers, read() their text in the output."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path}: index version {data.get('version')} (expected {INDEX_VERSION})")
+        self.data = data
+        self.nodes = data["nodes"]
+        self.output = data["output"]
+        self._iris = None
+
+    def check(self):
+        """Raise ValueError if the output changed since the index was written."""
+        try:
+            st = os.stat(self.output)
+        except OSError as e:
+            raise ValueError(f"{self.output} is missing: {e}") from e
+        if st.st_size != self.data["size"] or st.st_mtime_ns != self.data["mtime"]:
+            raise ValueError(f"{self.output} changed since it was indexed; convert it again with --index")
+
+    def expand(self, value):
+        prefix, sep, rest = value.partition(":")
+        if sep and not rest.startswith("//") and prefix in self.data["prefixes"]:
+            return self.data["prefixes"][prefix] + rest
+        return value
+
+    def by_iri(self, iris):
+        if self._iris is None:
+            self._iris = {}
+            for n, iri in enumerate(self.nodes["iri"]):
+                self._iris.setdefault(iri, []).append(n)
+        return {n for iri in iris for n in self._iris.get(self.expand(iri), ())}
+
+    def in_box(self, south, west, north, east):
+        """Nodes with south <= lat <= north and west <= lon <= east (west > east crosses 180)."""
+        grid = self.data["grid"]
+        d, cells = grid["degrees"], grid["cells"]
+        rows = range(math.floor(south / d), math.floor(north / d) + 1)
+        if west <= east:
+            cols = range(math.floor(west / d), math.floor(east / d) + 1)
+        else:
+            cols = [*range(math.floor(west / d), math.floor(180 / d) + 1),
+                    *range(math.floor(-180 / d), math.floor(east / d) + 1)]
+        if len(rows) * len(cols) <= len(cells):
+            candidates = {n for i in rows for j in cols for n in cells.get(f"{i},{j}", ())}
+        else:
+            rows, cols = set(rows), set(cols)
+            candidates = set()
+            for key, nodes in cells.items():
+                i, j = map(int, key.split(","))
+                if i in rows and j in cols:
+                    candidates.update(nodes)
+        lat, lon = self.nodes["lat"], self.nodes["lon"]
+        return {n for n in candidates if south <= lat[n] <= north
+                and (west <= lon[n] <= east if west <= east else (lon[n] >= west or lon[n] <= east))}
+
+    def active(self, start, end):
+        """Nodes with an operational period overlapping [start, end] (seconds; None: open)."""
+        lo = -math.inf if start is None else start
+        hi = math.inf if end is None else end
+        time = self.data["time"]
+        open_end = time["openEnd"]
+        starts = [-math.inf if s is None else s for s, _ in open_end]
+        found = {n for _, n in open_end[:bisect.bisect_right(starts, hi)]}
+        open_start = time["openStart"]
+        found.update(n for _, n in open_start[bisect.bisect_left([e for e, _ in open_start], lo):])
+        bins = time["bins"]
+        w = time["binSeconds"]
+        lo_bin = math.floor(lo / w) if lo > -math.inf else -math.inf
+        hi_bin = math.floor(hi / w) if hi < math.inf else math.inf
+        if hi_bin - lo_bin < len(bins):
+            keys = map(str, range(lo_bin, hi_bin + 1))
+        else:
+            keys = [k for k in bins if lo_bin <= int(k) <= hi_bin]
+        periods = self.nodes["periods"]
+        for k in keys:
+            for n in bins.get(k, ()):
+                if n not in found and any(s is not None and e is not None and s <= hi and e >= lo
+                                          for s, e in periods[n]):
+                    found.add(n)
+        return found
+
+    def of_type(self, types):
+        wanted = {self.expand(t) for t in types}
+        hits = {i for i, ts in enumerate(self.data["types"])
+                if any(t in wanted or _local_name(t) in wanted for t in ts)}
+        return {n for n, t in enumerate(self.nodes["type"]) if t in hits}
+
+    def select(self, iris=None, box=None, start=None, end=None, types=None, timed=False):
+        """Node numbers in output order matching every given condition."""
+        found = None
+        for part in (self.by_iri(iris) if iris else None,
+                     self.in_box(*box) if box else None,
+                     self.active(start, end) if timed else None,
+                     self.of_type(types) if types else None):
+            if part is not None:
+                found = part if found is None else found & part
+        return sorted(range(len(self.nodes["offset"])) if found is None else found)
+
+    def read(self, numbers):
+        """(node number, text) for the numbers, sorted by offset: one seek and read each."""
+        offset, length = self.nodes["offset"], self.nodes["length"]
+        fmt, indent = self.data["format"], self.data["indent"]
+        with open(self.output, "rb") as f:
+            for n in sorted(numbers, key=offset.__getitem__):
+                f.seek(offset[n])
+                text = f.read(length[n]).decode("utf-8")
+                if fmt == "jsonld":
+                    text = text.lstrip().lstrip(",").strip()
+                    if indent is not None:
+                        text = json.dumps(json.loads(text), ensure_ascii=False, separators=(",", ":"))
+                    text += "\n"
+                yield n, text
+
+
+def query_main(argv):
+    import argparse
+    ap = argparse.ArgumentParser(prog="convert.py query",
+                                 description="Read matching nodes from converted output through its sidecar index")
+    ap.add_argument("output", help="Output written by convert.py --index")
+    ap.add_argument("--index", help="Index path (default <output>.idx.json)")
+    ap.add_argument("--iri", action="append", help="Node @id (IRI or compact IRI); repeatable")
+    ap.add_argument("--bbox", nargs=4, type=float, metavar=("MINLAT", "MINLON", "MAXLAT", "MAXLON"),
+                    help="Nodes whose wgs:lat / wgs:long fall in the box (MINLON > MAXLON crosses 180)")
+    ap.add_argument("--at", help="Nodes with an operational period containing this time (xsd:dateTime or date)")
+    ap.add_argument("--start", help="Nodes with an operational period overlapping [start, end]")
+    ap.add_argument("--end")
+    ap.add_argument("--type", action="append", help="@type (IRI, compact IRI or local name); repeatable")
+    ap.add_argument("--ids", action="store_true", help="Print the matching IRIs only, without reading the output")
+    ap.add_argument("--count", action="store_true", help="Print the number of matching nodes only")
+    args = ap.parse_args(argv)
+
+    times = {}
+    for name in ("at", "start", "end"):
+        value = getattr(args, name)
+        if value is not None:
+            times[name] = parse_time(value)
+            if times[name] is None:
+                ap.error(f"--{name}: not a date or dateTime: {value}")
+    if "at" in times and ("start" in times or "end" in times):
+        ap.error("--at and --start / --end are exclusive")
+    start, end = (times["at"], times["at"]) if "at" in times else (times.get("start"), times.get("end"))
+
+    try:
+        sidecar = Sidecar(args.index or index_path(args.output))
+        sidecar.check()
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Cannot use the index: {e}")
+    found = sidecar.select(args.iri, args.bbox, start, end, args.type, timed=bool(times))
+    if args.count:
+        print(len(found))
+    elif args.ids:
+        for n in found:
+            print(sidecar.nodes["iri"][n])
+    else:
+        write = sys.stdout.write
+        for _, text in sidecar.read(found):
+            write(text)
+    return 0
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark stage 2 (ICDM -> JSON-LD) throughput in nodes/second.
+
+Uses one synthetic network with --stations stations so the result does not depend on
+how networks and stations are paired. Pass --baseline with another convert.py (e.g. an
+older revision from `git show <rev>:stationxml-to-jsonld/src/convert.py > old.py`)
+to compare both implementations on the same input.
+"""
+import argparse, importlib.util, json, pathlib, sys, time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "src"))
+
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def synthetic_icdm(n_stations):
+    net = {"code": "ZZ", "start": "2010-01-01T00:00:00Z", "end": None, "restricted": "open",
+           "sourceId": "https://doi.org/10.9999/ZZ", "description": "Synthetic",
+           "totalStations": str(n_stations), "selectedStations": str(n_stations)}
+    stations = [{"code": f"S{i:05d}", "start": "2010-01-01T00:00:00Z", "end": None,
+                 "sourceId": f"https://doi.org/10.9999/ZZ.S{i:05d}", "name": f"Site {i}",
+                 "latitude": "42.35", "longitude": "13.40", "elevation": "0.5",
+                 "networkIndex": 0}
+                for i in range(n_stations)]
+    return {"Network": [net], "Station": stations}
+
+
+def bench(mod, icdm, owl_map, ctx, repeat):
+    best = None
+    nodes = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = mod.apply_mapping(icdm, owl_map, ctx, compact=True)
+        dt = time.perf_counter() - t0
+        nodes = len(out["@graph"])
+        best = dt if best is None else min(best, dt)
+    return {"nodes": nodes, "seconds": round(best, 4), "nodesPerSecond": round(nodes / best)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark ICDM -> JSON-LD mapping throughput")
+    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.json")
+    ap.add_argument("--context", default="contexts/context-strict-v1.jsonld")
+    ap.add_argument("--stations", type=int, default=50000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--baseline", help="Path to another convert.py to compare against")
+    args = ap.parse_args()
+
+    with open(args.context, "r", encoding="utf-8") as f:
+        ctx = json.load(f)
+    icdm = synthetic_icdm(args.stations)
+
+    report = {"current": bench(load_module(HERE.parent / "src" / "convert.py", "convert"),
+                               icdm, args.owl_map, ctx, args.repeat)}
+    if args.baseline:
+        report["baseline"] = bench(load_module(args.baseline, "convert_baseline"),
+                                   icdm, args.owl_map, ctx, args.repeat)
+        report["speedup"] = round(report["current"]["nodesPerSecond"] / report["baseline"]["nodesPerSecond"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
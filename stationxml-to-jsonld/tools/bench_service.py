@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Local client for src/serve.py: starts the service in-process on a free 127.0.0.1 port,
+posts one StationXML document --requests times from --concurrency threads, checks every
+response against a one-shot `convert.py` run of the same document, and reports latency
+and throughput next to the cost of that cold run (interpreter start, imports, config).
+It fails unless every response matches and /metrics, read right after the last
+response, counts every request. The default document has responses, so the request
+threads serialize coefficient arrays concurrently with the default JSON backend.
+
+  python3 tools/bench_service.py --requests 200 --concurrency 4
+"""
+import argparse, http.client, json, os, pathlib, subprocess, sys, tempfile, threading, time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "src"))
+
+from convert import JSON_BACKENDS  # noqa: E402
+from serve import make_server, percentiles  # noqa: E402
+
+
+def cold_run(args, query):
+    """(seconds, output bytes) of one convert.py process with the same options."""
+    cmd = [sys.executable, str(HERE.parent / "src" / "convert.py"), "--xml", args.xml, "--xml-map", args.xml_map,
+           "--owl-map", args.owl_map, "--context", args.context, "--format", query["format"],
+           "--json-backend", args.json_backend]
+    if query.get("form") != "compact":
+        cmd.append("--" + query["form"])
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out")
+        t0 = time.perf_counter()
+        subprocess.run(cmd + ["--out", out], check=True, capture_output=True)
+        seconds = time.perf_counter() - t0
+        with open(out, "rb") as f:
+            return seconds, f.read()
+
+
+def post(port, path, body):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    try:
+        t0 = time.perf_counter()
+        conn.request("POST", path, body=body, headers={"Content-Type": "application/xml"})
+        resp = conn.getresponse()
+        first = time.perf_counter() - t0
+        data = resp.read()
+        return resp.status, data, first, time.perf_counter() - t0
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark and check the conversion service with a local client")
+    ap.add_argument("--xml", default="examples/sample-response.stationxml")
+    ap.add_argument("--xml-map", default="mappings/xml-to-icdm.yaml")
+    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.json")
+    ap.add_argument("--context", default="contexts/context-strict-v1.jsonld")
+    ap.add_argument("--format", choices=["jsonld", "ndjson", "nt"], default="jsonld")
+    ap.add_argument("--form", choices=["compact", "expanded", "curie"], default="compact")
+    ap.add_argument("--requests", type=int, default=100)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--max-active", type=int, default=4)
+    ap.add_argument("--json-backend", choices=JSON_BACKENDS, default="auto")
+    args = ap.parse_args()
+
+    query = {"format": args.format, "form": args.form}
+    cold_seconds, expected = cold_run(args, query)
+
+    t0 = time.perf_counter()
+    server = make_server((args.xml_map, args.owl_map, args.context, None), port=0,
+                         backend=args.json_backend, max_active=args.max_active, quiet=True)
+    load_seconds = time.perf_counter() - t0
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with open(args.xml, "rb") as f:
+        body = f.read()
+    path = f"/convert?format={args.format}&form={args.form}"
+    latencies, first_bytes, failures = [], [], []
+    lock = threading.Lock()
+    todo = iter(range(args.requests))
+
+    def client():
+        while True:
+            with lock:
+                if next(todo, None) is None:
+                    return
+            status, data, first, total = post(port, path, body)
+            with lock:
+                latencies.append(total)
+                first_bytes.append(first)
+                if status != 200 or data != expected:
+                    failures.append(status)
+
+    t0 = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(args.concurrency)]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    wall = time.perf_counter() - t0
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/metrics")
+    metrics = json.loads(conn.getresponse().read())
+    conn.close()
+    server.shutdown()
+    server.server_close()
+
+    print(json.dumps({
+        "input": args.xml,
+        "inputBytes": len(body),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "mismatches": len(failures),
+        "coldConvertSeconds": round(cold_seconds, 4),
+        "serviceConfigLoadSeconds": round(load_seconds, 4),
+        "clientLatencyMs": percentiles(latencies),
+        "clientFirstByteMs": percentiles(first_bytes),
+        "requestsPerSecond": round(args.requests / wall, 2),
+        "server": metrics,
+    }, indent=2))
+    if failures:
+        raise SystemExit(f"{len(failures)} responses differ from convert.py output")
+    if metrics["requests"] != args.requests:
+        raise SystemExit(f"/metrics counts {metrics['requests']} of {args.requests} completed requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Build a read-only sqlite lookup table for large 'lookup' rules (see src/lookups.py).
+
+Input is a JSON object {key: value}, a JSON file of several tables with --table NAME, or
+a CSV/TSV file with key,value columns (--skip-header to drop the first row). Keys are
+case-folded as convert.py expects; a later duplicate replaces an earlier one.
+
+  python3 tools/build_lookup_db.py doi-operators.csv --out lookups/doiOperator.sqlite
+Then reference the file from --extra-lookups: {"doiOperator": "lookups/doiOperator.sqlite"}
+"""
+import argparse, csv, json, os, pathlib, sqlite3, sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+from lookups import fold  # noqa: E402
+
+
+def read_pairs(path, table=None, skip_header=False):
+    if path.lower().endswith((".csv", ".tsv", ".txt")):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = csv.reader(f, delimiter="\t" if path.lower().endswith(".tsv") else ",")
+            if skip_header:
+                next(rows, None)
+            for row in rows:
+                if len(row) >= 2 and row[0]:
+                    yield row[0], row[1]
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if table is not None:
+        data = data[table]
+    for k, v in data.items():
+        yield k, v
+
+
+def build(pairs, out):
+    tmp = out + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE lookup (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID")
+    conn.executemany("INSERT OR REPLACE INTO lookup VALUES (?, ?)",
+                     ((fold(k), str(v)) for k, v in pairs))
+    conn.commit()
+    count = conn.execute("SELECT count(*) FROM lookup").fetchone()[0]
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp, out)
+    return count
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build an sqlite lookup table for convert.py")
+    ap.add_argument("source", help="JSON object or CSV/TSV with key,value rows")
+    ap.add_argument("--out", required=True, help="Output .sqlite file")
+    ap.add_argument("--table", help="Take this table from a JSON file of several tables")
+    ap.add_argument("--skip-header", action="store_true", help="CSV/TSV: ignore the first row")
+    args = ap.parse_args()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    count = build(read_pairs(args.source, args.table, args.skip_header), args.out)
+    print(f"Wrote {args.out} ({count} keys)")
+
+
+if __name__ == "__main__":
+    main()
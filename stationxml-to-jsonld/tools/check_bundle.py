@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Check that `convert.py --bundle` converts with the mapping the command line asks for:
+runs convert.py with and without a bundle in a temporary directory and compares the
+outputs, while the bundle's sources and the --owl-map option differ, agree, are left
+out, and after the mapping file changes. Exits non-zero on the first wrong case.
+
+  python3 tools/check_bundle.py --xml examples/sample.stationxml
+"""
+import argparse, json, os, pathlib, subprocess, sys, tempfile
+
+HERE = pathlib.Path(__file__).resolve().parent
+CONVERT = str(HERE.parent / "src" / "convert.py")
+
+
+def run(xml, out, *options):
+    """(output text, log lines) of one convert.py run."""
+    proc = subprocess.run([sys.executable, CONVERT, "--xml", xml, "--out", out, *options],
+                          check=True, capture_output=True, text=True)
+    with open(out, "r", encoding="utf-8") as f:
+        return f.read(), [line for line in proc.stdout.splitlines() if line.startswith("Bundle ")]
+
+
+def write_mapping(source, path, base):
+    with open(source, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    mapping["iriPolicy"]["resourceBaseId"] = base
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(mapping, f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check --bundle against the mapping options and changed files")
+    ap.add_argument("--xml", default="examples/sample.stationxml")
+    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.json", help="JSON mapping to derive variants from")
+    args = ap.parse_args()
+
+    failures = []
+
+    def check(name, got, expected, logs, note):
+        ok = got == expected and (any(note in line for line in logs) if note else not logs)
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {logs[0] if logs else 'loaded'}")
+        if not ok:
+            failures.append(name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out.jsonld")
+        bundle = os.path.join(tmp, "config.bundle.json")
+        owl = os.path.join(tmp, "owl.json")
+        write_mapping(args.owl_map, owl, "https://first.example.org/id/")
+        default_out, _ = run(args.xml, out)
+        first_out, _ = run(args.xml, out, "--owl-map", owl)
+
+        subprocess.run([sys.executable, CONVERT, "compile", "--owl-map", args.owl_map, "--out", bundle],
+                       check=True, capture_output=True)
+        got, logs = run(args.xml, out, "--bundle", bundle)
+        check("no mapping options", got, default_out, logs, None)
+        got, logs = run(args.xml, out, "--bundle", bundle, "--owl-map", owl)
+        check("--owl-map differs from the bundle", got, first_out, logs, "--owl-map")
+        got, logs = run(args.xml, out, "--bundle", bundle, "--owl-map", owl)
+        check("--owl-map matches the rebuilt bundle", got, first_out, logs, None)
+        got, logs = run(args.xml, out, "--bundle", bundle)
+        check("options left out use the bundle's sources", got, first_out, logs, None)
+
+        write_mapping(args.owl_map, owl, "https://second.example.org/id/")
+        second_out, _ = run(args.xml, out, "--owl-map", owl)
+        got, logs = run(args.xml, out, "--bundle", bundle, "--owl-map", owl)
+        check("mapping file changed", got, second_out, logs, "changed")
+        if first_out == second_out or first_out == default_out:
+            failures.append("the mapping variants do not change the output of this --xml")
+
+    if failures:
+        raise SystemExit(f"{len(failures)} failed: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main()
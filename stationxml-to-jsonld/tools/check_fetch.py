@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Check src/fetch.py end to end with several converter threads: starts the fdsnws-station
+stand-in in-process, fetches one StationXML document as --sources separate sources with
+--jobs at once (per-file output, then --merge), and compares every output with a serial
+in-process conversion of the same document. Exits non-zero on any difference or failed
+source. The default document has coefficient arrays, so the converter threads serialize
+them at the same time with the default JSON backend.
+
+  python3 tools/check_fetch.py --sources 8 --jobs 4 --fail-every 5 --drop-every 7
+"""
+import argparse, asyncio, io, os, pathlib, sys, tempfile, time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "src"))
+sys.path.insert(0, str(HERE))
+
+from convert import JSON_BACKENDS, JsonLdStreamWriter, convert_stream, document_head, load_config  # noqa: E402
+from fdsnws_standin import start_standin  # noqa: E402
+from fetch import fetch_and_convert, output_path  # noqa: E402
+
+
+def serial_output(xml, config, form, backend, copies=1):
+    """The document converted in this thread, copies times into one graph."""
+    context, graph_key = document_head(config, form)
+    out = io.StringIO()
+    writer = JsonLdStreamWriter(out, context, backend=backend, graph_key=graph_key)
+    for _ in range(copies):
+        with open(xml, "rb") as f:
+            for node in convert_stream(f, config, form=form):
+                writer.write(node)
+    writer.close()
+    return out.getvalue()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check fetch.py with several converter threads against a local stand-in")
+    ap.add_argument("--xml", default="examples/sample-response.stationxml")
+    ap.add_argument("--xml-map", default="mappings/xml-to-icdm.yaml")
+    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.json")
+    ap.add_argument("--context", default="contexts/context-strict-v1.jsonld")
+    ap.add_argument("--form", choices=["compact", "expanded", "curie"], default="compact")
+    ap.add_argument("--json-backend", choices=JSON_BACKENDS, default="auto")
+    ap.add_argument("--sources", type=int, default=8)
+    ap.add_argument("-j", "--jobs", type=int, default=4)
+    ap.add_argument("--fail-every", type=int, default=0, help="Stand-in answers every Nth request with 503")
+    ap.add_argument("--drop-every", type=int, default=0, help="Stand-in cuts every Nth response mid-body")
+    args = ap.parse_args()
+
+    config = load_config(args.xml_map, args.owl_map, args.context)
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        net = "doc"
+        with open(args.xml, "rb") as src, open(os.path.join(tmp, net + ".xml"), "wb") as dst:
+            dst.write(src.read())
+        server, base = start_standin(tmp, fail_every=args.fail_every, drop_every=args.drop_every)
+        # distinct URLs for the same document; the stand-in ignores the extra parameter
+        urls = [f"{base}?net={net}&copy={i}" for i in range(args.sources)]
+        run = dict(jobs=args.jobs, per_host=args.jobs, backoff=0.0, form=args.form, backend=args.json_backend)
+        try:
+            t0 = time.perf_counter()
+            out_dir = os.path.join(tmp, "out")
+            results, _ = asyncio.run(fetch_and_convert(urls, config, out_dir=out_dir, **run))
+            files_seconds = time.perf_counter() - t0
+            problems += [f"{r['url']}: {r['error']}" for r in results if "error" in r]
+            outputs = {}
+            for i, url in enumerate(urls):
+                path = output_path(i, url, out_dir, "jsonld")
+                if os.path.exists(path):
+                    with open(path, "r", encoding="utf-8") as f:
+                        outputs[url] = f.read()
+
+            t0 = time.perf_counter()
+            context, graph_key = document_head(config, args.form)
+            out = io.StringIO()
+            writer = JsonLdStreamWriter(out, context, backend=args.json_backend, graph_key=graph_key)
+            results, _ = asyncio.run(fetch_and_convert(urls, config, merge_writer=writer, **run))
+            writer.close()
+            merge_seconds = time.perf_counter() - t0
+            problems += [f"{r['url']} (merge): {r['error']}" for r in results if "error" in r]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    # serial conversions only now: serializing in the main thread first would hide
+    # faults that only show when the converter threads are the first to serialize
+    expected = serial_output(args.xml, config, args.form, args.json_backend)
+    problems += [f"{url}: output differs from the serial conversion" for url, text in outputs.items()
+                 if text != expected]
+    if out.getvalue() != serial_output(args.xml, config, args.form, args.json_backend, args.sources):
+        problems.append("merged output differs from the serial conversion")
+
+    print(f"{args.sources} sources, {args.jobs} jobs: per-file {files_seconds:.2f}s, merged {merge_seconds:.2f}s")
+    if problems:
+        raise SystemExit("\n".join(problems))
+    print("OK: every output matches the serial conversion")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Check that --format nt and the JSON-LD output describe the same graph: converts one
+StationXML document to N-Triples and to JSON-LD in each output form, turns the JSON-LD
+into RDF with pyld, canonicalizes both datasets (URDNA2015) and compares them. Exits
+non-zero and prints the differing lines on any mismatch. Needs pyld (pip install pyld).
+
+  python3 tools/check_rdf.py --xml examples/sample-response.stationxml
+"""
+import argparse, io, json, pathlib, sys
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "src"))
+
+from convert import OUTPUT_FORMS, convert_stream, document_head, load_config, open_writer  # noqa: E402
+
+
+def convert(xml, config, fmt, form):
+    out = io.StringIO()
+    with open(xml, "rb") as f, open_writer(out, config, fmt, None, "stdlib", form) as writer:
+        for node in convert_stream(f, config, form=form):
+            writer.write(node)
+    return out.getvalue()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare --format nt with the RDF of the JSON-LD output")
+    ap.add_argument("--xml", default="examples/sample-response.stationxml")
+    ap.add_argument("--xml-map", default="mappings/xml-to-icdm.yaml")
+    ap.add_argument("--owl-map", default="mappings/icdm-to-owl.json")
+    ap.add_argument("--context", default="contexts/context-strict-v1.jsonld")
+    args = ap.parse_args()
+
+    try:
+        from pyld import jsonld
+    except ImportError:
+        raise SystemExit("pyld is not installed. Install with: pip install pyld")
+    canonical = {"algorithm": "URDNA2015", "format": "application/n-quads"}
+
+    config = load_config(args.xml_map, args.owl_map, args.context)
+    expected = jsonld.normalize(convert(args.xml, config, "nt", "curie"),
+                                {**canonical, "inputFormat": "application/n-quads"})
+    failed = False
+    for form in OUTPUT_FORMS:
+        doc = json.loads(convert(args.xml, config, "jsonld", form))
+        if document_head(config, form)[0] is None:
+            doc = doc["@graph"]
+        got = jsonld.normalize(doc, canonical)
+        if got == expected:
+            print(f"{form}: same graph ({expected.count(chr(10))} triples)")
+            continue
+        failed = True
+        ours, theirs = set(expected.splitlines()), set(got.splitlines())
+        print(f"{form}: graphs differ ({len(ours - theirs)} nt-only, {len(theirs - ours)} JSON-LD-only triples)")
+        for line in sorted(ours - theirs)[:5]:
+            print("  nt:     ", line)
+        for line in sorted(theirs - ours)[:5]:
+            print("  JSON-LD:", line)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
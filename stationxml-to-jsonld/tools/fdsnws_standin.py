@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an fdsnws-station service, to exercise src/fetch.py without a data
+center. GET /fdsnws/station/1/query?net=XX serves <dir>/XX.xml (or .stationxml, .staxml),
+chunked over keep-alive connections; an unknown net gets 204, or 404 with nodata=404.
+Faults on demand:
+  --delay S       sleep S seconds before each chunk (a slow link)
+  --fail-every N  answer every Nth request 503 with Retry-After: 0
+  --drop-every N  cut every Nth response halfway through its body
+  --gzip          send Content-Encoding: gzip
+
+  python3 tools/fdsnws_standin.py --dir examples --port 8081 --delay 0.01 --fail-every 5
+  python3 src/fetch.py 'http://127.0.0.1:8081/fdsnws/station/1/query?net=sample' --merge build/sample.jsonld
+"""
+import argparse, gzip, itertools, os, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+QUERY_PATH = "/fdsnws/station/1/query"
+SUFFIXES = (".xml", ".stationxml", ".staxml")
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _empty(self, status, extra=()):
+        self.send_response(status)
+        for name, value in extra:
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        n = next(server.counter)
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path != QUERY_PATH or "net" not in params:
+            self._empty(400)
+            return
+        if server.fail_every and n % server.fail_every == 0:
+            self._empty(503, [("Retry-After", "0")])
+            return
+        name = os.path.join(server.directory, os.path.basename(params["net"]))
+        path = next((name + ext for ext in SUFFIXES if os.path.isfile(name + ext)), None)
+        if path is None:
+            self._empty(404 if params.get("nodata") == "404" else 204)
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        if server.gzip:
+            body = gzip.compress(body, 6)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        if server.gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        cut = len(body) // 2 if server.drop_every and n % server.drop_every == 0 else None
+        for pos in range(0, len(body), server.chunk):
+            if cut is not None and pos >= cut:
+                self.close_connection = True
+                return
+            if server.delay:
+                time.sleep(server.delay)
+            data = body[pos:pos + server.chunk]
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def make_standin(directory, host="127.0.0.1", port=0, chunk=64 << 10, delay=0.0, fail_every=0, drop_every=0,
+                 use_gzip=False, quiet=True):
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.directory = directory
+    server.chunk = chunk
+    server.delay = delay
+    server.fail_every = fail_every
+    server.drop_every = drop_every
+    server.gzip = use_gzip
+    server.quiet = quiet
+    server.counter = itertools.count(1)
+    return server
+
+
+def start_standin(directory, **options):
+    """Start a stand-in on a free port in a daemon thread; returns (server, base URL)."""
+    server = make_standin(directory, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}{QUERY_PATH}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local fdsnws-station stand-in serving StationXML files")
+    ap.add_argument("--dir", default="examples", help="Directory of <net>.xml / .stationxml files")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8081)
+    ap.add_argument("--chunk", type=int, default=64 << 10)
+    ap.add_argument("--delay", type=float, default=0.0, help="Seconds before each chunk")
+    ap.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with 503")
+    ap.add_argument("--drop-every", type=int, default=0, help="Cut every Nth response mid-body")
+    ap.add_argument("--gzip", action="store_true")
+    args = ap.parse_args()
+
+    server = make_standin(args.dir, args.host, args.port, args.chunk, args.delay, args.fail_every,
+                          args.drop_every, args.gzip, quiet=False)
+    print(f"Serving {args.dir} at http://{args.host}:{server.server_address[1]}{QUERY_PATH}?net=<name>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
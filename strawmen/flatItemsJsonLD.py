@@ -4,7 +4,7 @@ import sys
 from lxml import etree
 import json
 import re
-from util import STAXML_NS, createNetworkSid, createStationSid, AbstractStationJson
+from util import STAXML_NS, createNetworkSid, createStationSid, AbstractStationJson, runMain
 from abc import ABC
 from mostBasic import MostBasic
 
@@ -83,26 +83,14 @@ class FlatItemsJsonLD(MostBasic):
         return station
 
     def addStationToNetwork(self, station, net, envelope):
-        if DATA not in envelope:
-            envelope[DATA] = []
-        envelope[DATA].append(station)
+        self.appendTo(envelope, DATA, station)
 
     def addNetworkToEnvelope(self, net, envelope):
-        if DATA not in envelope:
-            envelope[DATA] = []
-        envelope[DATA].append(net)
+        self.appendTo(envelope, DATA, net)
 
 def main():
     converter = FlatItemsJsonLD()
-    file = "CO_XD.staxml"
-    if len(sys.argv) > 1:
-        file = sys.argv[1]
-    with open(file, "rb") as inxml:
-        jsonObj = converter.toJson(inxml.read())
-
-    with open(f"{converter.name()}.json", "w") as outjson:
-        json.dump(jsonObj, outjson, indent=2)
-    print(json.dumps(jsonObj, indent=2))
+    return runMain(converter, sys.argv)
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -4,7 +4,7 @@ import sys
 from lxml import etree
 import json
 import re
-from util import STAXML_NS, createNetworkSid, createStationSid, AbstractStationJson
+from util import STAXML_NS, createNetworkSid, createStationSid, AbstractStationJson, runMain
 from abc import ABC
 from mostBasic import MostBasic
 
@@ -21,7 +21,7 @@ class JsonApi(MostBasic):
 
     def createNetwork(self, xmlnetwork):
         basicnetwork=  super().createNetwork(xmlnetwork)
-        sid = createNetworkSid(xmlnetwork)
+        sid = self.sids.networkSid(xmlnetwork)
         network = {
             "type": "network",
             "id": f"{sid}",
@@ -30,7 +30,7 @@ class JsonApi(MostBasic):
         return network
     def createStation(self, xmlstation, xmlnetwork):
         basicstation=  super().createStation(xmlstation, xmlnetwork)
-        sid = createStationSid(xmlstation, xmlnetwork)
+        sid = self.sids.stationSid(xmlstation, xmlnetwork)
         station = {
             "type": "station",
             "id": f"{sid}",
@@ -46,36 +46,20 @@ class JsonApi(MostBasic):
         }
         return station
     def addStationToNetwork(self, station, net, envelope):
-        if "relationships" not in net:
-            net["relationships"] = {
-                "station": []
-            }
-        net["relationships"]["station"].append({
+        self.appendTo(net.setdefault("relationships", {}), "station", {
             "data": {
                 "type": "station",
                 "id": station["attributes"]["sourceid"]
             }
         })
-        if "included" not in envelope:
-            envelope["included"] = []
-        envelope["included"].append(station)
+        self.appendTo(envelope, "included", station)
 
     def addNetworkToEnvelope(self, net, envelope):
-        if "data" not in envelope:
-            envelope["data"] = []
-        envelope["data"].append(net)
+        self.appendTo(envelope, "data", net)
 
 def main():
     converter = JsonApi()
-    file = "CO_XD.staxml"
-    if len(sys.argv) > 1:
-        file = sys.argv[1]
-    with open(file, "rb") as inxml:
-        jsonObj = converter.toJson(inxml.read())
-
-    with open(f"{converter.name()}.json", "w") as outjson:
-        json.dump(jsonObj, outjson, indent=2)
-    print(json.dumps(jsonObj, indent=2))
+    return runMain(converter, sys.argv)
 
 if __name__ == "__main__":
     sys.exit(main())
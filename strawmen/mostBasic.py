@@ -4,21 +4,17 @@ import sys
 from lxml import etree
 import json
 import re
-from util import STAXML_NS, createNetworkSid, createStationSid, AbstractStationJson
+from util import STAXML_NS, createNetworkSid, createStationSid, AbstractStationJson, runMain
 from abc import ABC
 
 class MostBasic(AbstractStationJson):
     def name(self):
         return "mostbasic"
     def addStationToNetwork(self, station, net, envelope):
-        if "station" not in net:
-            net["station"] = []
-        net["station"].append(station)
+        self.appendTo(net, "station", station)
 
     def addNetworkToEnvelope(self, net, envelope):
-        if "network" not in envelope:
-            envelope["network"] = []
-        envelope["network"].append(net)
+        self.appendTo(envelope, "network", net)
 
     def createEnvelope(self, staxml):
         envelope = {
@@ -50,16 +46,7 @@ class MostBasic(AbstractStationJson):
 
 def main():
     converter = MostBasic()
-    file = "CO_XD.staxml"
-    if len(sys.argv) > 1:
-        file = sys.argv[1]
-    with open(file, "rb") as inxml:
-        jsonObj = converter.toJson(inxml.read())
-
-    with open(f"{converter.name()}.json", "w") as outjson:
-        json.dump(jsonObj, outjson, indent=2)
-
-    print(json.dumps(jsonObj, indent=2))
+    return runMain(converter, sys.argv)
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -4,7 +4,7 @@ import sys
 from lxml import etree
 import json
 import re
-from util import STAXML_NS, createNetworkSid, createStationSid, AbstractStationJson
+from util import STAXML_NS, createNetworkSid, createStationSid, AbstractStationJson, runMain
 from abc import ABC
 from mostBasic import MostBasic
 from relationshipsJsonLD import RelateJsonLD
@@ -25,35 +25,23 @@ class TopLevelRelatedJsonLD(RelateJsonLD):
 
     def addStationToNetwork(self, station, net, envelope):
         #envelope[DATA].append(station)
-        if DATA not in envelope:
-            envelope[DATA] = []
-        netsta = None
-        for ns in envelope[DATA]:
-            if ns['@id'] == net['@id']:
-                netsta = ns
+        # one networkstation entry per network @id, found via the node index (no scan)
+        netsta = self.findNode(net['@id'])
         if netsta is None:
-            netsta = {
+            netsta = self.indexNode(net['@id'], {
                 '@type': "networkstation",
                 '@id': net['@id'],
                 'data': {
                     STAID: []
                 }
-            }
-            envelope[DATA].append(netsta)
+            })
+            self.appendTo(envelope, DATA, netsta)
         netsta[DATA][STAID].append( f"{station['@id']}")
 
 
 def main():
     converter = TopLevelRelatedJsonLD()
-    file = "CO_XD.staxml"
-    if len(sys.argv) > 1:
-        file = sys.argv[1]
-    with open(file, "rb") as inxml:
-        jsonObj = converter.toJson(inxml.read())
-
-    with open(f"{converter.name()}.json", "w") as outjson:
-        json.dump(jsonObj, outjson, indent=2)
-    print(json.dumps(jsonObj, indent=2))
+    return runMain(converter, sys.argv)
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -3,9 +3,17 @@ import sys
 from lxml import etree
 import json
 import re
+import shutil
+import tempfile
 from abc import ABC, abstractmethod
 import simplemseed
 
+try:
+    # optional, several times faster than the json module
+    import orjson
+except ImportError:
+    orjson = None
+
 
 STAXML_NS="http://www.fdsn.org/xml/station/1"
 
@@ -36,13 +44,204 @@ def createChannelSid(xmlchannel, xmlstation, xmlnetwork):
     sid = f"{staSid}_{locCode}_{code[0]}_{code[1]}_{code[2]}"
     return simplemseed.FDSNSourceId.parse(sid)
 
+class SidResolver:
+    """
+    Memoized createNetworkSid / createStationSid / createChannelSid.
+
+    Network SIDs are cached by (code, startDate, sourceID) and station SIDs by network
+    key plus (code, sourceID), so each is created once per document instead of once
+    per child. Station and channel SIDs are built from the cached parent SID instead
+    of formatting a string and parsing it again. Results are equal to the
+    module functions; unusual codes (containing the "_" separator, or a missing
+    locationCode) fall back to them.
+    """
+    def __init__(self):
+        self.networks = {}
+        self.stations = {}
+
+    def clear(self):
+        self.networks.clear()
+        self.stations.clear()
+
+    def networkKey(self, xmlnetwork):
+        return (xmlnetwork.get("code"), xmlnetwork.get("startDate"), xmlnetwork.get("sourceID"))
+
+    def networkSid(self, xmlnetwork):
+        key = self.networkKey(xmlnetwork)
+        sid = self.networks.get(key)
+        if sid is None:
+            sid = self.networks[key] = createNetworkSid(xmlnetwork)
+        return sid
+
+    def stationSid(self, xmlstation, xmlnetwork):
+        code = xmlstation.get("code")
+        key = (self.networkKey(xmlnetwork), code, xmlstation.get("sourceID"))
+        sid = self.stations.get(key)
+        if sid is None:
+            netSid = self.networkSid(xmlnetwork)
+            if (key[2] is None and isinstance(netSid, simplemseed.NetworkSourceId)
+                    and "_" not in code and "_" not in netSid.networkCode):
+                sid = simplemseed.StationSourceId(netSid.networkCode, code)
+            else:
+                sid = createStationSid(xmlstation, xmlnetwork)
+            self.stations[key] = sid
+        return sid
+
+    def channelSid(self, xmlchannel, xmlstation, xmlnetwork):
+        code = xmlchannel.get("code")
+        locCode = xmlchannel.get("locationCode")
+        staSid = self.stationSid(xmlstation, xmlnetwork)
+        if (xmlchannel.get("sourceID") is None and isinstance(staSid, simplemseed.StationSourceId)
+                and locCode is not None and "_" not in locCode and "_" not in code[:3]):
+            return simplemseed.FDSNSourceId(staSid.networkCode, staSid.stationCode, locCode,
+                                            code[0], code[1], code[2])
+        return createChannelSid(xmlchannel, xmlstation, xmlnetwork)
+
+def serializeJson(jsonObj, pretty=False):
+    """
+    JSON text for jsonObj, compact unless pretty (2 space indent). Uses orjson when
+    installed, else the json module.
+    """
+    if orjson is not None:
+        return orjson.dumps(jsonObj, option=orjson.OPT_INDENT_2 if pretty else 0).decode("utf-8")
+    if pretty:
+        return json.dumps(jsonObj, indent=2, ensure_ascii=False)
+    return json.dumps(jsonObj, separators=(",", ":"), ensure_ascii=False)
+
+def mainArgs(argv, defaultFile="CO_XD.staxml"):
+    """(input file, pretty, stream) from a strawman command line: [file] [--pretty] [--stream]"""
+    flags = {"--pretty", "--stream"}
+    args = [a for a in argv[1:] if a not in flags]
+    return (args[0] if args else defaultFile), "--pretty" in argv[1:], "--stream" in argv[1:]
+
+def runMain(converter, argv):
+    """
+    Convert the file named on the command line to <name>.json and print it. With --stream
+    the document is parsed incrementally and the envelope written as it is built.
+    """
+    file, pretty, stream = mainArgs(argv)
+    outname = f"{converter.name()}.json"
+    if stream:
+        with open(outname, "w", encoding="utf-8") as outjson:
+            converter.streamJson(file, outjson, pretty)
+        with open(outname, "r", encoding="utf-8") as injson:
+            shutil.copyfileobj(injson, sys.stdout)
+        print()
+        return
+    with open(file, "rb") as inxml:
+        jsonObj = converter.toJson(inxml.read())
+
+    # serialize once, for both the file and stdout
+    jsonText = serializeJson(jsonObj, pretty)
+    with open(outname, "w", encoding="utf-8") as outjson:
+        outjson.write(jsonText)
+    print(jsonText)
+
+class EnvelopeWriter:
+    """
+    Writes an envelope whose lists arrive in pieces, with the same text as
+    serializeJson(envelope, pretty). start() takes the envelope as created, extend() a
+    dict of list items to append (e.g. one network's worth), close() finishes it.
+    The first list goes straight to fp; any other list is spooled to a temporary file
+    and copied out at close, so only the items of one extend() are held in memory.
+    """
+    def __init__(self, fp, pretty=False):
+        self.fp = fp
+        self.pretty = pretty
+        self.keys = []
+        self.values = {}
+        self.spools = {}
+        self.direct = None
+        self.written = 0
+        self.count = 0
+
+    def _key(self, key):
+        return serializeJson(key) + (": " if self.pretty else ":")
+
+    def _value(self, value, pad):
+        text = serializeJson(value, self.pretty)
+        return text.replace("\n", "\n" + pad) if self.pretty else text
+
+    def _open(self):
+        return "{\n  " if self.pretty else "{"
+
+    def _sep(self):
+        return ",\n  " if self.pretty else ","
+
+    def _member(self, key):
+        return (self._sep() if self.written else self._open()) + self._key(key)
+
+    def _items(self, out, first, items):
+        pad = "\n    " if self.pretty else ""
+        for item in items:
+            out.write(("," if not first else "") + pad + self._value(item, "    "))
+            first = False
+            self.count += 1
+
+    def start(self, envelope):
+        for key, value in envelope.items():
+            self.keys.append(key)
+            self.values[key] = [] if isinstance(value, list) else value
+        # members before the first list are complete already: write them now
+        for key in self.keys:
+            if isinstance(self.values[key], list):
+                break
+            self.fp.write(self._member(key) + self._value(self.values[key], "  "))
+            self.written += 1
+        self.extend({k: v for k, v in envelope.items() if isinstance(v, list) and v})
+
+    def extend(self, partial):
+        for key, items in partial.items():
+            if key not in self.values:
+                self.keys.append(key)
+                self.values[key] = [] if isinstance(items, list) else items
+            if not isinstance(items, list) or not items:
+                continue
+            if self.direct is None and self.keys[self.written] == key:
+                self.direct = key
+                self.fp.write(self._member(key) + "[")
+            if key == self.direct:
+                out, first = self.fp, self.values[key] == []
+            else:
+                out = self.spools.get(key)
+                if out is None:
+                    out = self.spools[key] = tempfile.TemporaryFile("w+", encoding="utf-8")
+                first = out.tell() == 0
+            self._items(out, first, items)
+            # only whether the list is empty matters from here on
+            self.values[key] = [True]
+
+    def close(self):
+        end = "\n  ]" if self.pretty else "]"
+        for key in self.keys[self.written:]:
+            value = self.values[key]
+            if key == self.direct:
+                self.fp.write(end)
+            elif key in self.spools:
+                spool = self.spools.pop(key)
+                self.fp.write(self._member(key) + "[")
+                spool.seek(0)
+                shutil.copyfileobj(spool, self.fp)
+                spool.close()
+                self.fp.write(end)
+            else:
+                self.fp.write(self._member(key) + self._value(value, "  "))
+            self.written += 1
+        self.fp.write(("\n}" if self.pretty else "}") if self.written else "{}")
+        return self.count
+
 class AbstractStationJson(ABC):
+    def __init__(self):
+        self.sids = SidResolver()
+        # id -> node, for formats that look up an already emitted node (reset per toJson)
+        self.nodes = {}
+
     @abstractmethod
     def name(self):
         return "abstract_noname"
 
     def createNetwork(self, xmlnetwork):
-        sid = createNetworkSid(xmlnetwork)
+        sid = self.sids.networkSid(xmlnetwork)
         net = {
             "sourceid": f"{sid}"
         }
@@ -70,7 +269,7 @@ class AbstractStationJson(ABC):
         return net
 
     def createStation(self, xmlstation, xmlnetwork):
-        sid = createStationSid(xmlstation, xmlnetwork)
+        sid = self.sids.stationSid(xmlstation, xmlnetwork)
         station = {
             "sourceid": f"{sid}",
             "startDate": xmlstation.get("startDate"),
@@ -80,23 +279,111 @@ class AbstractStationJson(ABC):
             station["endDate"] = xmlstation.get("endDate")
         return station
 
+    def appendTo(self, container, key, item):
+        """Append item to the list container[key], creating it if needed."""
+        items = container.get(key)
+        if items is None:
+            items = container[key] = []
+        items.append(item)
+        return item
+
+    def findNode(self, nodeId):
+        return self.nodes.get(nodeId)
+
+    def indexNode(self, nodeId, node):
+        self.nodes[nodeId] = node
+        return node
+
     def addStationToNetwork(self, station, net, envelope):
-        if "station" not in net:
-            net["station"] = []
-        net["station"].append(station)
+        self.appendTo(net, "station", station)
 
     def addNetworkToEnvelope(self, net, envelope):
-        if "networks" not in envelope:
-            envelope["networks"] = []
-        envelope["networks"].append(net)
+        self.appendTo(envelope, "networks", net)
 
     def createEnvelope(self, staxml):
         envelope = {
         }
         return envelope
 
+    def iterJson(self, source):
+        """
+        Streaming counterpart of toJson for a file path or binary stream: yields
+        ("envelope", envelope) once, then ("network", net) and ("station", station) in
+        document order, each network before its stations. Station elements are dropped
+        once converted and Network elements once finished, so the tree never holds more
+        than one network's header and one station.
+        """
+        self.sids.clear()
+        self.nodes.clear()
+        netTag = f"{{{STAXML_NS}}}Network"
+        staTag = f"{{{STAXML_NS}}}Station"
+        root = None
+        envelope = None
+        xmlnetwork = None
+        netDone = False
+        # only Network and Station events reach python, the rest is parsed in C
+        events = etree.iterparse(source, events=("start", "end"), tag=(netTag, staTag))
+        for event, elem in events:
+            if event == "start":
+                if root is None:
+                    root = elem.getroottree().getroot()
+                if elem.tag == netTag and elem.getparent() is root:
+                    if envelope is None:
+                        # header elements precede the networks, so they are complete here
+                        envelope = self.createEnvelope(root)
+                        yield "envelope", envelope
+                    xmlnetwork = elem
+                    netDone = False
+                elif elem.tag == staTag and xmlnetwork is not None and elem.getparent() is xmlnetwork:
+                    if not netDone:
+                        yield "network", self.createNetwork(xmlnetwork)
+                        netDone = True
+                continue
+            if xmlnetwork is None:
+                continue
+            if elem.tag == staTag and elem.getparent() is xmlnetwork:
+                yield "station", self.createStation(elem, xmlnetwork)
+                elem.clear()
+                xmlnetwork.remove(elem)
+            elif elem is xmlnetwork:
+                if not netDone:
+                    yield "network", self.createNetwork(xmlnetwork)
+                elem.clear()
+                root.remove(elem)
+                xmlnetwork = None
+        if envelope is None:
+            yield "envelope", self.createEnvelope(events.root)
+
+    def streamJson(self, source, fp, pretty=False):
+        """
+        Write the envelope for source to the text stream fp as it is parsed, same text
+        as serializeJson(toJson(...), pretty). Items are flushed one network at a time;
+        a network repeated later in the document is not merged with the earlier entry.
+        Returns the number of list items written.
+        """
+        writer = EnvelopeWriter(fp, pretty)
+        partial = None
+        net = None
+        for kind, obj in self.iterJson(source):
+            if kind == "envelope":
+                writer.start(obj)
+            elif kind == "network":
+                if partial:
+                    writer.extend(partial)
+                partial = {}
+                net = obj
+                self.nodes.clear()
+                self.addNetworkToEnvelope(net, partial)
+            else:
+                self.addStationToNetwork(obj, net, partial)
+        if partial:
+            writer.extend(partial)
+        return writer.close()
+
     def toJson(self, staxmlText):
         staxml = etree.fromstring(staxmlText)
+        self.sids.clear()
+        self.nodes.clear()
         envelope = self.createEnvelope(staxml)
 
         for child in staxml: